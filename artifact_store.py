@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, cast
+
+logger = logging.getLogger("JobApplicationAgent")
+
+def _optional_module(name: str) -> Any:
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+# Optional: zstd compresses HTML smaller and faster than gzip, used when the package is installed.
+zstandard: Any = _optional_module("zstandard")
+# How often a store with a max age looks for expired artifacts while it is being written to.
+AGE_SWEEP_INTERVAL_SECONDS = 600.0
+# A size sweep evicts down to this share of max_bytes, so the next few writes do not trigger another one.
+SIZE_SWEEP_LOW_WATER = 0.9
+
+class ArtifactStore:
+    """
+    Content-addressed store for large payloads (DOM snapshots, raw LLM responses) that would otherwise
+    be written into the log on every step. Each payload is stored once, compressed (zstd when the
+    zstandard package is installed, gzip otherwise), under the hash of its content; the log only
+    carries the short id returned by put().
+
+    Hashing happens in the caller, compression and disk writes on a background thread. With
+    `max_bytes` and/or `max_age_seconds`, the same thread sweeps the directory on startup and while
+    writing: expired artifacts are deleted, then the oldest ones until the store fits in max_bytes.
+    """
+    _shared: Optional["ArtifactStore"] = None
+
+    def __init__(self, directory: str = "artifacts", max_bytes: Optional[int] = None, max_age_seconds: Optional[float] = None) -> None:
+        self.directory: str = directory
+        self.max_bytes: Optional[int] = max_bytes
+        self.max_age_seconds: Optional[float] = max_age_seconds
+        self.extension: str = ".zst" if zstandard is not None else ".gz"
+        os.makedirs(directory, exist_ok=True)
+        self.known_ids: set[str] = set()
+        self.lock: threading.Lock = threading.Lock()
+        self.writer: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+        # Payloads stored, deduplicated and evicted, with the uncompressed size of the stored ones
+        self.stats: dict[str, int] = {"stored": 0, "deduplicated": 0, "bytes": 0, "evicted": 0}
+        # Compressed bytes on disk as of the last sweep plus those written since, only touched by the writer thread.
+        self.disk_bytes: int = 0
+        self.last_sweep: float = 0.0
+        if max_bytes is not None or max_age_seconds is not None:
+            self.writer.submit(self.sweep)
+
+    @classmethod
+    def shared(cls) -> "ArtifactStore":
+        """Process wide store used by components that log large payloads."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def set_shared(cls, store: "ArtifactStore") -> None:
+        cls._shared = store
+
+    def _path(self, artifact_id: str, extension: Optional[str] = None) -> str:
+        # Sharded by the first hash characters, ids look like "<kind>-<hash>".
+        return os.path.join(self.directory, artifact_id.rsplit("-", 1)[-1][:2], f"{artifact_id}{extension or self.extension}")
+
+    def put(self, content: str, kind: str = "blob") -> str:
+        """Store `content` unless it is already stored and return its id, e.g. "dom-3f2a9c0d1e4b5a6f"."""
+        data = content.encode("utf-8")
+        artifact_id = f"{kind}-{hashlib.sha256(data).hexdigest()[:16]}"
+        with self.lock:
+            if artifact_id in self.known_ids:
+                self.stats["deduplicated"] += 1
+                return artifact_id
+            self.known_ids.add(artifact_id)
+            self.stats["stored"] += 1
+            self.stats["bytes"] += len(data)
+        self.writer.submit(self._write, artifact_id, data)
+        return artifact_id
+
+    def _write(self, artifact_id: str, data: bytes) -> None:
+        path = self._path(artifact_id)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if zstandard is not None:
+                compressed = cast(bytes, zstandard.ZstdCompressor().compress(data))
+            else:
+                compressed = gzip.compress(data, compresslevel=6)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[Artifacts] ⚠️ Could not write artifact {artifact_id}: {e}")
+            return
+        self.disk_bytes += len(compressed)
+        if self._sweep_due():
+            self.sweep()
+
+    def _sweep_due(self) -> bool:
+        if self.max_bytes is not None and self.disk_bytes > self.max_bytes:
+            return True
+        return self.max_age_seconds is not None and time.time() - self.last_sweep > AGE_SWEEP_INTERVAL_SECONDS
+
+    def sweep(self) -> None:
+        """
+        Delete the artifacts older than max_age_seconds, then the oldest ones until the store is back under
+        max_bytes. Runs on the writer thread; evicted ids are forgotten, so they are written again when put.
+        """
+        self.last_sweep = time.time()
+        files: list[tuple[float, int, str]] = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * SIZE_SWEEP_LOW_WATER if self.max_bytes is not None else None
+        evicted: set[str] = set()
+        for modified, size, path in files:
+            expired = self.max_age_seconds is not None and self.last_sweep - modified > self.max_age_seconds
+            if not expired and (target is None or total <= target):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            # Artifact files are named "<id><extension>", left behind temp files "<id><extension>.<pid>.tmp".
+            evicted.add(os.path.basename(path).split(".", 1)[0])
+        self.disk_bytes = total
+        if not evicted:
+            return
+        with self.lock:
+            self.known_ids -= evicted
+            self.stats["evicted"] += len(evicted)
+        logger.info(f"[Artifacts] 🧹 Evicted {len(evicted)} artifacts, {total / 1_000_000:.1f} MB left")
+
+    def get(self, artifact_id: str) -> Optional[str]:
+        """Return the content stored under an id from the log, or None if there is none."""
+        for extension in (".zst", ".gz"):
+            path = self._path(artifact_id, extension)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            if extension == ".gz":
+                return gzip.decompress(data).decode("utf-8")
+            if zstandard is None:
+                raise RuntimeError(f"Artifact {artifact_id} is zstd compressed, install the zstandard package to read it")
+            return cast(bytes, zstandard.ZstdDecompressor().decompress(data)).decode("utf-8")
+        return None
+
+    def log_stats(self) -> None:
+        if self.stats["stored"] or self.stats["deduplicated"]:
+            logger.info(
+                f"[Artifacts] Stored {self.stats['stored']} artifacts ({self.stats['bytes'] / 1_000_000:.1f} MB uncompressed), "
+                f"{self.stats['deduplicated']} duplicates skipped, {self.stats['evicted']} evicted"
+            )
+
+    def close(self) -> None:
+        """Wait for pending writes."""
+        self.writer.shutdown(wait=True)
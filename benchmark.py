@@ -0,0 +1,239 @@
+"""
+Offline benchmark: `python benchmark.py [--runs 3] [--provider ollama|openai] [--first-token-seconds 0.3]`.
+
+Serves the fixture job board in BENCHMARK_SITE_DIR (login, search filters, delayed listings and a
+three step application form with heavy selects) and the deterministic mock LLM of mock_llm.py on
+localhost, then runs the login, search and application phases of main.run_site against them on a
+fresh context of one browser, with the configuration of main.py. Every run starts from empty caches,
+playbooks, sessions and job index. Per phase it reports wall time, LLM steps and requests, browser
+round trips, prompt bytes and how long the prefetched listings were waited for, and appends the runs
+to BENCHMARK_RESULTS_PATH with the current commit, to compare changes against a baseline without a
+live site or model.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from browser_controller import launch_browser
+from intervention_queue import InterventionQueue
+from job_index import JobIndex
+from llm_cache import LLMResponseCache
+from llm_clients import LLMClientPool
+from mock_llm import MockLLMServer
+from model_router import ModelRouter
+from playbooks import PlaybookStore
+from rate_limiter import LLMRateLimiter
+from session_store import SessionStore
+from tracing import Tracer
+from playwright.async_api import Browser, async_playwright
+from main import (
+    JOB_MAX_ATTEMPTS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, LLM_CONNECT_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_READ_TIMEOUT_SECONDS,
+    MAX_CONCURRENT_LLM_REQUESTS, build_agents, build_artifacts, build_request_blocker, run_site, setup_logging
+)
+
+BENCHMARK_SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_site")
+BENCHMARK_RESULTS_PATH = "benchmark_results.jsonl"
+PHASES: tuple[str, ...] = ("login", "search", "application")
+# Spans that are one round trip to the browser each.
+BROWSER_SPANS: tuple[str, ...] = ("get_dom", "execute", "execute_batch")
+# The mock answers every tier, so each phase gets a single one.
+MOCK_MODEL = "mock"
+BENCHMARK_CREDENTIALS: dict[str, str] = {"login_type": "Custom", "email": "bench@example.com", "password": "fixture-password"}
+BENCHMARK_PREFERENCES: dict[str, Any] = {
+    "job_title": "Backend Engineer",
+    "keywords": ["python", "backend"],
+    "locations": ["United States", "Remote"],
+    "experience_level": "Mid Level"
+}
+BENCHMARK_APPLICANT: dict[str, Any] = {
+    "first_name": "Alex",
+    "last_name": "Fixture",
+    "email": "bench@example.com",
+    "phone": "+1 555 0100",
+    "Address": {"City": "Austin", "Country": "United States"},
+    "education": [{"institution": "State University", "degree": "Bachelor's degree", "graduation_year": "2018"}],
+    "work_experience": [{"company": "Initech", "role": "Software Engineer"}],
+    "resume_file": "",
+    "cover_letter_file": ""
+}
+
+logger = logging.getLogger("JobApplicationAgent")
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug(f"[Benchmark] Fixture site {format % args}")
+
+class FixtureSite:
+    """The fixture job board served from BENCHMARK_SITE_DIR on a free localhost port."""
+    def __init__(self, host: str = "127.0.0.1") -> None:
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer((host, 0), partial(FixtureRequestHandler, directory=BENCHMARK_SITE_DIR))
+        self.url: str = f"http://{host}:{self.server.server_address[1]}/"
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve_forever, name="fixture-site", daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def phase_report(tracer: Tracer, mock_stats: dict[str, dict[str, int]]) -> dict[str, dict[str, float]]:
+    """
+    Per phase wall time, steps, LLM requests, browser round trips, prompt size, and the prefetched
+    listings with the time spent waiting for them of a run.
+    """
+    report: dict[str, dict[str, float]] = {
+        phase: {
+            "seconds": 0.0, "steps": 0, "llm_requests": 0, "browser_round_trips": 0, "prompt_bytes": 0, "prompt_tokens_estimated": 0,
+            "prefetch_hits": 0, "prefetch_wait_seconds": 0.0
+        }
+        for phase in PHASES
+    }
+    counters = {
+        "phase_seconds": "seconds", "steps": "steps", "llm_requests": "llm_requests", "prompt_tokens_estimated": "prompt_tokens_estimated",
+        "prefetch_hits": "prefetch_hits", "prefetch_wait_seconds": "prefetch_wait_seconds"
+    }
+    for (name, labels), value in tracer.counters.items():
+        phase = dict(labels).get("phase", "")
+        if name in counters and phase in report:
+            report[phase][counters[name]] += value
+    for (name, labels), values in tracer.durations.items():
+        phase = dict(labels).get("phase", "")
+        if name in BROWSER_SPANS and phase in report:
+            report[phase]["browser_round_trips"] += len(values)
+    for phase, stats in mock_stats.items():
+        if phase in report:
+            report[phase]["prompt_bytes"] += stats["request_bytes"]
+    return report
+
+async def run_once(site: FixtureSite, mock: MockLLMServer, browser: Browser, provider: str) -> dict[str, Any]:
+    """One cold run of the three phases against the fixture site, returns its report."""
+    tracer = Tracer()
+    Tracer.set_shared(tracer)
+    mock.reset_stats()
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as tmp:
+        # Nobody attends a benchmark: an intervention is skipped at once.
+        interventions = InterventionQueue(os.path.join(tmp, "interventions.sqlite3"), timeout_seconds=0)
+        InterventionQueue.set_shared(interventions)
+        resume_path = os.path.join(tmp, "resume.pdf")
+        with open(resume_path, "wb") as f:
+            f.write(b"%PDF-1.4\n% benchmark resume\n")
+        applicant_data = {**BENCHMARK_APPLICANT, "resume_file": resume_path}
+        applicant_preferences = {**BENCHMARK_PREFERENCES, "sites": [site.url]}
+        llm_cache = LLMResponseCache(os.path.join(tmp, "llm_cache.sqlite3"), LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+        llm_clients = LLMClientPool(
+            connect_timeout=LLM_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=LLM_READ_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES,
+            ollama_url=mock.ollama_url,
+            openai_base_url=mock.openai_base_url,
+            rate_limiter=LLMRateLimiter(MAX_CONCURRENT_LLM_REQUESTS)
+        )
+        model_router = ModelRouter({phase: [(provider, MOCK_MODEL)] for phase in PHASES})
+        agents = build_agents(llm_cache, llm_clients, model_router)
+        job_index = JobIndex(os.path.join(tmp, "jobs.sqlite3"), JOB_MAX_ATTEMPTS)
+        started = time.perf_counter()
+        try:
+            await run_site(
+                site.url, browser, agents, applicant_preferences, applicant_data, {site.url: BENCHMARK_CREDENTIALS},
+                PlaybookStore(os.path.join(tmp, "playbooks")), SessionStore(os.path.join(tmp, "sessions")), job_index, build_request_blocker()
+            )
+        finally:
+            total_seconds = time.perf_counter() - started
+            applied = int(job_index.connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'applied'").fetchone()[0])
+            job_index.close()
+            llm_cache.close()
+            await llm_clients.aclose()
+            interventions.close()
+    return {
+        "total_seconds": round(total_seconds, 3),
+        "applications": applied,
+        "phases": {
+            phase: {name: round(value, 3) for name, value in stats.items()}
+            for phase, stats in phase_report(tracer, mock.reset_stats()).items()
+        }
+    }
+
+def log_report(runs: list[dict[str, Any]]) -> None:
+    logger.info(f"[Benchmark] {'phase':<12} {'seconds':>9} {'steps':>6} {'llm req':>8} {'browser':>8} {'prompt KB':>10}")
+    for phase in PHASES:
+        stats = [run["phases"][phase] for run in runs]
+        logger.info(
+            f"[Benchmark] {phase:<12} {sum(s['seconds'] for s in stats) / len(stats):>9.2f} "
+            f"{sum(s['steps'] for s in stats) / len(stats):>6.1f} {sum(s['llm_requests'] for s in stats) / len(stats):>8.1f} "
+            f"{sum(s['browser_round_trips'] for s in stats) / len(stats):>8.1f} {sum(s['prompt_bytes'] for s in stats) / len(stats) / 1024:>10.1f}"
+        )
+    prefetched = [run["phases"]["application"] for run in runs]
+    hits = sum(stats["prefetch_hits"] for stats in prefetched)
+    if hits:
+        logger.info(
+            f"[Benchmark] Prefetched listings: {hits / len(runs):.1f} per run, "
+            f"{sum(stats['prefetch_wait_seconds'] for stats in prefetched) / hits * 1000:.0f} ms waited for each"
+        )
+    logger.info(
+        f"[Benchmark] Average over {len(runs)} runs: {sum(run['total_seconds'] for run in runs) / len(runs):.2f}s per site, "
+        f"{sum(run['applications'] for run in runs) / len(runs):.1f} applications"
+    )
+
+async def run_all(site: FixtureSite, mock: MockLLMServer, runs: list[dict[str, Any]], count: int, provider: str, headless: bool) -> None:
+    """Append `count` cold runs to `runs`, each on a fresh context of one browser launched for all of them."""
+    async with async_playwright() as playwright:
+        browser = await launch_browser(playwright, headless=headless)
+        try:
+            for run in range(count):
+                runs.append(await run_once(site, mock, browser, provider))
+                logger.warning(f"[Benchmark] Run {run + 1}/{count}: {runs[-1]['total_seconds']:.2f}s, {runs[-1]['applications']} applications")
+        finally:
+            await browser.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop against the fixture job board and the mock LLM.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--provider", choices=("ollama", "openai"), default="ollama", help="wire format the mock LLM is spoken to in")
+    parser.add_argument("--first-token-seconds", type=float, default=0.3, help="simulated model latency before the first instruction")
+    parser.add_argument("--seconds-per-instruction", type=float, default=0.05, help="simulated generation time of each further instruction")
+    parser.add_argument("--headed", action="store_true", help="show the browser")
+    parser.add_argument("--output", default=BENCHMARK_RESULTS_PATH, help="JSONL file the runs are appended to")
+    args = parser.parse_args()
+    if args.provider == "openai":
+        # The SDK insists on a key, the mock ignores it.
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+    # The agent's progress goes to agent.log only, the console is kept for the report.
+    log_listener = setup_logging(console_level=logging.WARNING)
+    _, console_handler = log_listener.handlers
+    artifacts = build_artifacts()
+    site = FixtureSite()
+    mock = MockLLMServer(first_token_seconds=args.first_token_seconds, seconds_per_instruction=args.seconds_per_instruction)
+    runs: list[dict[str, Any]] = []
+    try:
+        asyncio.run(run_all(site, mock, runs, args.runs, args.provider, headless=not args.headed))
+    finally:
+        mock.close()
+        site.close()
+        console_handler.setLevel(logging.INFO)
+        if runs:
+            log_report(runs)
+            record = {
+                "ts": time.time(), "commit": git_commit(), "provider": args.provider,
+                "first_token_seconds": args.first_token_seconds, "seconds_per_instruction": args.seconds_per_instruction, "runs": runs
+            }
+            with open(args.output, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            logger.info(f"[Benchmark] Results appended to {args.output}")
+        artifacts.close()
+        log_listener.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+// Shared behaviour of the fixture job board used by benchmark.py. Pages render their content after a
+// short delay and fetch listings like a single page app would, so the agent's settle logic is exercised.
+const RENDER_DELAY_MS = 200;
+
+function requireLogin() {
+  if (!localStorage.getItem("fixture_user")) location.replace("index.html");
+}
+
+function later(callback, delay) {
+  setTimeout(callback, delay === undefined ? RENDER_DELAY_MS : delay);
+}
+
+function addOptions(select, values) {
+  for (const [value, text] of values) select.add(new Option(text, value));
+}
+
+// Every ISO 3166 region name the browser knows, about 250 options.
+function countryOptions() {
+  const names = new Intl.DisplayNames(["en"], { type: "region" });
+  const letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ";
+  const countries = [];
+  for (const first of letters) {
+    for (const second of letters) {
+      const code = first + second;
+      let name = code;
+      try { name = names.of(code); } catch (e) { continue; }
+      if (name && name !== code) countries.push([code, name]);
+    }
+  }
+  return countries.sort((a, b) => a[1].localeCompare(b[1]));
+}
+
+function showAlert(container, message) {
+  let alert = container.querySelector("[role='alert']");
+  if (!alert) {
+    alert = document.createElement("p");
+    alert.setAttribute("role", "alert");
+    container.prepend(alert);
+  }
+  alert.textContent = message;
+}
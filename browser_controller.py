@@ -1,52 +1,648 @@
-from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext, Playwright
+from playwright.async_api import Page, Browser, BrowserContext, Playwright
+import asyncio
 import json
-from typing import Any
+from request_blocking import RequestBlocker
+from tracing import Tracer, estimate_tokens
+import logging
+import time
+from typing import Any, Optional, cast
+
+logger = logging.getLogger("JobApplicationAgent")
+
+DOM_MODES: tuple[str, ...] = ("full", "actionable")
+
+# Collects everything get_dom(mode="full") needs in one page.evaluate round trip instead of one
+# Playwright call per select, per select attribute and per option.
+SNAPSHOT_SCRIPT: str = """
+() => {
+  const doctype = document.doctype ? `<!DOCTYPE ${document.doctype.name}>` : "";
+  const selectFields = Array.from(document.querySelectorAll("select")).map(select => ({
+    field: select.getAttribute("name") || select.getAttribute("id"),
+    options: Array.from(select.querySelectorAll("option")).map(opt => opt.getAttribute("value"))
+  }));
+  const formState = [];
+  for (const el of document.querySelectorAll("input, select, textarea")) {
+    const type = (el.getAttribute("type") || el.tagName).toLowerCase();
+    if (type === "hidden" || type === "password" || type === "submit" || type === "button") continue;
+    const field = el.getAttribute("name") || el.getAttribute("id");
+    if (!field) continue;
+    if (type === "checkbox" || type === "radio") {
+      if (el.checked) formState.push({ field, type, value: el.value, checked: true });
+    } else if (el.value) {
+      formState.push({ field, type, value: el.value });
+    }
+  }
+  return {
+    url: location.href,
+    title: document.title,
+    html: doctype + document.documentElement.outerHTML,
+    select_fields: selectFields,
+    form_state: formState
+  };
+}
+"""
+
+# Single in-page pass that keeps only visible, interactable elements (in the spirit of
+# extractVisibleInteractablesAndBuildUidMapping in the capture extension's content.js).
+# Every kept element is stamped with a data-agent-uid attribute that survives re-renders of
+# the same node, and is given the shortest selector that is unique on the page.
+ACTIONABLE_DOM_SCRIPT: str = """
+({ maxElements, maxOptions, maxTextContext }) => {
+  const INTERACTABLE = "input, button, select, textarea, a[href], summary, [contenteditable='true'], " +
+    "[role='button'], [role='link'], [role='checkbox'], [role='radio'], [role='switch'], " +
+    "[role='combobox'], [role='option'], [role='tab'], [role='menuitem'], [onclick]";
+  const clip = (s, n) => {
+    s = (s || "").replace(/\\s+/g, " ").trim();
+    return s.length > n ? s.slice(0, n) + "…" : s;
+  };
+  const isVisible = (el) => {
+    const style = window.getComputedStyle(el);
+    if (!style || style.display === "none" || style.visibility === "hidden" || style.opacity === "0") return false;
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+  };
+  const isUnique = (selector) => {
+    try { return document.querySelectorAll(selector).length === 1; } catch (e) { return false; }
+  };
+  const labelOf = (el) => {
+    if (el.id) {
+      const label = document.querySelector(`label[for="${CSS.escape(el.id)}"]`);
+      if (label) return clip(label.innerText, 80);
+    }
+    const wrapping = el.closest("label");
+    if (wrapping) return clip(wrapping.innerText, 80);
+    const labelledBy = el.getAttribute("aria-labelledby");
+    if (labelledBy) {
+      const text = labelledBy.split(/\\s+/).map(id => document.getElementById(id)).filter(Boolean)
+        .map(node => node.innerText).join(" ");
+      if (text.trim()) return clip(text, 80);
+    }
+    return clip(el.getAttribute("aria-label") || el.getAttribute("placeholder") || el.getAttribute("title") ||
+      el.getAttribute("alt") || "", 80);
+  };
+  window.__agentUidCounter = window.__agentUidCounter || 0;
+  const elements = [];
+  let skipped = 0;
+  for (const el of document.querySelectorAll(INTERACTABLE)) {
+    const tag = el.tagName.toLowerCase();
+    const type = (el.getAttribute("type") || "").toLowerCase();
+    if (type === "hidden" || !isVisible(el)) continue;
+    if (elements.length >= maxElements) { skipped++; continue; }
+    let uid = el.getAttribute("data-agent-uid");
+    if (!uid) {
+      uid = `el_${window.__agentUidCounter++}`;
+      el.setAttribute("data-agent-uid", uid);
+    }
+    let selector = `[data-agent-uid="${uid}"]`;
+    const name = el.getAttribute("name");
+    if (el.id && isUnique(`#${CSS.escape(el.id)}`)) selector = `#${CSS.escape(el.id)}`;
+    else if (name && isUnique(`${tag}[name="${CSS.escape(name)}"]`)) selector = `${tag}[name="${CSS.escape(name)}"]`;
+    const item = { uid, selector, tag };
+    if (type) item.type = type;
+    if (el.getAttribute("role")) item.role = el.getAttribute("role");
+    if (name) item.name = name;
+    const label = labelOf(el);
+    if (label) item.label = label;
+    const text = ["a", "button", "summary"].includes(tag) || el.getAttribute("role") ? clip(el.innerText, 80) : "";
+    if (text && text !== label) item.text = text;
+    if (el.getAttribute("autocomplete")) item.autocomplete = el.getAttribute("autocomplete");
+    if (tag === "a") item.href = clip(el.getAttribute("href"), 120);
+    if (el.required || el.getAttribute("aria-required") === "true") item.required = true;
+    if (el.disabled || el.getAttribute("aria-disabled") === "true") item.disabled = true;
+    if (tag === "select") {
+      const options = Array.from(el.options);
+      item.options = options.slice(0, maxOptions).map(opt => opt.value === opt.text ? opt.value : `${opt.value} (${clip(opt.text, 40)})`);
+      if (options.length > maxOptions) item.more_options = options.length - maxOptions;
+      item.value = el.value;
+    } else if (type === "checkbox" || type === "radio") {
+      item.checked = el.checked;
+      if (el.value && el.value !== "on") item.value = el.value;
+    } else if ((tag === "input" || tag === "textarea") && type !== "password" && type !== "file" && el.value) {
+      item.value = clip(el.value, 80);
+    }
+    elements.push(item);
+  }
+  const context = [];
+  for (const heading of document.querySelectorAll("[role='dialog'] h1, [role='dialog'] h2, h1, h2, h3, [role='alert']")) {
+    if (isVisible(heading)) context.push(clip(heading.innerText, 120));
+  }
+  return {
+    mode: "actionable",
+    url: location.href,
+    title: document.title,
+    text_context: clip(Array.from(new Set(context)).join(" | "), maxTextContext),
+    elements,
+    omitted_elements: skipped
+  };
+}
+"""
+
+# Cheap logged-in check that needs no LLM turn: a visible password field or a lone "Sign in" entry point
+# means logged out, an account menu / sign out control means logged in. A site specific selector that
+# only exists for logged in users (logged_in_selector in applicant_credentials.json) takes precedence.
+LOGIN_PROBE_SCRIPT: str = """
+(loggedInSelector) => {
+  const isVisible = (el) => {
+    const style = window.getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    return style.display !== "none" && style.visibility !== "hidden" && rect.width > 0 && rect.height > 0;
+  };
+  if (loggedInSelector) {
+    const marker = document.querySelector(loggedInSelector);
+    return !!marker && isVisible(marker);
+  }
+  const visiblePassword = Array.from(document.querySelectorAll("input[type='password']")).some(isVisible);
+  if (visiblePassword) return false;
+  const controls = Array.from(document.querySelectorAll("a, button, [role='button'], [role='menuitem'], img[alt]")).filter(isVisible);
+  const textOf = (el) => (el.innerText || el.getAttribute("aria-label") || el.getAttribute("alt") || "").trim().toLowerCase();
+  const loggedInPattern = /^(sign out|log out|logout|my account|account settings|my profile|view profile|me)$|your (profile|account) photo|profile picture|avatar/;
+  const loggedOutPattern = /^(sign in|log in|login|sign up|join now|register)$/;
+  const loggedIn = controls.some(el => loggedInPattern.test(textOf(el)));
+  const loggedOut = controls.some(el => loggedOutPattern.test(textOf(el)));
+  return loggedIn && !loggedOut;
+}
+"""
+
+# Checks a whole batch of instruction selectors in one evaluation: the selector must match exactly one
+# enabled, visible element of the right kind for the action. Returns a rejection reason per check, or
+# null when the element is fine or the selector uses Playwright-only syntax (text=..., :has-text()) that
+# can only be checked by acting on it.
+VALIDATE_SELECTORS_SCRIPT: str = """
+(checks) => {
+  const TEXT_INPUT_EXCLUDED = ["checkbox", "radio", "file", "submit", "button", "image", "reset", "hidden", "range", "color"];
+  const describe = (el) => `<${el.tagName.toLowerCase()}${el.getAttribute("type") ? ` type=${el.getAttribute("type")}` : ""}>`;
+  const isVisible = (el) => {
+    const style = window.getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    return style.display !== "none" && style.visibility !== "hidden" && rect.width > 0 && rect.height > 0;
+  };
+  return checks.map(({ selector, action }) => {
+    let matches;
+    try { matches = document.querySelectorAll(selector); } catch (e) { return null; }
+    if (matches.length === 0) return "no element matches the selector";
+    if (matches.length > 1) return `selector is ambiguous, it matches ${matches.length} elements`;
+    const el = matches[0];
+    const tag = el.tagName.toLowerCase();
+    const type = (el.getAttribute("type") || "").toLowerCase();
+    if (action === "upload") {
+      return tag === "input" && type === "file" ? null : `upload needs an input[type=file], got ${describe(el)}`;
+    }
+    if (!isVisible(el)) return "element is not visible";
+    if (el.disabled || el.getAttribute("aria-disabled") === "true") return "element is disabled";
+    if (action === "fill" && !(tag === "textarea" || el.isContentEditable || (tag === "input" && !TEXT_INPUT_EXCLUDED.includes(type)))) {
+      return `fill needs a text input, textarea or contenteditable element, got ${describe(el)}`;
+    }
+    if (action === "select" && tag !== "select") return `select needs a <select> element, got ${describe(el)}`;
+    return null;
+  });
+}
+"""
+
+# Applies a run of fill/select instructions in one evaluation. Values go through the native value
+# setters and are followed by bubbling input/change events, so React/Vue/Angular managed fields register
+# the change the same way they would for typed input. Returns an error per item, or null on success.
+BATCH_FILL_SCRIPT: str = """
+(items) => items.map(({ selector, action, value }) => {
+  let el;
+  try { el = document.querySelector(selector); } catch (e) { return "invalid CSS selector"; }
+  if (!el) return "no element matches the selector";
+  if (el.disabled) return "element is disabled";
+  const tag = el.tagName.toLowerCase();
+  if (el.focus) el.focus();
+  if (action === "select") {
+    if (tag !== "select") return "not a <select> element";
+    const options = Array.from(el.options);
+    const option = options.find(opt => opt.value === value) || options.find(opt => opt.text.trim() === value);
+    if (!option) return `no option with value or label "${value}"`;
+    Object.getOwnPropertyDescriptor(HTMLSelectElement.prototype, "value").set.call(el, option.value);
+  } else if (tag === "input" || tag === "textarea") {
+    const prototype = tag === "textarea" ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(prototype, "value").set.call(el, value);
+  } else if (el.isContentEditable) {
+    el.textContent = value;
+  } else {
+    return "not a text input, textarea or contenteditable element";
+  }
+  el.dispatchEvent(new Event("input", { bubbles: true }));
+  el.dispatchEvent(new Event("change", { bubbles: true }));
+  if (el.blur) el.blur();
+  return null;
+})
+"""
+
+# Collects job listing links from a search results page: {url, title, text} per visible listing, where
+# text is the listing card's text. Uses the site's listing selector when configured, otherwise any link
+# whose url looks like a job posting (the caller keeps only urls that carry a job id).
+LISTINGS_SCRIPT: str = """
+({ selector, maxListings }) => {
+  const generic = 'a[href*="job" i], a[href*="career" i], a[href*="position" i], a[href*="vacanc" i], a[href*="posting" i]';
+  const clean = (text, limit) => (text || "").replace(/\\s+/g, " ").trim().slice(0, limit);
+  const seen = new Set();
+  const listings = [];
+  for (const el of document.querySelectorAll(selector || generic)) {
+    const link = el.matches("a[href]") ? el : el.querySelector("a[href]");
+    if (!link || !link.href || link.href.startsWith("javascript:") || seen.has(link.href)) continue;
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 && rect.height === 0) continue;
+    const title = clean(link.innerText || link.getAttribute("aria-label") || link.title, 200);
+    if (!title) continue;
+    const card = el.closest("li, article, [data-jk], [class*='card' i], [class*='result' i]") || el;
+    seen.add(link.href);
+    listings.push({ url: link.href, title, text: clean(card.innerText, 500) });
+    if (listings.length >= maxListings) break;
+  }
+  return listings;
+}
+"""
+
+# Installed into every site context before any page script runs: tracks in-flight fetch/XHR requests
+# with their start times so SETTLE_SCRIPT can tell when the page has stopped loading data.
+NETWORK_TRACKER_INIT_SCRIPT: str = """
+(() => {
+  if (window.__agentPendingRequests) return;
+  const pending = new Map();
+  let nextId = 0;
+  window.__agentPendingRequests = pending;
+  const track = () => { const id = nextId++; pending.set(id, performance.now()); return () => pending.delete(id); };
+  if (window.fetch) {
+    const originalFetch = window.fetch;
+    window.fetch = function (...args) {
+      const done = track();
+      try {
+        const request = originalFetch.apply(this, args);
+        request.then(done, done);
+        return request;
+      } catch (e) { done(); throw e; }
+    };
+  }
+  const originalSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    const done = track();
+    this.addEventListener("loadend", done, { once: true });
+    try { return originalSend.apply(this, args); } catch (e) { done(); throw e; }
+  };
+})()
+"""
+
+# Resolves once the page has been quiet for quietMs: no DOM mutations, no in-flight fetch/XHR (requests
+# pending longer than longRequestMs, e.g. long polling, are ignored) and the document parsed. Resolves
+# with "budget" when budgetMs runs out first. A navigation destroys the page and rejects the evaluation.
+SETTLE_SCRIPT: str = """
+({ quietMs, budgetMs, longRequestMs }) => new Promise((resolve) => {
+  const started = performance.now();
+  let lastActivity = started;
+  const observer = new MutationObserver(() => { lastActivity = performance.now(); });
+  observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+  const pendingRequests = (now) => {
+    const pending = window.__agentPendingRequests;
+    if (!pending) return 0;
+    let count = 0;
+    for (const startedAt of pending.values()) {
+      if (now - startedAt < longRequestMs) count++;
+    }
+    return count;
+  };
+  const timer = setInterval(() => {
+    const now = performance.now();
+    if (pendingRequests(now) > 0 || document.readyState === "loading") lastActivity = now;
+    const outcome = now - lastActivity >= quietMs ? "quiet" : now - started >= budgetMs ? "budget" : null;
+    if (outcome) {
+      clearInterval(timer);
+      observer.disconnect();
+      resolve(outcome);
+    }
+  }, 50);
+})
+"""
+# How long the page may take to settle after each kind of action before the agent moves on anyway.
+# Fills rarely change the page, so they are not waited on by default.
+DEFAULT_SETTLE_BUDGETS_MS: dict[str, float] = {
+    "goto": 10000,
+    "click": 5000,
+    "submit": 8000,
+    "select": 1500,
+    "upload": 2000,
+    "fill": 0
+}
+DEFAULT_SETTLE_QUIET_MS: float = 300
+SETTLE_LONG_REQUEST_MS: float = 5000
+# A prefetched snapshot older than this when its page is adopted is taken again, the page may have changed since.
+PREFETCH_SNAPSHOT_MAX_AGE_SECONDS: float = 15.0
+
+def record_timing(timings: dict[str, dict[str, float]], operation: str, started: float) -> float:
+    """Add the time elapsed since `started` to the counters of `operation` in `timings` and return it."""
+    elapsed = time.perf_counter() - started
+    timing = timings.setdefault(operation, {"count": 0, "seconds": 0.0})
+    timing["count"] += 1
+    timing["seconds"] += elapsed
+    return elapsed
+
+def _full_dom_payload(snapshot: dict[str, Any]) -> str:
+    """Serialize a page snapshot into the get_dom(mode="full") JSON payload."""
+    return json.dumps({
+        "html": snapshot["html"],
+        "select_fields": snapshot["select_fields"],
+        "form_state": snapshot["form_state"]
+    })
+
+def _actionable_dom_args(max_elements: int, max_options: int, max_text_context: int) -> dict[str, int]:
+    return {
+        "maxElements": max_elements,
+        "maxOptions": max_options,
+        "maxTextContext": max_text_context
+    }
+
+def _settle_args(quiet_ms: float, budget_ms: float) -> dict[str, float]:
+    return {
+        "quietMs": quiet_ms,
+        "budgetMs": budget_ms,
+        "longRequestMs": SETTLE_LONG_REQUEST_MS
+    }
+
+async def launch_browser(playwright: Playwright, headless: bool = False) -> Browser:
+    """Launch the Chrome instance the sites' contexts are opened on."""
+    return await playwright.chromium.launch(headless=headless, channel="chrome")
 
 class BrowserController:
-    def __init__(self, headless: bool = False) -> None:
-        self.playwright: Playwright = sync_playwright().start()
-        self.browser: Browser = self.playwright.chromium.launch(headless=headless,channel="chrome")
-        self.context: BrowserContext = self.browser.new_context()
-        self.page: Page = self.context.new_page()
-
-    def goto(self, url: str) -> None:
-        """Navigate to the given URL and wait for full page load."""
-        self.page.goto(url)
-        self.page.wait_for_load_state("load")
-
-    def get_dom(self) -> str:
-        """Return the current DOM as an HTML string, along with options for select fields."""
-        html = self.page.content()
-        selects = self.page.query_selector_all("select")
-        select_info : list[dict[str, Any]]= []
-
-        for select in selects:
-            name = select.get_attribute("name") or select.get_attribute("id")
-            options = select.query_selector_all("option")
-            values = [opt.get_attribute("value") for opt in options]
-            select_info.append({"field": name, "options": values})
-
-        return json.dumps({
-            "html": html,
-            "select_fields": select_info
-        })
-
-    def click(self, selector: str) -> None:
+    """
+    Drives one site's BrowserContext (cookies, storage, pages) on a Browser that is shared between
+    sites, so several sites can run concurrently in one Chrome process.
+    """
+    def __init__(
+        self,
+        context: BrowserContext,
+        page: Page,
+        settle_budgets_ms: Optional[dict[str, float]] = None,
+        settle_quiet_ms: float = DEFAULT_SETTLE_QUIET_MS,
+        request_blocker: Optional[RequestBlocker] = None
+    ) -> None:
+        self.context: BrowserContext = context
+        self.page: Page = page
+        # Applied to every page the controller opens, see RequestBlocker.install.
+        self.request_blocker: Optional[RequestBlocker] = request_blocker
+        self.settle_budgets_ms: dict[str, float] = {**DEFAULT_SETTLE_BUDGETS_MS, **(settle_budgets_ms or {})}
+        self.settle_quiet_ms: float = settle_quiet_ms
+        # Per operation call count and cumulative seconds, e.g. {"snapshot": {"count": 3, "seconds": 0.42}}.
+        # Settle waits are recorded per action as "settle_<action>".
+        self.timings: dict[str, dict[str, float]] = {}
+        # Controller of the background page loading and snapshotting the next listing, see prefetch.
+        self.prefetched: Optional["BrowserController"] = None
+        self.prefetch_url: Optional[str] = None
+        # Resolves to the prefetched snapshot with the url it was taken at and when (time.monotonic()).
+        self.prefetch_task: Optional[asyncio.Task[tuple[str, str, float]]] = None
+        self.prefetch_mode: str = "full"
+        # Snapshot taken by the prefetch as (mode, dom), returned by the next get_dom in that mode.
+        self.pending_dom: Optional[tuple[str, str]] = None
+
+    @classmethod
+    async def create(
+        cls,
+        browser: Browser,
+        storage_state: Optional[dict[str, Any]] = None,
+        settle_budgets_ms: Optional[dict[str, float]] = None,
+        settle_quiet_ms: float = DEFAULT_SETTLE_QUIET_MS,
+        request_blocker: Optional[RequestBlocker] = None,
+        site: Optional[str] = None
+    ) -> "BrowserController":
+        """
+        Open a fresh BrowserContext with one page on the shared browser for `site`, optionally restoring
+        a saved session's cookies/localStorage. The request blocking profile, if any, is applied to its
+        pages unless the site is exempt.
+        """
+        context = await browser.new_context(storage_state=cast(Any, storage_state))
+        await context.add_init_script(NETWORK_TRACKER_INIT_SCRIPT)
+        if request_blocker is not None and not request_blocker.applies_to(site):
+            logger.info(f"[Blocking] Request blocking disabled for {site}")
+            request_blocker = None
+        page = await context.new_page()
+        if request_blocker is not None:
+            await request_blocker.install(page)
+        return cls(context, page, settle_budgets_ms, settle_quiet_ms, request_blocker)
+
+    async def storage_state(self) -> dict[str, Any]:
+        """Return the cookies and localStorage of the context, for SessionStore.save."""
+        return cast(dict[str, Any], await self.context.storage_state())
+
+    async def is_logged_in(self, logged_in_selector: Optional[str] = None) -> bool:
+        """Probe the current page for signs of a logged in user without asking the LLM."""
+        try:
+            return bool(await self.page.evaluate(LOGIN_PROBE_SCRIPT, logged_in_selector))
+        except Exception as e:
+            logger.warning(f"[Browser] ⚠️ Login probe failed: {e}")
+            return False
+
+    async def goto(self, url: str) -> None:
+        """Navigate to the given URL and wait until the page has settled (see settle)."""
+        await self.page.goto(url, wait_until="domcontentloaded")
+        await self.settle("goto")
+
+    async def settle(self, action: str) -> str:
+        """
+        Wait until the page has settled after `action`, up to its budget in settle_budgets_ms: either a
+        navigation it triggered has loaded and gone quiet, or the page has had no DOM mutations and no
+        in-flight requests for settle_quiet_ms. Returns "quiet", "budget" or "skipped" (no budget).
+        """
+        budget_ms = self.settle_budgets_ms.get(action, 0)
+        if budget_ms <= 0:
+            return "skipped"
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000
+        outcome = "budget"
+        while (remaining_ms := (deadline - time.perf_counter()) * 1000) > 0:
+            try:
+                outcome = cast(str, await self.page.evaluate(SETTLE_SCRIPT, _settle_args(self.settle_quiet_ms, remaining_ms)))
+                break
+            except Exception:
+                # The action navigated away and destroyed the page the script ran in: wait for the new
+                # document, then for it to go quiet within what is left of the budget.
+                try:
+                    await self.page.wait_for_load_state("domcontentloaded", timeout=remaining_ms)
+                except Exception:
+                    break
+        elapsed = record_timing(self.timings, f"settle_{action}", started)
+        Tracer.shared().count("settle_seconds", elapsed, action=action)
+        Tracer.shared().count("settle_outcomes", action=action, outcome=outcome)
+        logger.debug(f"[Browser] Settled after {action} ({outcome}) in {elapsed * 1000:.0f} ms")
+        return outcome
+
+    async def get_dom(self, mode: str = "full") -> str:
+        """
+        Return the current page as a JSON string for the LLM.
+
+        mode="full" returns the whole HTML along with options for select fields.
+        mode="actionable" returns only visible, interactable elements (see get_actionable_dom).
+        A snapshot taken by a prefetch in the same mode is returned without reading the page again.
+        """
+        if mode not in DOM_MODES:
+            raise ValueError(f"Unsupported DOM mode: {mode}")
+        if self.pending_dom is not None:
+            pending_mode, pending_dom = self.pending_dom
+            self.pending_dom = None
+            if pending_mode == mode:
+                return pending_dom
+        tracer = Tracer.shared()
+        with tracer.span("get_dom", mode=mode) as span:
+            dom = await self.get_actionable_dom() if mode == "actionable" else _full_dom_payload(await self.snapshot())
+            span.set(chars=len(dom), tokens_estimated=estimate_tokens(dom))
+        tracer.count("dom_chars", len(dom), mode=mode)
+        return dom
+
+    async def snapshot(self) -> dict[str, Any]:
+        """
+        Return the page url, title, HTML, select fields with their option values and the current
+        form state (filled values and checked boxes) collected in a single page.evaluate call.
+        """
+        started = time.perf_counter()
+        snapshot: dict[str, Any] = await self.page.evaluate(SNAPSHOT_SCRIPT)
+        elapsed = record_timing(self.timings, "snapshot", started)
+        logger.debug(f"[Browser] Snapshot: {len(snapshot['html'])} chars of HTML, {len(snapshot['select_fields'])} select fields in {elapsed * 1000:.0f} ms")
+        return snapshot
+
+    async def get_actionable_dom(self, max_elements: int = 200, max_options: int = 60, max_text_context: int = 600) -> str:
+        """
+        Return a distilled JSON view of the page built in a single in-page pass: visible, interactable
+        elements with labels, stable uids/selectors, select options and a short text context.
+        """
+        started = time.perf_counter()
+        distilled: dict[str, Any] = await self.page.evaluate(ACTIONABLE_DOM_SCRIPT, _actionable_dom_args(max_elements, max_options, max_text_context))
+        elapsed = record_timing(self.timings, "actionable_dom", started)
+        dom = json.dumps(distilled, ensure_ascii=False, separators=(",", ":"))
+        logger.debug(f"[Browser] Actionable DOM: {len(distilled['elements'])} elements, {len(dom)} chars in {elapsed * 1000:.0f} ms")
+        return dom
+
+    def current_url(self) -> str:
+        return self.page.url
+
+    async def extract_listings(self, selector: Optional[str] = None, max_listings: int = 100) -> list[dict[str, str]]:
+        """Return the job listings ({"url", "title", "text"}) of the current results page in one page evaluation."""
+        started = time.perf_counter()
+        listings = cast(list[dict[str, str]], await self.page.evaluate(LISTINGS_SCRIPT, {"selector": selector, "maxListings": max_listings}))
+        record_timing(self.timings, "extract_listings", started)
+        return listings
+
+    async def wait_for_element(self, selector: str, timeout_ms: float, state: str = "visible") -> bool:
+        """Return True if the selector reaches `state` ("visible" or "attached") within timeout_ms."""
+        try:
+            await self.page.wait_for_selector(selector, state="attached" if state == "attached" else "visible", timeout=timeout_ms)
+            return True
+        except Exception:
+            return False
+
+    async def validate_selectors(self, checks: list[dict[str, str]]) -> list[Optional[str]]:
+        """
+        Check every {"selector", "action"} pair in one page evaluation and return a rejection reason
+        per check, or None for selectors that look actionable.
+        """
+        started = time.perf_counter()
+        problems = cast(list[Optional[str]], await self.page.evaluate(VALIDATE_SELECTORS_SCRIPT, checks))
+        record_timing(self.timings, "validate_selectors", started)
+        return problems
+
+    async def fill_many(self, items: list[dict[str, str]]) -> list[Optional[str]]:
+        """
+        Apply several {"selector", "action": "fill" | "select", "value"} items in one page evaluation,
+        firing input/change events. Returns an error per item, or None where the value was applied.
+        """
+        started = time.perf_counter()
+        errors = cast(list[Optional[str]], await self.page.evaluate(BATCH_FILL_SCRIPT, items))
+        record_timing(self.timings, "fill_many", started)
+        return errors
+
+    async def click(self, selector: str, timeout_ms: Optional[float] = None) -> None:
         """Click the element specified by the CSS selector."""
-        self.page.click(selector)
+        await self.page.click(selector, timeout=timeout_ms)
 
-    def fill(self, selector: str, text: str) -> None:
+    async def fill(self, selector: str, text: str, timeout_ms: Optional[float] = None) -> None:
         """Fill the element specified by the CSS selector with the given text."""
-        self.page.fill(selector, text)
-        
-    def select(self, selector: str, value: str) -> None:
+        await self.page.fill(selector, text, timeout=timeout_ms)
+
+    async def select(self, selector: str, value: str, timeout_ms: Optional[float] = None) -> None:
         """Select the value from the element specified by the CSS selector."""
-        self.page.select_option(selector, value)
-    
-    def upload(self, selector: str, file_path: str) -> None:
-        self.page.set_input_files(selector, file_path)
-
-    def close(self) -> None:
-        """Close the browser and stop the Playwright instance."""
-        self.browser.close()
-        self.playwright.stop()
+        await self.page.select_option(selector, value, timeout=timeout_ms)
+
+    async def upload(self, selector: str, file_path: str, timeout_ms: Optional[float] = None) -> None:
+        await self.page.set_input_files(selector, file_path, timeout=timeout_ms)
+
+    async def prefetch(self, url: str, dom_mode: str) -> None:
+        """
+        Open, settle and snapshot `url` in a background page of this context while the current page
+        is being worked on; adopt_prefetched switches to it with the snapshot ready.
+        """
+        await self.discard_prefetch()
+        page = await self.context.new_page()
+        if self.request_blocker is not None:
+            await self.request_blocker.install(page)
+        await self.page.bring_to_front()
+        prefetched = BrowserController(self.context, page, self.settle_budgets_ms, self.settle_quiet_ms, self.request_blocker)
+        self.prefetched = prefetched
+        self.prefetch_url = url
+        self.prefetch_mode = dom_mode
+
+        async def load() -> tuple[str, str, float]:
+            await prefetched.goto(url)
+            dom = await prefetched.get_dom(dom_mode)
+            return dom, page.url, time.monotonic()
+
+        self.prefetch_task = asyncio.create_task(load())
+
+    async def adopt_prefetched(self, url: str) -> bool:
+        """
+        Make the page prefetched for `url` the current page, waiting for the prefetch to finish if it
+        is still loading, and close the previous one. Returns False if `url` was not prefetched. The
+        prefetched snapshot is only used if the page is still at the url it was taken at and it is
+        recent enough, otherwise the next get_dom reads the page again.
+        """
+        prefetched, task = self.prefetched, self.prefetch_task
+        if prefetched is None or task is None or self.prefetch_url != url:
+            await self.discard_prefetch()
+            return False
+        self.prefetched = None
+        self.prefetch_task = None
+        self.prefetch_url = None
+        # Time the current listing waits for the prefetch, zero when it fully overlapped the previous one.
+        waiting_started = time.perf_counter()
+        try:
+            dom, snapshot_url, taken_at = await task
+        except Exception as e:
+            logger.warning(f"[Browser] ⚠️ Prefetching {url} failed: {e}")
+            await prefetched.page.close()
+            return False
+        previous = self.page
+        self.page = prefetched.page
+        await self.page.bring_to_front()
+        await previous.close()
+        for operation, timing in prefetched.timings.items():
+            merged = self.timings.setdefault(operation, {"count": 0, "seconds": 0.0})
+            merged["count"] += timing["count"]
+            merged["seconds"] += timing["seconds"]
+        age = time.monotonic() - taken_at
+        if self.page.url != snapshot_url or age > PREFETCH_SNAPSHOT_MAX_AGE_SECONDS:
+            logger.info(f"[Browser] Prefetched snapshot of {url} is stale (taken at {snapshot_url} {age:.1f}s ago, page now at {self.page.url}), reading the page again")
+            Tracer.shared().count("prefetch_stale_snapshots")
+        else:
+            self.pending_dom = (self.prefetch_mode, dom)
+        Tracer.shared().count("prefetch_hits")
+        Tracer.shared().count("prefetch_wait_seconds", time.perf_counter() - waiting_started)
+        return True
+
+    async def discard_prefetch(self) -> None:
+        prefetched, task = self.prefetched, self.prefetch_task
+        self.prefetched = None
+        self.prefetch_task = None
+        self.prefetch_url = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if prefetched is not None:
+            try:
+                await prefetched.page.close()
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        """Close this site's BrowserContext, leaving the shared browser running."""
+        await self.discard_prefetch()
+        await self.context.close()
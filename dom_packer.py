@@ -0,0 +1,356 @@
+import functools
+import html
+import importlib
+import json
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Any, Callable, Optional, cast
+from tracing import estimate_tokens
+
+logger = logging.getLogger("JobApplicationAgent")
+
+def _optional_module(name: str) -> Any:
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+# Tokens of page content sent per DOM mode, unless the model has its own budget below.
+DEFAULT_DOM_TOKEN_BUDGETS: dict[str, int] = {
+    "full": 1500,
+    "actionable": 5000
+}
+# Budgets for models with larger context windows, matched by model name prefix.
+MODEL_DOM_TOKEN_BUDGETS: dict[str, int] = {
+    "gpt-4o": 12000,
+    "gpt-4.1": 12000,
+    "claude": 12000,
+    "llama3.1": 8000,
+    "qwen2.5": 8000
+}
+# Regions the page is cut into, by tag and by ARIA role. The outermost match starts a region.
+REGION_TAGS: dict[str, str] = {
+    "form": "form", "fieldset": "form",
+    "dialog": "dialog",
+    "nav": "chrome", "header": "chrome", "footer": "chrome", "aside": "chrome",
+    "article": "item", "li": "item", "tr": "item"
+}
+REGION_ROLES: dict[str, str] = {
+    "form": "form", "search": "form",
+    "dialog": "dialog", "alertdialog": "dialog",
+    "navigation": "chrome", "banner": "chrome", "contentinfo": "chrome", "complementary": "chrome",
+    "article": "item", "listitem": "item", "row": "item"
+}
+# How much each kind of region is worth per phase, before its keyword and control counts.
+KIND_WEIGHTS: dict[str, dict[str, float]] = {
+    "login": {"dialog": 3.0, "form": 3.0, "other": 1.0, "item": 0.3, "chrome": 0.3},
+    "search": {"dialog": 1.5, "form": 2.5, "other": 1.0, "item": 2.0, "chrome": 0.4},
+    "application": {"dialog": 4.0, "form": 3.0, "other": 1.0, "item": 0.5, "chrome": 0.2}
+}
+PHASE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "login": (
+        "sign in", "log in", "login", "signin", "password", "email", "username", "user name",
+        "continue", "next", "verification", "code", "captcha", "remember me", "account"
+    ),
+    "search": (
+        "search", "keyword", "job title", "location", "filter", "remote", "date posted", "experience level",
+        "salary", "job type", "results", "jobs", "easy apply", "sort"
+    ),
+    "application": (
+        "apply", "application", "resume", "cv", "cover letter", "upload", "first name", "last name",
+        "full name", "phone", "email", "address", "city", "linkedin", "experience", "education",
+        "authorized", "sponsorship", "salary", "question", "required", "submit", "review", "next", "continue"
+    )
+}
+# Content the LLM never needs.
+DROPPED_TAGS: frozenset[str] = frozenset({"script", "style", "noscript", "svg", "template", "head", "iframe", "canvas", "picture"})
+VOID_TAGS: frozenset[str] = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"})
+CONTROL_TAGS: frozenset[str] = frozenset({"input", "select", "textarea", "button"})
+DROPPED_ATTRIBUTES: frozenset[str] = frozenset({"style", "srcset", "sizes", "nonce", "integrity", "crossorigin", "referrerpolicy", "loading", "decoding", "tabindex"})
+KEPT_DATA_ATTRIBUTES: frozenset[str] = frozenset({"data-testid", "data-test", "data-qa", "data-automation-id", "data-agent-uid"})
+MAX_ATTRIBUTE_CHARS: int = 200
+# Text outside any region is cut into chunks of about this size so it can be ranked piecewise.
+OTHER_CHUNK_CHARS: int = 1500
+# A region that does not fit is truncated only if at least this many tokens are left for it.
+MIN_TRUNCATED_TOKENS: int = 150
+MAX_SELECT_OPTIONS: int = 60
+
+TokenCounter = Callable[[str], int]
+
+@functools.lru_cache(maxsize=None)
+def token_counter(model: str) -> TokenCounter:
+    """
+    Token counter for a model: tiktoken for OpenAI models when it is installed, the chars/token estimate
+    otherwise. tiktoken is optional and only imported once an OpenAI model asks for it.
+    """
+    tiktoken: Any = _optional_module("tiktoken") if model.startswith(("gpt-", "o1", "o3", "o4")) else None
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens
+
+def default_dom_token_budget(model: str, dom_mode: str) -> int:
+    """DOM token budget of a model, see MODEL_DOM_TOKEN_BUDGETS."""
+    for prefix, budget in MODEL_DOM_TOKEN_BUDGETS.items():
+        if model.startswith(prefix):
+            return budget
+    return DEFAULT_DOM_TOKEN_BUDGETS[dom_mode]
+
+class Region:
+    """A contiguous piece of the page (a form, a dialog, a listing card, nav chrome or loose content)."""
+    def __init__(self, kind: str, order: int) -> None:
+        self.kind: str = kind
+        self.order: int = order
+        self.parts: list[str] = []
+        self.text_parts: list[str] = []
+        self.controls: int = 0
+        self.score: float = 0.0
+
+    @property
+    def html(self) -> str:
+        return "".join(self.parts)
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.text_parts)
+
+def _region_kind(tag: str, attrs: dict[str, Optional[str]]) -> Optional[str]:
+    if attrs.get("aria-modal") == "true":
+        return "dialog"
+    role = (attrs.get("role") or "").lower()
+    if role in REGION_ROLES:
+        return REGION_ROLES[role]
+    return REGION_TAGS.get(tag)
+
+def _start_tag(tag: str, attrs: list[tuple[str, Optional[str]]]) -> str:
+    kept: list[str] = []
+    for name, value in attrs:
+        if name in DROPPED_ATTRIBUTES or name.startswith("on") or (name.startswith("data-") and name not in KEPT_DATA_ATTRIBUTES):
+            continue
+        if value is None:
+            kept.append(name)
+            continue
+        if value.startswith("data:"):
+            continue
+        kept.append(f'{name}="{html.escape(value[:MAX_ATTRIBUTE_CHARS], quote=True)}"')
+    attributes = (" " + " ".join(kept)) if kept else ""
+    return f"<{tag}{attributes}>"
+
+class _RegionParser(HTMLParser):
+    """Splits HTML into regions, dropping scripts, styles, comments and noisy attributes on the way."""
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.regions: list[Region] = []
+        self.title: str = ""
+        self.dropped_depth: int = 0
+        self.in_title: bool = False
+        self.region: Optional[Region] = None
+        self.region_tag: str = ""
+        # Tags opened inside the current region, to find where it ends.
+        self.open_tags: list[str] = []
+        self.other: Optional[Region] = None
+
+    def _other(self) -> Region:
+        if self.other is None:
+            self.other = Region("other", len(self.regions))
+            self.regions.append(self.other)
+        return self.other
+
+    def _target(self) -> Region:
+        return self.region if self.region is not None else self._other()
+
+    def _close_region(self) -> None:
+        self.region = None
+        self.region_tag = ""
+        self.open_tags = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if tag == "title" and not self.title:
+            self.in_title = True
+        if self.dropped_depth or tag in DROPPED_TAGS:
+            if tag in DROPPED_TAGS:
+                self.dropped_depth += 1
+            return
+        kind = _region_kind(tag, dict(attrs))
+        # li and tr end tags are optional: a sibling starting at the region's own level closes it.
+        if self.region is not None and tag == self.region_tag and tag in ("li", "tr") and not self.open_tags:
+            self._close_region()
+        if self.region is None and kind is not None:
+            self.region = Region(kind, len(self.regions))
+            self.region_tag = tag
+            self.regions.append(self.region)
+            self.other = None
+            self.region.parts.append(_start_tag(tag, attrs))
+            return
+        target = self._target()
+        target.parts.append(_start_tag(tag, attrs))
+        if tag in CONTROL_TAGS:
+            target.controls += 1
+            label = " ".join(value for name, value in attrs if value and name in ("name", "id", "placeholder", "aria-label", "value", "autocomplete"))
+            if label:
+                target.text_parts.append(label)
+        if self.region is not None and tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+        if self.region is None and self.other is not None and len(self.other.parts) > 1 and sum(map(len, self.other.parts)) > OTHER_CHUNK_CHARS:
+            self.other = None
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title":
+            self.in_title = False
+        if tag in DROPPED_TAGS:
+            self.dropped_depth = max(0, self.dropped_depth - 1)
+            return
+        if self.dropped_depth or tag in VOID_TAGS:
+            return
+        if self.region is None:
+            self._other().parts.append(f"</{tag}>")
+            return
+        if tag in self.open_tags:
+            while self.open_tags and self.open_tags.pop() != tag:
+                pass
+            self.region.parts.append(f"</{tag}>")
+            return
+        # The region's own end tag, or a parent's end tag implicitly closing it.
+        closes_region = tag == self.region_tag
+        self.region.parts.append(f"</{self.region_tag}>")
+        self._close_region()
+        if not closes_region:
+            self._other().parts.append(f"</{tag}>")
+
+    def handle_data(self, data: str) -> None:
+        if self.in_title:
+            self.title += data.strip()
+        if self.dropped_depth:
+            return
+        text = re.sub(r"\s+", " ", data)
+        if not text.strip():
+            return
+        target = self._target()
+        target.parts.append(html.escape(text, quote=False))
+        target.text_parts.append(text.strip())
+
+def _keyword_hits(text: str, keywords: tuple[str, ...]) -> int:
+    lowered = text.lower()
+    return sum(1 for keyword in keywords if keyword in lowered)
+
+def _truncate_html(markup: str, max_tokens: int, count: TokenCounter) -> str:
+    """Cut markup so it fits max_tokens, never inside a tag and preferably between words."""
+    chars = len(markup)
+    while chars > 0:
+        cut = markup[:chars]
+        if cut.rfind("<") > cut.rfind(">"):
+            cut = cut[:cut.rfind("<")]
+        elif cut.rfind(" ") > cut.rfind(">"):
+            cut = cut[:cut.rfind(" ")]
+        if count(cut) <= max_tokens:
+            return cut
+        chars = int(chars * 0.8)
+    return ""
+
+class DomPacker:
+    """
+    Fits the page payload for one phase into a token budget. The page is cut into regions (forms,
+    dialogs, listing cards, nav chrome and loose content), each is scored for the phase by kind,
+    keywords and form controls, and the best ones are packed until the budget is used up. Packed
+    regions keep their document order; the payload says how many were left out.
+    """
+    def __init__(self, phase: str, token_budget: int, count_tokens: TokenCounter = estimate_tokens) -> None:
+        self.phase: str = phase
+        self.token_budget: int = token_budget
+        self.count_tokens: TokenCounter = count_tokens
+        self.keywords: tuple[str, ...] = PHASE_KEYWORDS.get(phase, ())
+        self.kind_weights: dict[str, float] = KIND_WEIGHTS.get(phase, KIND_WEIGHTS["application"])
+        # Last payload and its packed form; the correction turn packs the same page again.
+        self.last: tuple[str, str] = ("", "")
+
+    def pack(self, dom: str, dom_mode: str) -> str:
+        if dom == self.last[0]:
+            return self.last[1]
+        try:
+            payload: Any = json.loads(dom)
+        except json.JSONDecodeError:
+            payload = {"html": dom}
+        if not isinstance(payload, dict):
+            payload = {"html": dom}
+        if dom_mode == "actionable" and "elements" in payload:
+            packed = self._pack_actionable(cast(dict[str, Any], payload))
+        else:
+            packed = self._pack_full(cast(dict[str, Any], payload))
+        logger.debug(f"[DOM Packer] {self.phase}: {len(dom)} chars packed into {len(packed)} chars (budget {self.token_budget} tokens)")
+        self.last = (dom, packed)
+        return packed
+
+    def _score(self, kind_weight: float, text: str, controls: int) -> float:
+        return kind_weight * (1 + 0.5 * min(_keyword_hits(text, self.keywords), 10) + 0.3 * min(controls, 20))
+
+    def _pack_full(self, payload: dict[str, Any]) -> str:
+        parser = _RegionParser()
+        parser.feed(str(payload.get("html", "")))
+        parser.close()
+        select_fields: list[dict[str, Any]] = []
+        for field in payload.get("select_fields", []):
+            options = list(field.get("options") or [])
+            select_fields.append({**field, "options": options[:MAX_SELECT_OPTIONS]} if len(options) > MAX_SELECT_OPTIONS else field)
+        regions = [region for region in parser.regions if region.parts]
+        # The counts are budgeted at the largest they can end up as.
+        packed: dict[str, Any] = {
+            "title": parser.title, "html": "", "select_fields": select_fields, "form_state": payload.get("form_state", []),
+            "omitted_regions": len(regions), "truncated_regions": len(regions)
+        }
+        remaining = self.token_budget - self.count_tokens(json.dumps(packed, ensure_ascii=False))
+        for region in regions:
+            region.score = self._score(self.kind_weights.get(region.kind, 1.0), region.text, region.controls)
+        chosen: dict[int, str] = {}
+        truncated = 0
+        for region in sorted(regions, key=lambda r: (-r.score, r.order)):
+            markup = region.html
+            tokens = self.count_tokens(markup)
+            if tokens > remaining:
+                if remaining < MIN_TRUNCATED_TOKENS:
+                    continue
+                markup = _truncate_html(markup, remaining, self.count_tokens)
+                tokens = self.count_tokens(markup)
+                truncated += 1
+            if markup:
+                chosen[region.order] = markup
+                remaining -= tokens
+        packed["html"] = "\n".join(chosen[order] for order in sorted(chosen))
+        packed["omitted_regions"] = len(regions) - len(chosen)
+        packed["truncated_regions"] = truncated
+        return json.dumps(packed, ensure_ascii=False)
+
+    def _pack_actionable(self, payload: dict[str, Any]) -> str:
+        elements: list[dict[str, Any]] = list(payload["elements"])
+        fixed = {key: value for key, value in payload.items() if key != "elements"}
+        # The envelope the kept elements go into, with the largest omitted count it can end up with.
+        envelope: dict[str, Any] = {**fixed, "elements": [], "omitted_elements": int(payload.get("omitted_elements", 0)) + len(elements)}
+        remaining = self.token_budget - self.count_tokens(json.dumps(envelope, ensure_ascii=False, separators=(",", ":")))
+        scored: list[tuple[float, int, dict[str, Any]]] = []
+        for index, element in enumerate(elements):
+            tag = str(element.get("tag", ""))
+            kind_weight = 2.0 if tag in ("input", "select", "textarea") else 1.5 if tag == "button" else 0.7
+            text = " ".join(str(element.get(key, "")) for key in ("label", "text", "name", "autocomplete", "type", "href"))
+            score = self._score(kind_weight, text, 0) + (1.0 if element.get("required") else 0.0)
+            scored.append((score, index, element))
+        kept: set[int] = set()
+        for _, index, element in sorted(scored, key=lambda item: (-item[0], item[1])):
+            tokens = self.count_tokens(json.dumps(element, ensure_ascii=False, separators=(",", ":"))) + 1
+            if tokens > remaining:
+                continue
+            kept.add(index)
+            remaining -= tokens
+        packed = {
+            **fixed,
+            "elements": [element for index, element in enumerate(elements) if index in kept],
+            "omitted_elements": int(payload.get("omitted_elements", 0)) + len(elements) - len(kept)
+        }
+        return json.dumps(packed, ensure_ascii=False, separators=(",", ":"))
@@ -1,14 +1,149 @@
-from typing import Any
+from typing import Any, AsyncIterable, AsyncIterator, Optional
 from browser_controller import BrowserController
+from playbooks import recordable_step
+from tracing import Span, Tracer
 import logging
 
 logger = logging.getLogger("JobApplicationAgent")
 
+# Per action Playwright timeouts. Selectors are validated before execution, so an action that still
+# cannot find its element should fail fast instead of waiting out Playwright's 30s default per attempt.
+DEFAULT_ACTION_TIMEOUTS_MS: dict[str, float] = {
+    "click": 5000,
+    "submit": 5000,
+    "fill": 3000,
+    "select": 3000,
+    "upload": 5000
+}
+# Actions that act on a page element and therefore have a selector to validate.
+ELEMENT_ACTIONS: tuple[str, ...] = ("click", "submit", "fill", "select", "upload")
+# Actions that only set a field value, so consecutive ones can be applied together in one page evaluation.
+BATCHABLE_ACTIONS: tuple[str, ...] = ("fill", "select")
+
+def selector_checks(instructions: list[dict[str, Any]]) -> tuple[list[int], list[dict[str, str]]]:
+    """Indexes of the instructions that act on an element, and the {"selector", "action"} checks for them."""
+    indexes = [index for index, instr in enumerate(instructions) if instr.get("action") in ELEMENT_ACTIONS]
+    checks = [{"selector": str(instructions[index].get("selector", "")), "action": str(instructions[index]["action"])} for index in indexes]
+    return indexes, checks
+
+def rejection_reasons(instructions: list[dict[str, Any]], indexes: list[int], problems: list[Optional[str]]) -> list[Optional[str]]:
+    reasons: list[Optional[str]] = [None] * len(instructions)
+    for index, problem in zip(indexes, problems):
+        if not instructions[index].get("selector"):
+            problem = "no selector provided"
+        reasons[index] = problem
+    return reasons
+
+def joins_batch(pending: list[dict[str, Any]], instruction: dict[str, Any]) -> bool:
+    """Whether an instruction can be applied together with the pending run of fill/select instructions."""
+    if instruction.get("action") not in BATCHABLE_ACTIONS:
+        return False
+    # A field set twice in one run keeps the ordering of separate calls.
+    return all(pending_instr.get("selector") != instruction.get("selector") for pending_instr in pending)
+
+def fill_items(instructions: list[dict[str, Any]]) -> list[dict[str, str]]:
+    return [
+        {"selector": str(instr.get("selector", "")), "action": str(instr.get("action", "")), "value": str(instr.get("text", ""))}
+        for instr in instructions
+    ]
+
+def loggable(instruction: dict[str, Any]) -> dict[str, Any]:
+    """
+    An instruction as it may be written to the log: the '$placeholder' template instead of its resolved
+    text, and the value of a fill without one (e.g. a password the LLM wrote out literally) masked.
+    """
+    if "text_template" in instruction:
+        shown = {key: value for key, value in instruction.items() if key != "text_template"}
+        return {**shown, "text": instruction["text_template"]}
+    if instruction.get("action") == "fill" and instruction.get("text"):
+        return {**instruction, "text": "***"}
+    return instruction
+
 class InstructionExecutor:
-    def __init__(self, browser: BrowserController) -> None:
+    def __init__(self, browser: BrowserController, action_timeouts_ms: Optional[dict[str, float]] = None) -> None:
         self.browser: BrowserController = browser
-    
-    def execute(self, instruction: dict[str, Any]) -> bool:
+        self.action_timeouts_ms: dict[str, float] = {**DEFAULT_ACTION_TIMEOUTS_MS, **(action_timeouts_ms or {})}
+        # Successfully executed steps of the current phase while a playbook recording is running.
+        self.recorded_steps: Optional[list[dict[str, Any]]] = None
+
+    def start_recording(self) -> None:
+        self.recorded_steps = []
+
+    def discard_recording(self) -> None:
+        """Abandon the running recording, e.g. after a manual intervention that cannot be replayed."""
+        self.recorded_steps = None
+
+    def stop_recording(self) -> Optional[list[dict[str, Any]]]:
+        """Return the steps recorded since start_recording, or None if the recording was discarded."""
+        steps = self.recorded_steps
+        self.recorded_steps = None
+        return steps
+
+    async def validate(self, instructions: list[dict[str, Any]]) -> list[Optional[str]]:
+        """
+        Pre-flight check of a batch of instructions in a single page evaluation. Returns a rejection
+        reason per instruction (None when it can be executed), so bad selectors are caught before
+        paying for retries and action timeouts.
+        """
+        indexes, checks = selector_checks(instructions)
+        problems = await self.browser.validate_selectors(checks) if checks else []
+        return rejection_reasons(instructions, indexes, problems)
+
+    async def execute_all(self, instructions: AsyncIterable[dict[str, Any]], batch_fills: bool = False) -> AsyncIterator[tuple[dict[str, Any], bool]]:
+        """
+        Execute instructions in order, yielding (instruction, success) for each. 'intervene' is yielded
+        unexecuted with success False, for the caller to hand over to the user.
+
+        With batch_fills, consecutive fill/select instructions are applied in one page evaluation via
+        execute_batch. The source is read ahead until such a run ends, so only enable it for responses
+        that were received in full.
+        """
+        pending: list[dict[str, Any]] = []
+        async for instr in instructions:
+            if pending and not joins_batch(pending, instr):
+                for pending_instr, success in zip(pending, await self.execute_batch(pending)):
+                    yield pending_instr, success
+                pending = []
+            if batch_fills and joins_batch(pending, instr):
+                pending.append(instr)
+            elif instr.get("action") == "intervene":
+                yield instr, False
+            else:
+                yield instr, await self.execute(instr)
+        if pending:
+            for pending_instr, success in zip(pending, await self.execute_batch(pending)):
+                yield pending_instr, success
+
+    async def execute_batch(self, instructions: list[dict[str, Any]]) -> list[bool]:
+        """
+        Apply a run of fill/select instructions in a single browser round trip and return per-instruction
+        success. Fields the page could not set are retried on their own through execute, i.e. with
+        Playwright's actionability waits and retries.
+        """
+        if len(instructions) == 1:
+            return [await self.execute(instructions[0])]
+        logger.info(f"[Executor] Executing batch of {len(instructions)} fill/select instructions")
+        with Tracer.shared().span("execute_batch") as span:
+            try:
+                errors: list[Optional[str]] = await self.browser.fill_many(fill_items(instructions))
+                await self.browser.settle("fill")
+            except Exception as e:
+                logger.warning(f"[Executor] ⚠️ Batch fill failed, falling back to one call per field: with exeception: {e}")
+                errors = ["batch evaluation failed"] * len(instructions)
+            span.set(size=len(instructions), applied=errors.count(None))
+        results: list[bool] = []
+        for instr, error in zip(instructions, errors):
+            if error is None:
+                if self.recorded_steps is not None:
+                    self.recorded_steps.append(recordable_step(instr))
+                results.append(True)
+            else:
+                logger.warning(f"[Executor] ⚠️ Batch {instr.get('action')} on {instr.get('selector')} failed ({error}), retrying on its own")
+                results.append(await self.execute(instr))
+        logger.info(f"[Executor] ✅ Batch applied {errors.count(None)}/{len(instructions)} fields in one round trip")
+        return results
+
+    async def execute(self, instruction: dict[str, Any]) -> bool:
         """
         Executes a single instruction. Returns True if the instruction was successfully executed,
         False if there was an error or the action is 'done'.
@@ -20,6 +155,12 @@ class InstructionExecutor:
             "text": "value to fill"  # only needed if action is "fill"
         }
         """
+        with Tracer.shared().span("execute", action=str(instruction.get("action", ""))) as span:
+            success = await self._execute(instruction, span)
+            span.set(success=success)
+        return success
+
+    async def _execute(self, instruction: dict[str, Any], span: Span) -> bool:
         action: str = instruction.get("action", "")
         selector: str = instruction.get("selector", "")
         text: str = instruction.get("text", "")
@@ -27,28 +168,34 @@ class InstructionExecutor:
         if not selector and action!="done":
             logger.error("[Executor] ❌ No selector provided.")
             return False
-        
-        logger.info(f"[Executor] Executing: {instruction}")
+
+        logger.info(f"[Executor] Executing: {loggable(instruction)}")
         for attempt in range(3):  # Retry logic
             if attempt>0:
                 logger.warning(f"[Executor] Retrying instruction: Attempt {attempt+1}")
+                span.set(retries=attempt)
+                Tracer.shared().count("action_retries", action=action)
             try:
+                timeout_ms = self.action_timeouts_ms.get(action)
                 if action == "click":
-                    self.browser.click(selector)
+                    await self.browser.click(selector, timeout_ms)
                 elif action == "fill":
-                    self.browser.fill(selector, text)
+                    await self.browser.fill(selector, text, timeout_ms)
                 elif action == "select":
-                    self.browser.select(selector, text)
+                    await self.browser.select(selector, text, timeout_ms)
                 elif action == "upload":
-                    self.browser.upload(selector, text)
+                    await self.browser.upload(selector, text, timeout_ms)
                 elif action == "submit":
-                    self.browser.click(selector)
+                    await self.browser.click(selector, timeout_ms)
                 elif action == "done":
                     logger.info("[Executor] ✅ Phase complete.")
                 else:
                     logger.error(f"[Executor] ❌ Unknown action: {action}")
                     return False
+                await self.browser.settle(action)
                 logger.info(f"[Executor] ✅ Success: {action} on {selector}")
+                if self.recorded_steps is not None:
+                    self.recorded_steps.append(recordable_step(instruction))
                 return True
             except Exception as e:
                 logger.warning(f"[Executor] ⚠️ Attempt {attempt+1} failed for {action} on {selector}: with exeception: {e}")
@@ -0,0 +1,250 @@
+"""
+Queue-driven mode for many applicant profiles: `python fleet.py`.
+
+Every profile is a directory under PROFILES_DIR holding its own applicant_preferences.json,
+applicant_data.json and applicant_credentials.json. Its sessions, playbooks and job index are kept
+next to them, since they belong to that applicant's accounts and searches. (profile, site) work items go into a durable
+SQLite queue; FLEET_WORKERS processes, each with its own browser and LLM agents, lease items from it
+until it is drained and run them on main's async site pipeline, one at a time. All workers share one LLM rate limiter, so LLM load is capped across the fleet.
+A worker that needs a human parks on a queued intervention, which is resumed or skipped from the
+supervisor's console or control page while the other workers carry on.
+"""
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.process import BaseProcess
+import os
+import threading
+import time
+from typing import Any, Optional
+from browser_controller import launch_browser
+from intervention_control import start_control_surfaces
+from intervention_queue import InterventionQueue
+from job_index import JobIndex
+from llm_agent import LLMAgent
+from llm_cache import LLMResponseCache
+from playbooks import PlaybookStore
+from rate_limiter import LLMRateLimiter
+from session_store import SessionStore
+from tracing import Tracer
+from request_blocking import RequestBlocker
+from work_queue import WorkQueue
+from playwright.async_api import Browser, async_playwright
+from main import (
+    INTERVENTION_CONSOLE, INTERVENTION_HTTP_PORT, INTERVENTIONS_PATH, JOB_MAX_ATTEMPTS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS, PROCESS_STARTED, build_agents, build_artifacts, build_llm_clients, build_model_router,
+    build_request_blocker, load_json, log_startup, run_site, setup_logging, start_model_warm_up, startup_stage
+)
+
+PROFILES_DIR = "profiles"
+WORK_QUEUE_PATH = "work_queue.sqlite3"
+FLEET_WORKERS = os.cpu_count() or 2
+FLEET_HEADLESS = True
+# A worker renews its lease every LEASE_SECONDS / 3; a lease that runs out is recovered by another worker.
+LEASE_SECONDS = 900
+WORK_ITEM_MAX_ATTEMPTS = 3
+WORK_ITEM_RETRY_DELAY_SECONDS = 120
+# Retry items that failed in earlier runs.
+RETRY_FAILED_ITEMS = False
+# Shared by every worker: in-flight LLM requests and request starts per minute (None for no rate cap).
+FLEET_MAX_CONCURRENT_LLM_REQUESTS = 4
+FLEET_LLM_REQUESTS_PER_MINUTE: Optional[float] = None
+# A request that cannot get a slot for this long fails (and is handled like any failed LLM call) instead of hanging.
+FLEET_LLM_SLOT_TIMEOUT_SECONDS: Optional[float] = 600
+# Crashed workers are replaced, up to this many times per run.
+MAX_WORKER_RESTARTS = 10
+SUPERVISOR_POLL_SECONDS = 2.0
+IDLE_POLL_SECONDS = 5.0
+# A worker waits this long for a human to resolve its intervention before the item counts as failed
+# (its lease is renewed meanwhile). None waits indefinitely.
+FLEET_INTERVENTION_TIMEOUT_SECONDS: Optional[float] = 1800
+
+logger = logging.getLogger("JobApplicationAgent")
+
+def profile_path(profile: str, filename: str) -> str:
+    return os.path.join(PROFILES_DIR, profile, filename)
+
+def list_profiles() -> list[str]:
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    return sorted(name for name in os.listdir(PROFILES_DIR) if os.path.exists(profile_path(name, "applicant_preferences.json")))
+
+def enqueue_profiles(queue: WorkQueue) -> None:
+    added = 0
+    for profile in list_profiles():
+        for site in load_json(profile_path(profile, "applicant_preferences.json"))["sites"]:
+            added += queue.enqueue(profile, site)
+    if RETRY_FAILED_ITEMS:
+        requeued = queue.requeue_failed()
+        if requeued:
+            logger.info(f"[Fleet] Requeued {requeued} failed work items")
+    logger.info(f"[Fleet] Enqueued {added} new work items, queue: {queue.counts()}")
+
+def worker_log_path(worker: str) -> str:
+    """Log file of a worker process, processes must not rotate a shared one."""
+    return f"agent-{worker}.log"
+
+class LeaseHeartbeat:
+    """Renews the lease of a work item on a background thread, with its own queue connection, while the worker runs it."""
+    def __init__(self, item_id: int, worker: str) -> None:
+        self.item_id: int = item_id
+        self.worker: str = worker
+        self.stopped: threading.Event = threading.Event()
+        self.thread: threading.Thread = threading.Thread(target=self._run, name=f"lease-{item_id}", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        queue = WorkQueue(WORK_QUEUE_PATH, LEASE_SECONDS, WORK_ITEM_MAX_ATTEMPTS, WORK_ITEM_RETRY_DELAY_SECONDS)
+        try:
+            while not self.stopped.wait(LEASE_SECONDS / 3):
+                if not queue.renew(self.item_id, self.worker):
+                    logger.warning(f"[Fleet] ⚠️ {self.worker} lost the lease of work item {self.item_id}")
+                    return
+        finally:
+            queue.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+async def run_item(
+    item: dict[str, Any],
+    browser: Browser,
+    agents: tuple[LLMAgent, LLMAgent, LLMAgent],
+    request_blocker: Optional[RequestBlocker]
+) -> bool:
+    profile, site = item["profile"], item["site"]
+    job_index = JobIndex(profile_path(profile, "jobs.sqlite3"), JOB_MAX_ATTEMPTS)
+    try:
+        return await run_site(
+            site, browser, agents,
+            load_json(profile_path(profile, "applicant_preferences.json")),
+            load_json(profile_path(profile, "applicant_data.json")),
+            load_json(profile_path(profile, "applicant_credentials.json")),
+            PlaybookStore(profile_path(profile, "playbooks")),
+            SessionStore(profile_path(profile, "sessions")),
+            job_index,
+            request_blocker
+        )
+    finally:
+        job_index.close()
+
+def run_worker(worker: str, rate_limiter: LLMRateLimiter) -> None:
+    """Worker process: lease (profile, site) items and run them on this worker's browser until the queue is drained."""
+    log_listener = setup_logging(worker_log_path(worker))
+    artifacts = build_artifacts()
+    try:
+        asyncio.run(work(worker, rate_limiter))
+    finally:
+        artifacts.close()
+        log_listener.stop()
+
+async def work(worker: str, rate_limiter: LLMRateLimiter) -> None:
+    stages: dict[str, float] = {"imports": time.perf_counter() - PROCESS_STARTED}
+    with startup_stage(stages, "setup"):
+        tracer = Tracer(f"agent_trace-{worker}.jsonl", f"agent_metrics-{worker}.prom")
+        Tracer.set_shared(tracer)
+        llm_clients = build_llm_clients(rate_limiter)
+        model_router = build_model_router()
+        model_warm_up = start_model_warm_up(llm_clients, model_router)
+        queue = WorkQueue(WORK_QUEUE_PATH, LEASE_SECONDS, WORK_ITEM_MAX_ATTEMPTS, WORK_ITEM_RETRY_DELAY_SECONDS)
+        interventions = InterventionQueue(INTERVENTIONS_PATH, FLEET_INTERVENTION_TIMEOUT_SECONDS)
+        InterventionQueue.set_shared(interventions)
+        llm_cache = LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+        request_blocker = build_request_blocker()
+    with startup_stage(stages, "agents"):
+        agents = build_agents(llm_cache, llm_clients, model_router)
+    try:
+        async with async_playwright() as playwright:
+            with startup_stage(stages, "browser_launch"):
+                browser = await launch_browser(playwright, headless=FLEET_HEADLESS)
+            log_startup(stages, model_warm_up)
+            logger.info(f"[Fleet] {worker} started (pid {os.getpid()})")
+            while True:
+                item = queue.lease(worker)
+                if item is None:
+                    if not queue.has_pending():
+                        break
+                    await asyncio.sleep(IDLE_POLL_SECONDS)
+                    continue
+                logger.info(f"[Fleet] {worker} working on {item['profile']} / {item['site']} (attempt {item['attempts']})")
+                heartbeat = LeaseHeartbeat(item["id"], worker)
+                try:
+                    completed = await run_item(item, browser, agents, request_blocker)
+                except Exception as e:
+                    logger.exception(f"[Fleet] ❌ {worker} failed on {item['profile']} / {item['site']}")
+                    queue.fail(item["id"], worker, repr(e))
+                else:
+                    if completed:
+                        queue.complete(item["id"], worker)
+                    else:
+                        queue.fail(item["id"], worker, "site did not reach the application phase")
+                finally:
+                    heartbeat.stop()
+            await browser.close()
+    finally:
+        logger.info(f"[Fleet] {worker} stopping")
+        llm_cache.close()
+        llm_clients.log_stats()
+        await llm_clients.aclose()
+        model_router.log_stats()
+        if request_blocker is not None:
+            request_blocker.log_stats()
+        tracer.log_summary()
+        tracer.close()
+        queue.close()
+        interventions.close()
+
+def main() -> None:
+    queue = WorkQueue(WORK_QUEUE_PATH, LEASE_SECONDS, WORK_ITEM_MAX_ATTEMPTS, WORK_ITEM_RETRY_DELAY_SECONDS)
+    enqueue_profiles(queue)
+    counts = queue.counts()
+    pending = counts["queued"] + counts["leased"]
+    if not pending:
+        logger.info("[Fleet] Nothing to do.")
+        return
+    interventions = InterventionQueue(INTERVENTIONS_PATH)
+    interventions.expire_pending()
+    intervention_server = start_control_surfaces(interventions, INTERVENTION_CONSOLE, INTERVENTION_HTTP_PORT)
+    context = multiprocessing.get_context("spawn")
+    rate_limiter = LLMRateLimiter(FLEET_MAX_CONCURRENT_LLM_REQUESTS, FLEET_LLM_REQUESTS_PER_MINUTE, context, FLEET_LLM_SLOT_TIMEOUT_SECONDS)
+    workers: dict[str, BaseProcess] = {}
+
+    def start(worker: str) -> None:
+        process = context.Process(target=run_worker, args=(worker, rate_limiter), name=worker)
+        process.start()
+        workers[worker] = process
+
+    for index in range(min(FLEET_WORKERS, pending)):
+        start(f"worker-{index + 1}")
+    logger.info(f"[Fleet] Started {len(workers)} workers for {pending} work items")
+    restarts = 0
+    while workers:
+        time.sleep(SUPERVISOR_POLL_SECONDS)
+        for worker, process in list(workers.items()):
+            if process.is_alive():
+                continue
+            del workers[worker]
+            if process.exitcode == 0:
+                continue
+            recovered = queue.release_worker(worker)
+            interventions.expire_pending(worker)
+            slots = rate_limiter.release_worker(process.pid) if process.pid is not None else 0
+            logger.warning(f"[Fleet] ⚠️ {worker} exited with code {process.exitcode}, {recovered} leased items and {slots} LLM slots recovered")
+            if queue.has_pending() and restarts < MAX_WORKER_RESTARTS:
+                restarts += 1
+                start(worker)
+    logger.info(f"[Fleet] Done, queue: {queue.counts()}")
+    queue.close()
+    if intervention_server is not None:
+        intervention_server.close()
+    interventions.close()
+
+if __name__ == "__main__":
+    log_listener = setup_logging()
+    artifacts = build_artifacts()
+    try:
+        main()
+    finally:
+        artifacts.close()
+        log_listener.stop()
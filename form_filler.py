@@ -0,0 +1,259 @@
+import glob
+import json
+import logging
+import os
+import re
+from typing import Any, Optional, cast
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Placeholder templates for common application form fields and the field names they go by. The index
+# is first derived from the extension's captures (see captured_field_templates), this table only covers
+# fields no capture has seen yet: there are no captures before the first recorded application, and a
+# template learned from one site's labels does not reach another site's wording. Names are written like
+# the keys content.js inferKeyName derives from field labels, and every template references a key of
+# applicant_data_example.json. A template is only used when it resolves fully against applicant_data.json.
+FIELD_SYNONYMS: dict[str, tuple[str, ...]] = {
+    "$first_name": ("first_name", "given_name", "forename", "fname", "legal_first_name"),
+    "$last_name": ("last_name", "surname", "family_name", "lname", "legal_last_name"),
+    "$first_name $last_name": ("name", "full_name", "legal_name", "applicant_name", "candidate_name"),
+    "$email": ("email", "e_mail", "email_address", "mail", "confirm_email"),
+    "$phone": ("phone", "phone_number", "mobile", "mobile_number", "mobile_phone", "telephone", "cell_phone", "contact_number"),
+    "$Address_City": ("city", "town", "current_city", "city_of_residence"),
+    "$Address_Country": ("country", "country_of_residence"),
+    "$Nationality": ("nationality", "citizenship"),
+    "$education_0_degree": ("degree", "highest_degree", "level_of_education", "education_level"),
+    "$education_0_institution": ("school", "university", "college", "institution", "school_name", "university_name"),
+    "$education_0_graduation_year": ("graduation_year", "year_of_graduation"),
+    "$work_experience_0_company": ("current_company", "current_employer", "employer", "company_name", "most_recent_employer"),
+    "$work_experience_0_role": ("current_title", "current_job_title", "current_role", "current_position"),
+    "$resume_file": ("resume", "cv", "resume_cv", "upload_resume", "attach_resume"),
+    "$cover_letter_file": ("cover_letter", "upload_cover_letter", "attach_cover_letter")
+}
+# Attributes of a captured interactable (content.js extractVisibleInteractablesAndBuildUidMapping) that name
+# its field, in the order inferKeyName tries them.
+CAPTURED_NAME_ATTRIBUTES: tuple[str, ...] = ("label", "ariaLabel", "placeholder", "name")
+# Standard autocomplete tokens (the last token of the attribute) and the template they ask for.
+AUTOCOMPLETE_TEMPLATES: dict[str, str] = {
+    "given-name": "$first_name",
+    "family-name": "$last_name",
+    "name": "$first_name $last_name",
+    "email": "$email",
+    "tel": "$phone",
+    "tel-national": "$phone",
+    "address-level2": "$Address_City",
+    "country": "$Address_Country",
+    "country-name": "$Address_Country",
+    "organization": "$work_experience_0_company",
+    "organization-title": "$work_experience_0_role"
+}
+# Input types that tell what a field is about when its label does not.
+INPUT_TYPE_TEMPLATES: dict[str, str] = {
+    "email": "$email",
+    "tel": "$phone"
+}
+# Controls the filler never touches: choices and consent need reading the question, passwords belong to login.
+SKIPPED_INPUT_TYPES: tuple[str, ...] = ("hidden", "submit", "button", "reset", "image", "checkbox", "radio", "password", "search")
+# Words that pad a label without telling what the field is.
+_FILLER_WORDS: frozenset[str] = frozenset(("your", "enter", "please", "the", "a", "an", "required", "optional", "here", "type", "what", "is"))
+_CAMEL_CASE_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_NON_WORD_PATTERN = re.compile(r"[^a-z0-9]+")
+_OPTION_PATTERN = re.compile(r"^(.*) \((.*)\)$")
+
+def field_key(text: str) -> str:
+    """Normalised name of a field label, name attribute or applicant key, e.g. 'Your First Name *' -> 'first_name'."""
+    words = _NON_WORD_PATTERN.split(_CAMEL_CASE_PATTERN.sub(" ", text).lower())
+    return "_".join(word for word in words if word and word not in _FILLER_WORDS)
+
+def flatten_values(data: dict[str, Any], parent_key: str = "", sep: str = "_") -> dict[str, Any]:
+    """
+    Flatten nested applicant data into '$placeholder' keys. Lists are kept joined under their own key
+    and their items are also indexed like the capture extension does, e.g. 'education_0_degree'.
+    """
+    items: dict[str, Any] = {}
+    for key, value in data.items():
+        new_key = f"{parent_key}{sep}{key}" if parent_key else key
+        if isinstance(value, dict):
+            items.update(flatten_values(cast(dict[str, Any], value), new_key, sep))
+        elif isinstance(value, list):
+            values = cast(list[Any], value)
+            items[new_key] = ", ".join(map(str, values))
+            items.update(flatten_values({str(index): item for index, item in enumerate(values)}, new_key, sep))
+        else:
+            items[new_key] = value
+    return items
+
+def context_values(context: dict[str, Any]) -> dict[str, Any]:
+    """
+    Flattened values a phase's placeholders resolve against: the credentials of the site being logged
+    into, the preferences and the applicant data, later ones taking precedence on equal keys.
+    """
+    credentials = cast(dict[str, Any], context.get("job_seeker_credentials") or {})
+    values: dict[str, Any] = {}
+    for source in (
+        credentials.get(str(context.get("site"))),
+        context.get("job_seeker_preferences"),
+        context.get("applicant_preferences"),
+        context.get("applicant_data")
+    ):
+        if isinstance(source, dict):
+            values.update(flatten_values(cast(dict[str, Any], source)))
+    return values
+
+def captured_field_templates(captures_dir: str) -> dict[str, str]:
+    """
+    Field names and the placeholder the user filled them with in the capture extension's exports
+    (instruction-*.json, {"pages": [{"interactables": [...], "actions": [...]}]}) found in captures_dir,
+    e.g. {"first_name": "$first_name", "town_city": "$Address_City"}.
+    """
+    templates: dict[str, str] = {}
+    for path in sorted(glob.glob(os.path.join(captures_dir, "*.json"))):
+        try:
+            with open(path) as f:
+                capture: Any = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[Form Filler] ⚠️ Could not read capture {path}: {e}")
+            continue
+        if not isinstance(capture, dict):
+            continue
+        for page in cast(list[dict[str, Any]], cast(dict[str, Any], capture).get("pages", [])):
+            interactables = {str(item.get("uid")): item for item in cast(list[dict[str, Any]], page.get("interactables", []))}
+            for action in cast(list[dict[str, Any]], page.get("actions", [])):
+                value = action.get("value")
+                element = interactables.get(str(action.get("id")))
+                if action.get("action") != "fill" or not isinstance(value, str) or not value.startswith("$") or element is None:
+                    continue
+                for attribute in CAPTURED_NAME_ATTRIBUTES:
+                    name = field_key(str(element.get(attribute) or ""))
+                    if name and name != "unknown_field":
+                        templates.setdefault(name, value)
+    if templates:
+        logger.info(f"[Form Filler] {len(templates)} field names learned from the captures in {captures_dir}")
+    return templates
+
+class PlaceholderResolver:
+    """
+    Resolves '$key' placeholders against flattened values, as the whole text or embedded in it such as
+    '$first_name $last_name'. The pattern is compiled once from the known keys, longest first, so keys
+    with dots or slashes match in full and a '$' in free text (e.g. '$5000') is left alone.
+    """
+    def __init__(self, values: dict[str, Any]) -> None:
+        self.values: dict[str, Any] = values
+        keys = sorted(values, key=len, reverse=True)
+        self.pattern: Optional[re.Pattern[str]] = re.compile(r"\$(" + "|".join(map(re.escape, keys)) + r")(?!\w)") if keys else None
+
+    def resolve(self, text: Any) -> Any:
+        """The text with its placeholders replaced. A placeholder that is the whole text keeps the value's type."""
+        if not isinstance(text, str) or self.pattern is None or "$" not in text:
+            return text
+        whole = self.pattern.fullmatch(text)
+        if whole is not None:
+            return self.values[whole.group(1)]
+        return self.pattern.sub(lambda match: str(self.values[match.group(1)]), text)
+
+    def resolves_fully(self, template: str) -> bool:
+        """Whether every placeholder of a template is known and has a non-empty value."""
+        if self.pattern is None:
+            return False
+        keys = self.pattern.findall(template)
+        return bool(keys) and template.count("$") == len(keys) and all(str(self.values[key]).strip() for key in keys)
+
+class FormFiller:
+    """
+    Answers the application form fields it recognises without the LLM. A field is recognised by its
+    autocomplete attribute, label, name attribute or input type, looked up in an index of the applicant
+    data keys, the field names of the extension's captures and FIELD_SYNONYMS, in that order of
+    precedence; only empty fields whose template resolves fully are filled, everything
+    else is left for the LLM. Fields the LLM fills with a placeholder are learned for the rest of the run.
+    Works on the distilled page of dom mode "actionable".
+    """
+    def __init__(self, applicant_values: dict[str, Any], captured_templates: Optional[dict[str, str]] = None) -> None:
+        self.resolver: PlaceholderResolver = PlaceholderResolver(applicant_values)
+        self.index: dict[str, str] = {}
+        # Keys of applicant_data.json first: files built from the extension's captures are keyed by field label.
+        for key in applicant_values:
+            self.index.setdefault(field_key(key), f"${key}")
+        for name, template in (captured_templates or {}).items():
+            self.index.setdefault(name, template)
+        for template, names in FIELD_SYNONYMS.items():
+            for name in names:
+                self.index.setdefault(field_key(name), template)
+        # Elements of the last page seen, by selector, and the fields already handled on the current listing.
+        self.elements: dict[str, dict[str, Any]] = {}
+        self.handled: set[str] = set()
+
+    def _template_for(self, element: dict[str, Any]) -> Optional[str]:
+        autocomplete = str(element.get("autocomplete", "")).lower().split()
+        candidates: list[Optional[str]] = [AUTOCOMPLETE_TEMPLATES.get(autocomplete[-1]) if autocomplete else None]
+        candidates += [self.index.get(field_key(str(element[attribute]))) for attribute in ("label", "name") if element.get(attribute)]
+        candidates.append(INPUT_TYPE_TEMPLATES.get(str(element.get("type", ""))))
+        is_file = element.get("type") == "file"
+        for template in candidates:
+            if template is None or template.endswith("_file") != is_file:
+                continue
+            if self.resolver.resolves_fully(template):
+                return template
+        return None
+
+    @staticmethod
+    def _option_value(options: list[str], value: str) -> Optional[str]:
+        """The option of a select field whose value or visible text is `value`."""
+        wanted = value.strip().lower()
+        for option in options:
+            match = _OPTION_PATTERN.match(option)
+            option_value, option_text = (match.group(1), match.group(2)) if match else (option, option)
+            if wanted in (option_value.strip().lower(), option_text.strip().lower()):
+                return option_value
+        return None
+
+    def _instruction_for(self, element: dict[str, Any]) -> Optional[dict[str, Any]]:
+        tag = element.get("tag")
+        selector = str(element.get("selector", ""))
+        if tag not in ("input", "textarea", "select") or element.get("disabled") or element.get("value") or selector in self.handled:
+            return None
+        if element.get("type") in SKIPPED_INPUT_TYPES:
+            return None
+        template = self._template_for(element)
+        if template is None:
+            return None
+        value = str(self.resolver.resolve(template))
+        if tag == "select":
+            option = self._option_value(cast(list[str], element.get("options", [])), value)
+            if option is None:
+                return None
+            return {"action": "select", "selector": selector, "text": option, "text_template": template}
+        action = "upload" if element.get("type") == "file" else "fill"
+        return {"action": action, "selector": selector, "text": value, "text_template": template}
+
+    def instructions_for(self, dom: str) -> list[dict[str, Any]]:
+        """Fill/select/upload instructions for the fields of the page that can be answered from the applicant data."""
+        try:
+            parsed: Any = json.loads(dom)
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(parsed, dict) or "elements" not in parsed:
+            return []
+        self.elements = {str(element.get("selector")): element for element in cast(dict[str, Any], parsed)["elements"]}
+        instructions: list[dict[str, Any]] = []
+        for element in self.elements.values():
+            instruction = self._instruction_for(element)
+            if instruction is not None:
+                instructions.append(instruction)
+                self.handled.add(instruction["selector"])
+        return instructions
+
+    def learn(self, instruction: dict[str, Any]) -> None:
+        """Remember the field an executed LLM instruction filled with a placeholder, keyed by the field's label."""
+        template = instruction.get("text_template")
+        element = self.elements.get(str(instruction.get("selector")))
+        if instruction.get("action") not in ("fill", "select") or not isinstance(template, str) or element is None or not element.get("label"):
+            return
+        name = field_key(str(element["label"]))
+        if name and name not in self.index:
+            self.index[name] = template
+            logger.debug(f"[Form Filler] Learned field '{name}' -> {template}")
+
+    def reset(self) -> None:
+        """Forget the fields handled so far, e.g. when moving on to another listing."""
+        self.elements = {}
+        self.handled.clear()
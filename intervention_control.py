@@ -0,0 +1,181 @@
+import hmac
+import html
+import json
+import logging
+import secrets
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs
+from intervention_queue import InterventionQueue, RESUMED, SKIPPED
+
+logger = logging.getLogger("JobApplicationAgent")
+
+PAGE_REFRESH_SECONDS = 5
+
+def describe(intervention: dict[str, object]) -> str:
+    return f"#{intervention['id']} [{intervention['phase']}] {intervention['site']} ({intervention['owner']}, waiting {intervention['waiting_seconds']}s): {intervention['reason']}"
+
+class InterventionConsole:
+    """
+    Terminal control surface, reading commands on a background thread:
+      Enter          resume the only pending intervention, or list them when there are several
+      <id>           resume intervention <id>
+      skip <id>      skip intervention <id>, the site gives up on what it was doing
+      list           list the pending interventions
+    """
+    def __init__(self, queue: InterventionQueue) -> None:
+        self.queue: InterventionQueue = queue
+        self.thread: threading.Thread = threading.Thread(target=self._run, name="intervention-console", daemon=True)
+        self.thread.start()
+
+    def _list(self) -> None:
+        pending = self.queue.pending()
+        if not pending:
+            logger.info("[Interventions] No pending interventions")
+        for intervention in pending:
+            logger.info(f"[Interventions] {describe(intervention)}")
+
+    def _resolve(self, argument: str, status: str) -> None:
+        if not argument.lstrip("#").isdigit():
+            logger.info("[Interventions] Commands: Enter, <id>, skip <id>, list")
+            return
+        intervention_id = int(argument.lstrip("#"))
+        if self.queue.resolve(intervention_id, status):
+            logger.info(f"[Interventions] Intervention #{intervention_id} {status}")
+        else:
+            logger.info(f"[Interventions] No pending intervention #{intervention_id}")
+
+    def handle(self, line: str) -> None:
+        command, _, argument = line.strip().partition(" ")
+        if not command:
+            pending = self.queue.pending()
+            if len(pending) == 1:
+                self._resolve(str(pending[0]["id"]), RESUMED)
+            else:
+                self._list()
+        elif command in ("list", "l"):
+            self._list()
+        elif command in ("skip", "s"):
+            self._resolve(argument.strip(), SKIPPED)
+        elif command in ("resume", "r"):
+            self._resolve(argument.strip(), RESUMED)
+        else:
+            self._resolve(command, RESUMED)
+
+    def _run(self) -> None:
+        for line in sys.stdin:
+            try:
+                self.handle(line)
+            except Exception:
+                logger.exception("[Interventions] ❌ Console command failed")
+
+class InterventionServer:
+    """
+    Localhost control surface: a page listing the pending interventions with resume/skip buttons at
+    http://host:port/, their JSON at /interventions and POST /interventions/<id>/resume|skip.
+
+    The job sites open in the automated browser can send requests to localhost too. Requests must name
+    the server itself as Host (against DNS rebinding), and a POST must come from the control page:
+    no foreign Origin, and the per-run token the page embeds in its forms.
+    """
+    def __init__(self, queue: InterventionQueue, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self.queue: InterventionQueue = queue
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), self._handler())
+        self.url: str = f"http://{host}:{self.server.server_address[1]}/"
+        self.hosts: frozenset[str] = frozenset(f"{name}:{self.server.server_address[1]}" for name in (host, "127.0.0.1", "localhost"))
+        self.token: str = secrets.token_urlsafe(32)
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve_forever, name="intervention-server", daemon=True)
+        self.thread.start()
+        logger.info(f"[Interventions] Control page at {self.url}")
+
+    def _page(self) -> str:
+        token = f"<input type='hidden' name='token' value='{self.token}'>"
+        rows = "".join(
+            f"<tr><td>#{item['id']}</td><td>{html.escape(str(item['site']))}</td><td>{html.escape(str(item['phase']))}</td>"
+            f"<td>{html.escape(str(item['owner']))}</td><td>{item['waiting_seconds']}s</td><td>{html.escape(str(item['reason']))}</td>"
+            f"<td><form method='post' action='/interventions/{item['id']}/resume'>{token}<button>Resume</button></form>"
+            f"<form method='post' action='/interventions/{item['id']}/skip'>{token}<button>Skip</button></form></td></tr>"
+            for item in self.queue.pending()
+        ) or "<tr><td colspan='7'>No pending interventions</td></tr>"
+        return (
+            f"<!doctype html><html><head><meta http-equiv='refresh' content='{PAGE_REFRESH_SECONDS}'><title>Interventions</title></head><body>"
+            "<h1>Pending interventions</h1><p>Take the step in the browser of the site, then resume it here. Skip gives up on what the site was doing.</p>"
+            f"<table border='1' cellpadding='4'><tr><th>Id</th><th>Site</th><th>Phase</th><th>Worker</th><th>Waiting</th><th>Reason</th><th></th></tr>{rows}</table>"
+            "</body></html>"
+        )
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        control = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: str, content_type: str) -> None:
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _from_this_server(self) -> bool:
+                if self.headers.get("Host") in control.hosts:
+                    return True
+                logger.warning(f"[Interventions] ⚠️ Rejected a request for host {self.headers.get('Host')!r}")
+                self._send(403, "forbidden", "text/plain")
+                return False
+
+            def _from_control_page(self) -> bool:
+                origin = self.headers.get("Origin")
+                length = int(self.headers.get("Content-Length") or 0)
+                token = parse_qs(self.rfile.read(length).decode("utf-8", "replace")).get("token", [""])[0]
+                if (origin is None or origin.removeprefix("http://") in control.hosts) and hmac.compare_digest(token, control.token):
+                    return True
+                logger.warning(f"[Interventions] ⚠️ Rejected a POST to {self.path} that did not come from the control page (origin {origin!r})")
+                self._send(403, "forbidden", "text/plain")
+                return False
+
+            def do_GET(self) -> None:
+                if not self._from_this_server():
+                    return
+                if self.path == "/":
+                    self._send(200, control._page(), "text/html; charset=utf-8")
+                elif self.path == "/interventions":
+                    self._send(200, json.dumps(control.queue.pending()), "application/json")
+                else:
+                    self._send(404, "not found", "text/plain")
+
+            def do_POST(self) -> None:
+                parts = self.path.strip("/").split("/")
+                actions = {"resume": RESUMED, "skip": SKIPPED}
+                if len(parts) != 3 or parts[0] != "interventions" or not parts[1].isdigit() or parts[2] not in actions:
+                    self._send(404, "not found", "text/plain")
+                    return
+                if not self._from_this_server() or not self._from_control_page():
+                    return
+                if control.queue.resolve(int(parts[1]), actions[parts[2]]):
+                    logger.info(f"[Interventions] Intervention #{parts[1]} {actions[parts[2]]} from the control page")
+                self.send_response(303)
+                self.send_header("Location", "/")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: object) -> None:
+                logger.debug(f"[Interventions] HTTP {format % args}")
+
+        return Handler
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def start_control_surfaces(queue: InterventionQueue, console: bool, http_port: Optional[int]) -> Optional[InterventionServer]:
+    """Start the console and the localhost page as configured, returns the server to close at shutdown."""
+    if console:
+        InterventionConsole(queue)
+    if http_port is None:
+        return None
+    try:
+        return InterventionServer(queue, port=http_port)
+    except OSError as e:
+        logger.warning(f"[Interventions] ⚠️ Could not start the control page on port {http_port}: {e}")
+        return None
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Intervention states. A pending intervention parks the site that opened it until a human resumes it
+# (the step was taken care of) or skips it (give up on what the site was doing).
+PENDING, RESUMED, SKIPPED, EXPIRED = "pending", "resumed", "skipped", "expired"
+
+class InterventionQueue:
+    """
+    Manual interventions as queued tasks in SQLite, so a site that needs a human waits on its own
+    entry while other sites (or fleet workers, which share the file) keep running. Entries are
+    listed and resolved from a control surface (intervention_control) in any process.
+
+    An intervention not resolved within `timeout_seconds` counts as skipped.
+    """
+    _shared: Optional["InterventionQueue"] = None
+
+    def __init__(self, path: str = "interventions.sqlite3", timeout_seconds: Optional[float] = None, poll_seconds: float = 1.0) -> None:
+        self.path: str = path
+        self.timeout_seconds: Optional[float] = timeout_seconds
+        self.poll_seconds: float = poll_seconds
+        # Used from the agent loop and the control surface threads.
+        self.lock: threading.Lock = threading.Lock()
+        self.connection: sqlite3.Connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS interventions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, site TEXT NOT NULL, phase TEXT NOT NULL, reason TEXT NOT NULL, "
+            "owner TEXT NOT NULL, status TEXT NOT NULL, created_at REAL NOT NULL, resolved_at REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS interventions_status ON interventions(status)")
+
+    @classmethod
+    def shared(cls) -> "InterventionQueue":
+        """Process wide queue used by the agent loops."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def set_shared(cls, queue: "InterventionQueue") -> None:
+        cls._shared = queue
+
+    def _execute(self, sql: str, parameters: tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        with self.lock:
+            return self.connection.execute(sql, parameters)
+
+    def open(self, site: str, phase: str, reason: str, owner: str = "main") -> int:
+        """Queue an intervention and return its id."""
+        cursor = self._execute(
+            "INSERT INTO interventions (site, phase, reason, owner, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (site, phase, reason, owner, PENDING, time.time())
+        )
+        return int(cursor.lastrowid or 0)
+
+    def resolve(self, intervention_id: int, status: str = RESUMED) -> bool:
+        """Resume or skip a pending intervention. False if there is no such pending intervention."""
+        cursor = self._execute(
+            "UPDATE interventions SET status = ?, resolved_at = ? WHERE id = ? AND status = ?",
+            (status, time.time(), intervention_id, PENDING)
+        )
+        return cursor.rowcount > 0
+
+    def status(self, intervention_id: int) -> str:
+        row = self._execute("SELECT status FROM interventions WHERE id = ?", (intervention_id,)).fetchone()
+        return str(row[0]) if row is not None else EXPIRED
+
+    def pending(self) -> list[dict[str, Any]]:
+        rows = self._execute(
+            "SELECT id, site, phase, reason, owner, created_at FROM interventions WHERE status = ? ORDER BY id", (PENDING,)
+        ).fetchall()
+        return [
+            {"id": row[0], "site": row[1], "phase": row[2], "reason": row[3], "owner": row[4], "waiting_seconds": round(time.time() - row[5])}
+            for row in rows
+        ]
+
+    def expire_pending(self, owner: Optional[str] = None) -> int:
+        """Expire pending interventions, e.g. left over from an earlier run or of a worker that died."""
+        if owner is None:
+            cursor = self._execute("UPDATE interventions SET status = ?, resolved_at = ? WHERE status = ?", (EXPIRED, time.time(), PENDING))
+        else:
+            cursor = self._execute(
+                "UPDATE interventions SET status = ?, resolved_at = ? WHERE status = ? AND owner = ?", (EXPIRED, time.time(), PENDING, owner)
+            )
+        return cursor.rowcount
+
+    def _timed_out(self, intervention_id: int, started: float) -> bool:
+        if self.timeout_seconds is None or time.monotonic() - started < self.timeout_seconds:
+            return False
+        if self.resolve(intervention_id, EXPIRED):
+            logger.warning(f"[Interventions] ⚠️ Intervention #{intervention_id} was not resolved within {self.timeout_seconds:.0f}s, skipping it")
+        return True
+
+    def wait(self, intervention_id: int) -> str:
+        """Block until the intervention is resolved and return its status."""
+        started = time.monotonic()
+        while (status := self.status(intervention_id)) == PENDING and not self._timed_out(intervention_id, started):
+            time.sleep(self.poll_seconds)
+        return self.status(intervention_id) if status == PENDING else status
+
+    async def wait_async(self, intervention_id: int) -> str:
+        """Async variant of wait, other tasks of the event loop keep running meanwhile."""
+        started = time.monotonic()
+        while (status := self.status(intervention_id)) == PENDING and not self._timed_out(intervention_id, started):
+            await asyncio.sleep(self.poll_seconds)
+        return self.status(intervention_id) if status == PENDING else status
+
+    def close(self) -> None:
+        self.connection.close()
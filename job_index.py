@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Query parameters job boards use for the listing id (Indeed, LinkedIn, Greenhouse, Lever, Workday and co).
+JOB_ID_QUERY_PARAMETERS: tuple[str, ...] = ("jk", "vjk", "currentJobId", "jobId", "job_id", "jobid", "gh_jid", "jid", "postingId", "reqId")
+_JOB_ID_PATH_PATTERN = re.compile(r"(?:^|[/_-])(\d{5,})(?:$|[/._?-])")
+_UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+# Listings in these states are never opened again. Failed ones are retried until they run out of attempts.
+SKIPPED_STATUSES: tuple[str, ...] = ("applied", "rejected")
+
+def job_id_from_url(url: str) -> Optional[str]:
+    """Return the board's id of a job listing url, or None if the url does not carry one."""
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    for parameter in JOB_ID_QUERY_PARAMETERS:
+        if query.get(parameter):
+            return query[parameter][0]
+    uuid = _UUID_PATTERN.search(parsed.path)
+    if uuid:
+        return uuid.group(0).lower()
+    numeric = _JOB_ID_PATH_PATTERN.search(parsed.path)
+    return numeric.group(1) if numeric else None
+
+def canonical_job_key(url: str) -> str:
+    """Stable key of a listing: its board id if the url has one, otherwise the url without query, fragment and trailing slash."""
+    job_id = job_id_from_url(url)
+    if job_id is not None:
+        return f"id:{job_id}"
+    parsed = urlparse(url)
+    return f"url:{parsed.netloc.lower()}{parsed.path.rstrip('/').lower()}"
+
+def listing_content_hash(text: str) -> str:
+    """
+    Hash of a listing card's text, case and whitespace normalized. Digits are kept: they are often
+    all that tells two openings apart (salary bands, store numbers, "Engineer II" vs "Engineer III").
+    """
+    normalized = re.sub(r"\s+", " ", text.lower()).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class JobIndex:
+    """
+    SQLite index of the job listings seen per site, with their application status, so reruns skip
+    listings that were already applied to or given up on without spending LLM turns on them.
+
+    Skipped listings are also held in memory (by key and by content hash) for constant time checks
+    while filtering a results page.
+    """
+    def __init__(self, path: str = "jobs.sqlite3", max_attempts: int = 2) -> None:
+        self.path: str = path
+        self.max_attempts: int = max_attempts
+        # WAL and a busy timeout, the file may be shared by the worker processes of a fleet.
+        self.connection: sqlite3.Connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "site TEXT NOT NULL, job_key TEXT NOT NULL, url TEXT NOT NULL, title TEXT NOT NULL DEFAULT '', "
+            "content_hash TEXT NOT NULL DEFAULT '', status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "first_seen_at REAL NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (site, job_key))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_content_hash ON jobs(site, content_hash)")
+        self.connection.commit()
+        placeholders = ", ".join("?" for _ in SKIPPED_STATUSES)
+        rows = self.connection.execute(f"SELECT site, job_key, content_hash FROM jobs WHERE status IN ({placeholders})", SKIPPED_STATUSES).fetchall()
+        self.skipped_keys: set[tuple[str, str]] = {(site, job_key) for site, job_key, _ in rows}
+        self.skipped_hashes: set[tuple[str, str]] = {(site, content_hash) for site, _, content_hash in rows if content_hash}
+
+    def should_skip(self, site: str, listing: dict[str, Any]) -> bool:
+        """Whether a listing ({"key", "content_hash", ...}) was already applied to or rejected on this site."""
+        if (site, listing["key"]) in self.skipped_keys:
+            return True
+        return bool(listing["content_hash"]) and (site, listing["content_hash"]) in self.skipped_hashes
+
+    def record(self, site: str, listing: dict[str, Any], status: str) -> None:
+        """
+        Store the outcome of an application attempt ("started", "applied", "failed" or "rejected").
+        A listing that failed max_attempts times is marked rejected.
+        """
+        now = time.time()
+        attempts_increment = 1 if status == "started" else 0
+        self.connection.execute(
+            "INSERT INTO jobs (site, job_key, url, title, content_hash, status, attempts, first_seen_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(site, job_key) DO UPDATE SET status = excluded.status, url = excluded.url, title = excluded.title, "
+            "content_hash = excluded.content_hash, attempts = attempts + ?, updated_at = excluded.updated_at",
+            (site, listing["key"], listing["url"], listing.get("title", ""), listing["content_hash"], status, attempts_increment, now, now, attempts_increment)
+        )
+        if status == "failed":
+            row = self.connection.execute("SELECT attempts FROM jobs WHERE site = ? AND job_key = ?", (site, listing["key"])).fetchone()
+            if row is not None and row[0] >= self.max_attempts:
+                status = "rejected"
+                self.connection.execute("UPDATE jobs SET status = ? WHERE site = ? AND job_key = ?", (status, site, listing["key"]))
+        self.connection.commit()
+        if status in SKIPPED_STATUSES:
+            self.skipped_keys.add((site, listing["key"]))
+            if listing["content_hash"]:
+                self.skipped_hashes.add((site, listing["content_hash"]))
+        logger.info(f"[Jobs] {status}: {listing.get('title', '')} ({listing['url']})")
+
+    def pending_listings(self, site: str, extracted: list[dict[str, Any]], require_job_id: bool) -> list[dict[str, Any]]:
+        """
+        Turn listings extracted from a results page ({"url", "title", "text"}) into the ones still to
+        apply to, with their canonical key and content hash. The board's job id identifies a listing
+        whenever its url has one, the content hash is only kept for listings without. With
+        require_job_id, links whose url has no job id (navigation, filters) are dropped, for pages
+        matched by the generic extractor.
+        """
+        pending: list[dict[str, Any]] = []
+        keys: set[str] = set()
+        skipped = 0
+        for listing in extracted:
+            url = str(listing["url"])
+            has_job_id = job_id_from_url(url) is not None
+            if require_job_id and not has_job_id:
+                continue
+            entry: dict[str, Any] = {
+                "url": url,
+                "title": str(listing.get("title", "")),
+                "key": canonical_job_key(url),
+                "content_hash": "" if has_job_id else listing_content_hash(str(listing.get("text") or listing.get("title", "")))
+            }
+            if entry["key"] in keys:
+                continue
+            keys.add(entry["key"])
+            if self.should_skip(site, entry):
+                skipped += 1
+                continue
+            pending.append(entry)
+        logger.info(f"[Jobs] {site}: {len(pending)} new listings, {skipped} already applied or rejected")
+        return pending
+
+    def close(self) -> None:
+        self.connection.close()
@@ -1,11 +1,17 @@
-import requests
 import json
-from typing import Union, Optional, Any , cast
+from typing import Optional, Any , cast, Iterable, Iterator
 import logging
 import os
-from openai import OpenAI
-from openai.types.chat import ChatCompletionMessageParam
 import re
+import time
+from artifact_store import ArtifactStore
+from dom_packer import DomPacker, default_dom_token_budget, token_counter
+from form_filler import PlaceholderResolver, context_values
+from llm_cache import LLMResponseCache, live_selectors, portable_selectors
+from llm_clients import LLMClientPool
+from model_router import ModelRouter, NO_PROGRESS, PARSE_FAILURE, SELECTOR_REJECTED, tier_name
+from page_tracker import page_delta
+from tracing import Span, Tracer, estimate_tokens
 
 def extract_json_block(text: str) -> str:
     # Remove triple backtick wrappers if present
@@ -14,17 +20,144 @@ def extract_json_block(text: str) -> str:
 
 logger = logging.getLogger("JobApplicationAgent")
 
+class InstructionStreamParser:
+    """
+    Incrementally extracts complete instruction objects from a streamed LLM response.
+
+    Text is fed chunk by chunk; every top level JSON object is returned as soon as its closing brace
+    arrives, whether the model streams a bare object, an array of objects or a ```json fenced block.
+    """
+    def __init__(self) -> None:
+        self.buffer: str = ""
+        self.position: int = 0
+        self.depth: int = 0
+        self.in_string: bool = False
+        self.escaped: bool = False
+        self.object_start: int = -1
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self.buffer += chunk
+        completed: list[dict[str, Any]] = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth > 0:
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.object_start = self.position
+                self.depth += 1
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    raw = self.buffer[self.object_start:self.position + 1]
+                    try:
+                        instruction = json.loads(raw)
+                        if isinstance(instruction, dict):
+                            completed.append(cast(dict[str, Any], instruction))
+                    except json.JSONDecodeError:
+                        logger.warning(f"[LLM Agent] ⚠️ Could not parse streamed instruction:{raw}")
+            self.position += 1
+        return completed
+
+# System prompts per (phase, dom mode), see LLMAgent._system_prompt.
+_system_prompts: dict[tuple[str, str], dict[str, Any]] = {}
+
 class LLMAgent:
-    def __init__(self, phase:str,  provider: str = "ollama", model: str = "gemma3:1b") -> None:
-        self.provider: str = provider
-        self.model: str = model
-        self.system_prompt: dict[str, str] = self._build_system_prompt(phase)
+    def __init__(self, phase:str,  provider: str = "ollama", model: str = "gemma3:1b", dom_mode: str = "full", cache: Optional[LLMResponseCache] = None, clients: Optional[LLMClientPool] = None, dom_token_budget: Optional[int] = None, dom_delta: bool = False, max_delta_steps: int = 4, router: Optional[ModelRouter] = None) -> None:
+        self.phase: str = phase
+        # (provider, model) tiers fastest first: a step starts at the first and escalates one tier at a time.
+        self.router: Optional[ModelRouter] = router
+        self.tiers: list[tuple[str, str]] = router.tiers(phase) if router is not None else [(provider, model)]
+        self.tier: int = 0
+        self.provider: str = self.tiers[0][0]
+        self.model: str = self.tiers[0][1]
+        self.api_key: Optional[str] = None
+        # Reason to start the next step at the second tier, set through escalate().
+        self.pending_escalation: Optional[str] = None
+        self.clients: LLMClientPool = clients or LLMClientPool.shared()
+        self.dom_mode: str = dom_mode
+        # Fit the page into the token budget of each tier's model, keeping the regions that matter for this phase.
+        self.dom_packers: list[DomPacker] = [
+            DomPacker(phase, dom_token_budget or default_dom_token_budget(model, dom_mode), token_counter(model))
+            for _, model in self.tiers
+        ]
+        self.cache: Optional[LLMResponseCache] = cache
+        self.last_cache_key: Optional[str] = None
+        # Page the last cache key was made for, its element uids are what stored selectors are relative to.
+        self.last_cache_dom: str = ""
+        # Static prompt sections are built once and flagged "cache" so providers can serve them from their prompt cache.
+        self.system_prompt: dict[str, Any] = self._system_prompt(phase)
+        # Context message per formatted context (credentials, preferences, applicant data), reused across steps.
+        self.context_messages: dict[str, dict[str, Any]] = {}
+        # Placeholder resolver compiled from the context data it was built for (kept to detect a new context).
+        self.resolver: Optional[PlaceholderResolver] = None
+        self.resolver_sources: list[Any] = []
+        # Delta mode: after a full snapshot, up to max_delta_steps follow-up steps only send what changed on
+        # the page since that snapshot, as a reply to the model's answer to it.
+        self.dom_delta: bool = dom_delta
+        self.max_delta_steps: int = max_delta_steps
+        self.delta_steps: int = 0
+        # (page payload, page message) of the last full snapshot sent, then its raw response once it arrived.
+        self.pending_base: Optional[tuple[str, dict[str, Any]]] = None
+        self.delta_base: Optional[tuple[str, dict[str, Any], str]] = None
         # self.messages: list[dict[str, str]] = [self.system_prompt]
         self.messages: list[Any] = [self.system_prompt]
+        self._use_tier(0)
+
+    def _use_tier(self, tier: int) -> None:
+        self.tier = tier
+        self.provider, self.model = self.tiers[tier]
         if self.provider == "openai":
-            self.api_key : str|None = os.getenv("OPENAI_API_KEY")
+            self.api_key = os.getenv("OPENAI_API_KEY")
         elif self.provider == "anthropic":
-            self.api_key : str|None = os.getenv("ANTHROPIC_API_KEY")
+            self.api_key = os.getenv("ANTHROPIC_API_KEY")
+        else:
+            self.api_key = None
+
+    def escalate(self, reason: str = NO_PROGRESS) -> None:
+        """Send the next step to the second tier, e.g. when the page did not change after the last one."""
+        if len(self.tiers) > 1:
+            self.pending_escalation = reason
+
+    def _start_step(self) -> bool:
+        """Pick the tier of a new step, the first one unless an escalation is pending. Returns whether the step was escalated."""
+        reason, self.pending_escalation = self.pending_escalation, None
+        self._use_tier(1 if reason is not None else 0)
+        if self.router is not None:
+            self.router.record_step(self.phase)
+            if reason is not None:
+                self.router.record_escalation(self.phase, self.tiers[self.tier], reason)
+        return reason is not None
+
+    def _next_tier(self, reason: str) -> bool:
+        """Move the current request up one tier, False when it already is at the strongest one."""
+        if self.tier + 1 >= len(self.tiers):
+            return False
+        self._use_tier(self.tier + 1)
+        if self.router is not None:
+            self.router.record_escalation(self.phase, self.tiers[self.tier], reason)
+        return True
+
+    def _record_request(self, started: float, usable: bool) -> None:
+        if self.router is not None:
+            self.router.record_request(self.tiers[self.tier], time.perf_counter() - started, usable)
+
+    def _system_prompt(self, phase: str) -> dict[str, Any]:
+        """The system prompt of a phase, built once per process for each phase and dom mode and shared by later agents."""
+        key = (phase, self.dom_mode)
+        if key not in _system_prompts:
+            system_prompt: dict[str, Any] = self._build_system_prompt(phase)
+            if system_prompt:
+                system_prompt["cache"] = True
+            _system_prompts[key] = system_prompt
+        return dict(_system_prompts[key])
 
     def _build_system_prompt(self,phase:str)->dict[str,str]:
         json_response_format: str = (
@@ -77,7 +210,8 @@ class LLMAgent:
                     "Your task finishes successfully once you realize from the html content of current page of the job posting website, that you successfully completed the application process and submitted the application for a job listing. Upon which you will generate one final instruction of action type 'done'.\n"
                     "Following are some constraints to keep in mind while generating instructions:\n"
                     # "- When referencing fields like first_name, email, phone, degree, etc., that are available in the Applicant Data section, you MUST use a placeholder like '$first_name', '$email', '$resume_path'. These will be fetched from the applicant_data.json file and get replaced later before execution. Only use plain values (e.g. 'John Doe' for full name which is not a field in applicant_data.json) for things that must be derived contextually and are not directly mentioned in the Applicant Data section.\n" 
-                    "- When specifying application form field values in the text field of string formatted json instructions that you generate, if info or value for that field is available in the Applicant Data section, you MUST use a placeholder in the instruction specifying the value for those field's like 'text':'$first_name', 'text':'$email', 'text':'$resume_path' for fields asking about First Name, Email, etc. These will be fetched from the applicant_data.json file and get replaced later before execution. Use plain text as value for application form field value in text field of instruction when (e.g. 'text':'John Doe' for full name which is not a field in applicant_data.json) values must be derived contextually and are not directly mentioned in the Applicant Data section.\n" 
+                    "- When specifying application form field values in the text field of string formatted json instructions that you generate, if info or value for that field is available in the Applicant Data section, you MUST use a placeholder in the instruction specifying the value for those field's like 'text':'$first_name', 'text':'$email', 'text':'$resume_path' for fields asking about First Name, Email, etc. These will be fetched from the applicant_data.json file and get replaced later before execution. Placeholders can be combined with text, e.g. 'text':'$first_name $last_name' for a full name field. Nested fields are joined with '_' and list entries are numbered from 0, e.g. '$Address_City', '$education_0_degree'. Use plain text as value for application form field value in text field of instruction when values must be derived contextually and are not directly mentioned in the Applicant Data section.\n" 
+                    "- Fields that already hold a value were filled from the Applicant Data before you were asked, leave them as they are and only handle the fields that are still empty.\n"
                     "- Do NOT generate multiple instructions for the same selector. Each instruction corresponds to one action on one selector.\n"
                     "- If the action is select, only choose from the provided list of values for the selector field.\n"
                     "- If the action is upload, use the field from Applicant Data such as 'resume_file' or 'cover_letter_file' for file path.\n"
@@ -152,34 +286,42 @@ class LLMAgent:
             }
         else :
             logger.error("[LLM Agent]Invalid phase")
+        if system_prompt and self.dom_mode == "actionable":
+            system_prompt["content"] += (
+                "\nNote: the 'Current page HTML content:' section is not raw HTML but a distilled JSON view of the page. "
+                "It has the page 'url', 'title', a short 'text_context' made of visible headings and alerts, and an 'elements' list holding only the visible, interactable elements of the page. "
+                "Each element lists its 'tag', 'type', 'label', 'text', current 'value' or 'checked' state and, for select fields, the allowed 'options' (as 'value (visible text)' when they differ, select using the value). "
+                "Always copy the 'selector' of the element you want to act on verbatim into the selector field of your instruction."
+            )
+        if system_prompt:
+            system_prompt["content"] += (
+                "\nLarge pages are cut down to the parts most relevant to this task, 'omitted_regions' or 'omitted_elements' in the page content tell how much was left out. "
+                "Never guess selectors for content that is not shown."
+            )
         return system_prompt
         
+    def _resolver(self, context: dict[str, Any]) -> PlaceholderResolver:
+        """Placeholder resolver for a context, compiled again only when the context's data changes."""
+        sources = [context.get(key) for key in ("site", "job_seeker_credentials", "job_seeker_preferences", "applicant_preferences", "applicant_data")]
+        if self.resolver is None or len(sources) != len(self.resolver_sources) or any(a is not b for a, b in zip(sources, self.resolver_sources)):
+            self.resolver = PlaceholderResolver(context_values(context))
+            self.resolver_sources = sources
+        return self.resolver
+
     def _interpolate(self, instructions: list[dict[str, Any]], context: dict[str, Any]) -> list[dict[str, Any]]:
         """Replace $variables in instructions with real values."""
-        flat_context = self._flatten(context.get("applicant_data", {}))
-
-        def resolve(val : Union[str , Any]) -> str: 
-            if isinstance(val, str) and val.startswith("$"):
-                return flat_context.get(val[1:], val)
-            return val
-
+        resolver = self._resolver(context)
         for instr in instructions:
             if "text" in instr:
-                instr["text"] = resolve(instr["text"])
+                resolved = resolver.resolve(instr["text"])
+                if resolved != instr["text"]:
+                    instr["text_template"] = instr["text"]  # kept so recorded playbooks store the placeholder, not the value
+                instr["text"] = resolved
         return instructions
 
-    def _flatten(self, d: dict[str, Any], parent_key: str = '', sep: str = '_') -> dict[str, Any]:
-        """Flatten nested dict into a single level with joined keys."""
-        items : dict[str,Any]= {}
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.update(self._flatten(cast(dict[str, Any], v), new_key, sep=sep))
-            elif isinstance(v, list):
-                items[new_key] = ", ".join(map(str, cast(list[Any], v) ))
-            else:
-                items[new_key] = v
-        return items
+    def resolve_placeholders(self, instructions: list[dict[str, Any]], context: dict[str, Any]) -> list[dict[str, Any]]:
+        """Interpolate $variables in instructions that did not come from the LLM, such as replayed playbook steps."""
+        return self._interpolate([dict(instr) for instr in instructions], context)
     
     @staticmethod
     def format_dict(name: str, data: dict[str, Any], indent: int = 0) -> str:
@@ -194,7 +336,8 @@ class LLMAgent:
                 lines.append(f"{'  ' * (indent + 1)}{key}: {value}")
         return "\n".join(lines)
     
-    def ask(self, html_content: str, context:  dict[str, Any]) -> Optional[list[dict[str, Any]]]:
+    def _build_context_str(self, context: dict[str, Any]) -> Optional[str]:
+        """Format the phase specific context (credentials, preferences, applicant data), or None for an invalid phase."""
         phase : str = context["phase"]
         context_str : str = ""
         if phase == 'login':
@@ -211,25 +354,73 @@ class LLMAgent:
         else:
             logger.error(f"⚠️ [LLMAgent] Invalid Phase: {phase}")
             return None
-        
-        prompt: dict[str, str] = {
-            "role": "applicant",
-            "content": f"Current page HTML content:\n{html_content[:5000]}\nContext: {context_str}"
-        }
+        return context_str
 
-        # self.messages.append(prompt) # accumulate all messages ,Preserves memory of prior actions (can be useful in multi-turn tasks). Quickly grows beyond model token limits .
-        self.messages = [self.system_prompt, prompt]  # reset every time, should be better suited as previous prompt history, instructions generated and actions taken is not necessary for generating next Instruction, at least for this application, current html context and system prompt should be fine. Although if included, would yield better context awareness and guidance, aiding precise instruction generation.
+    def _context_message(self, context_str: str) -> dict[str, Any]:
+        message = self.context_messages.get(context_str)
+        if message is None:
+            message = {"role": "applicant", "content": f"Context: {context_str}", "cache": True}
+            self.context_messages[context_str] = message
+        return message
 
-        result : str
-        if self.provider == "ollama":
-            result = self._ask_ollama()
-        elif self.provider == "openai":
-            result = self._ask_openai()
-        elif self.provider == "anthropic":
-            result = self._ask_anthropic()
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
-        
+    def _build_messages(self, html_content: str, context_str: str, actions_taken: Optional[str] = None) -> list[Any]:
+        """
+        Build the system + context + page prompt for one step. The sections that do not change between
+        steps come first, so every provider sees the same prompt prefix and can reuse it from its
+        prompt/KV cache; only the page content after it is new.
+        """
+        content = f"Current page HTML content:\n{self.dom_packers[self.tier].pack(html_content, self.dom_mode)}"
+        if actions_taken:
+            content += f"\nActions already taken: {actions_taken}"
+        prompt: dict[str, str] = {"role": "applicant", "content": content}
+        return [self.system_prompt, self._context_message(context_str), prompt]
+
+    def _step_messages(self, html_content: str, context_str: str, actions_taken: Optional[str]) -> list[Any]:
+        """
+        Messages of a regular step. In delta mode, the last full snapshot and the model's answer to it
+        are replayed unchanged (so they stay in the provider's prompt cache) followed by only the page
+        changes since that snapshot, until the page changed too much or max_delta_steps is reached.
+        """
+        self.pending_base = None
+        if self.dom_delta and self.delta_base is not None and self.delta_steps < self.max_delta_steps:
+            base_dom, base_message, base_response = self.delta_base
+            delta = page_delta(base_dom, html_content)
+            if delta is not None:
+                self.delta_steps += 1
+                content = f"The actions were carried out. Changes to the page since the snapshot above (added, changed and removed elements):\n{delta}"
+                if actions_taken:
+                    content += f"\nActions already taken: {actions_taken}"
+                logger.debug(f"[LLM Agent] Sending page delta ({len(delta)} chars), step {self.delta_steps} of {self.max_delta_steps}")
+                return [
+                    self.system_prompt,
+                    self._context_message(context_str),
+                    base_message,
+                    {"role": "assistant", "content": base_response},
+                    {"role": "applicant", "content": content}
+                ]
+        messages = self._build_messages(html_content, context_str, actions_taken)
+        if self.dom_delta:
+            self.pending_base = (html_content, messages[-1])
+        return messages
+
+    def _repack_for_tier(self, messages: list[Any], html_content: str, context_str: str, actions_taken: Optional[str]) -> list[Any]:
+        """
+        The messages of the current step after it was escalated, with the page packed into the new
+        tier's budget. A delta carries no packed page and is sent again as it is.
+        """
+        if self.dom_delta and self.pending_base is None:
+            return messages
+        return self._step_messages(html_content, context_str, actions_taken)
+
+    def _remember_response(self, result: str) -> None:
+        # A full snapshot's answer becomes the base the next delta steps refer to.
+        if self.pending_base is not None and result:
+            self.delta_base = (*self.pending_base, result)
+            self.delta_steps = 0
+        self.pending_base = None
+
+    def _extract_instructions(self, result: str) -> Optional[list[dict[str, Any]]]:
+        """Extract the (un-interpolated) instruction list from a raw LLM response."""
         try:
             clean_result = extract_json_block(result)
             raw_instructions = json.loads(clean_result)
@@ -239,66 +430,321 @@ class LLMAgent:
             elif isinstance(raw_instructions, list): 
                 instructions = cast(list[dict[str, Any]], raw_instructions)
             else : 
-                logger.warning(f"[LLM Agent] ⚠️ Unexpected instruction format:{result}")
+                logger.warning(f"[LLM Agent] ⚠️ Unexpected instruction format: {ArtifactStore.shared().put(result, 'llm')}")
                 return None
-            return self._interpolate(instructions, context)
+            return instructions
         
         except json.JSONDecodeError:
-            logger.warning(f"[LLM Agent] ⚠️ Could not parse LLM response:{result}")
+            logger.warning(f"[LLM Agent] ⚠️ Could not parse LLM response: {ArtifactStore.shared().put(result, 'llm')}")
+            return None
+
+    def _lookup_cache(self, html_content: str, context: dict[str, Any], context_str: str, read: bool = True) -> Optional[list[dict[str, Any]]]:
+        """
+        Return interpolated instructions from the response cache, remembering the key for store/invalidate.
+        With read=False only the key is remembered, so the fresh answer replaces the cached one.
+        """
+        self.last_cache_key = None
+        if self.cache is None:
+            return None
+        # Keyed by the phase's tiers rather than the tier that answered, so an escalated answer replaces a weaker one.
+        key = self.cache.make_key(context["phase"], "|".join(map(tier_name, self.tiers)), html_content, context_str)
+        self.last_cache_key = key
+        self.last_cache_dom = html_content
+        if not read:
+            return None
+        cached = self.cache.get(key, context["phase"])
+        if cached is None:
+            return None
+        live = live_selectors(cached, html_content)
+        if live is None:
+            logger.warning("[LLM Cache] ⚠️ Cached instructions do not fit the elements of the current page, asking the LLM")
+            self.cache.invalidate(key)
+            return None
+        Tracer.shared().count("llm_cache_hits")
+        return self._interpolate(live, context)
+
+    def _store_in_cache(self, instructions: list[dict[str, Any]], context: dict[str, Any]) -> None:
+        # Responses asking for a human are not replayed, a later visit may well get past that page.
+        if self.cache is None or self.last_cache_key is None:
+            return
+        if any(instr.get("action") == "intervene" for instr in instructions):
+            return
+        # uid selectors are stored as element indices, the uids themselves are renumbered on every page load.
+        portable = portable_selectors(instructions, self.last_cache_dom)
+        if portable is None:
+            logger.debug("[LLM Cache] Not caching a response whose uid selectors are not on the page's element list")
+            return
+        self.cache.put(self.last_cache_key, context["phase"], portable)
+
+    def forget_last_response(self) -> None:
+        """Invalidate the cache entry of the last step, used when its instructions failed to execute."""
+        if self.cache is not None and self.last_cache_key is not None:
+            self.cache.invalidate(self.last_cache_key)
+            self.last_cache_key = None
+
+    def reset_page_history(self) -> None:
+        """Drop the delta base, so the next step sends a full snapshot (new listing, recovery from a stuck page)."""
+        self.delta_base = None
+        self.pending_base = None
+        self.delta_steps = 0
+
+    def _finish(self, result: str, context: dict[str, Any]) -> Optional[list[dict[str, Any]]]:
+        logger.debug(f"[LLM Agent] Raw response ({len(result)} chars): {ArtifactStore.shared().put(result, 'llm')}")
+        instructions = self._extract_instructions(result)
+        if instructions is None:
+            return None
+        self._remember_response(result)
+        # Stored before _interpolate so placeholders are resolved against fresh applicant data on a hit.
+        self._store_in_cache(json.loads(json.dumps(instructions)), context)
+        return self._interpolate(instructions, context)
+
+    def ask(self, html_content: str, context:  dict[str, Any], actions_taken: Optional[str] = None) -> Optional[list[dict[str, Any]]]:
+        context_str = self._build_context_str(context)
+        if context_str is None:
+            return None
+        escalated = self._start_step()
+        # An escalated step asks again about a page the cached answer did not get past.
+        cached = self._lookup_cache(html_content, context, context_str, read=not escalated)
+        if cached is not None:
+            return cached
+
+        # self.messages.append(prompt) # accumulate all messages ,Preserves memory of prior actions (can be useful in multi-turn tasks). Quickly grows beyond model token limits .
+        self.messages = self._step_messages(html_content, context_str, actions_taken)  # reset every time, should be better suited as previous prompt history, instructions generated and actions taken is not necessary for generating next Instruction, at least for this application, current html context and system prompt should be fine. Although if included, would yield better context awareness and guidance, aiding precise instruction generation.
+
+        while True:
+            started = time.perf_counter()
+            instructions = self._finish(self._complete(), context)
+            self._record_request(started, instructions is not None)
+            if instructions is not None or not self._next_tier(PARSE_FAILURE):
+                return instructions
+            self.messages = self._repack_for_tier(self.messages, html_content, context_str, actions_taken)
+
+    def _trace_request(self, span: Span, messages: list[Any]) -> None:
+        """Record prompt size and estimated tokens of a request on its span and in the provider's counters."""
+        prompt = "".join(str(message.get("content", "")) for message in cast(list[dict[str, Any]], messages))
+        tokens = estimate_tokens(prompt)
+        span.set(model=self.model, tier=self.tier, prompt_chars=len(prompt), prompt_tokens_estimated=tokens)
+        Tracer.shared().count("llm_requests", provider=self.provider)
+        Tracer.shared().count("prompt_tokens_estimated", tokens, provider=self.provider)
+
+    def _complete(self) -> str:
+        """Send self.messages to the configured provider and return the raw response text."""
+        with Tracer.shared().span("llm", provider=self.provider) as span:
+            self._trace_request(span, self.messages)
+            if self.provider == "ollama":
+                result = self._ask_ollama()
+            elif self.provider == "openai":
+                result = self._ask_openai()
+            elif self.provider == "anthropic":
+                result = self._ask_anthropic()
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+            span.set(response_chars=len(result))
+        return result
+
+    def _correction_messages(self, html_content: str, context_str: str, rejected: list[tuple[dict[str, Any], str]]) -> list[Any]:
+        rejected_str = "\n".join(
+            f"- {json.dumps({key: instr.get(key, '') for key in ('action', 'selector', 'text')})} was rejected because: {reason}"
+            for instr, reason in rejected
+        )
+        correction: dict[str, str] = {
+            "role": "applicant",
+            "content": (
+                "The following instructions were rejected before execution because their selectors do not match an actionable element of the current page:\n"
+                f"{rejected_str}\n"
+                "Respond with corrected instructions that carry out the same intent using selectors that exist in the current page content above, "
+                "keeping the same instruction format. Respond with an empty list [] if the intent cannot be carried out on this page."
+            )
+        }
+        return [*self._build_messages(html_content, context_str), correction]
+
+    def ask_correction(self, html_content: str, context: dict[str, Any], rejected: list[tuple[dict[str, Any], str]]) -> Optional[list[dict[str, Any]]]:
+        """
+        Send instructions rejected by pre-flight validation back to the LLM, together with the reasons
+        and the current page, and return the corrected instructions. The correction goes to the tier
+        above the one that produced the rejected instructions. Corrections are never cached.
+        """
+        context_str = self._build_context_str(context)
+        if context_str is None:
             return None
+        self._next_tier(SELECTOR_REJECTED)
+        self.messages = self._correction_messages(html_content, context_str, rejected)
+        started = time.perf_counter()
+        instructions = self._extract_instructions(self._complete())
+        self._record_request(started, instructions is not None)
+        return self._interpolate(instructions, context) if instructions is not None else None
+
+    def ask_stream(self, html_content: str, context: dict[str, Any], actions_taken: Optional[str] = None) -> Optional[Iterable[dict[str, Any]]]:
+        """
+        Streaming variant of ask: returns an iterator yielding each interpolated instruction as soon as
+        the model has finished generating it, so the executor can act while the rest is still being
+        generated. Blocks until the first instruction arrives and returns None if there is none.
+        Cache hits are returned as a list, since nothing is left to wait for. A response without any
+        instruction is asked again from the next tier; tier latency is the time to the first instruction.
+        """
+        context_str = self._build_context_str(context)
+        if context_str is None:
+            return None
+        escalated = self._start_step()
+        cached = self._lookup_cache(html_content, context, context_str, read=not escalated)
+        if cached is not None:
+            return cached
+        self.messages = self._step_messages(html_content, context_str, actions_taken)
+
+        while True:
+            started = time.perf_counter()
+            stream = self._stream_instructions(context)
+            first = next(stream, None)
+            self._record_request(started, first is not None)
+            if first is not None:
+                return self._prepend(first, stream)
+            if not self._next_tier(PARSE_FAILURE):
+                return None
+            self.messages = self._repack_for_tier(self.messages, html_content, context_str, actions_taken)
+
+    @staticmethod
+    def _prepend(first: dict[str, Any], rest: Iterator[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        yield first
+        yield from rest
+
+    def _stream_instructions(self, context: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        chunks: Iterator[str]
+        if self.provider == "ollama":
+            chunks = self._stream_ollama()
+        elif self.provider == "openai":
+            chunks = self._stream_openai()
+        elif self.provider == "anthropic":
+            chunks = self._stream_anthropic()
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        parser = InstructionStreamParser()
+        raw_instructions: list[dict[str, Any]] = []
+        raw_chunks: list[str] = []
+        # The span runs until the stream is consumed, so it includes executing the instructions in between.
+        with Tracer.shared().span("llm_stream", provider=self.provider) as span:
+            self._trace_request(span, self.messages)
+            for chunk in chunks:
+                raw_chunks.append(chunk)
+                for instruction in parser.feed(chunk):
+                    if not raw_instructions:
+                        span.set(first_instruction_ms=round((time.perf_counter() - span.started) * 1000, 2))
+                    raw_instructions.append(json.loads(json.dumps(instruction)))
+                    yield self._interpolate([instruction], context)[0]
+            span.set(instructions=len(raw_instructions))
+        if raw_instructions:
+            self._remember_response("".join(raw_chunks))
+        raw_id = ArtifactStore.shared().put("".join(raw_chunks), "llm")
+        logger.debug(f"[LLM Agent] Raw streamed response: {raw_id}")
+        if raw_instructions:
+            # Only a fully consumed stream is cached; a caller breaking off on a failed step never stores a partial response.
+            self._store_in_cache(raw_instructions, context)
+        else:
+            logger.warning(f"[LLM Agent] ⚠️ Could not parse LLM response: {raw_id}")
+
+    async def ask_async(self, html_content: str, context: dict[str, Any], actions_taken: Optional[str] = None) -> Optional[list[dict[str, Any]]]:
+        """Async variant of ask used by the concurrent multi-site engine."""
+        context_str = self._build_context_str(context)
+        if context_str is None:
+            return None
+        escalated = self._start_step()
+        cached = self._lookup_cache(html_content, context, context_str, read=not escalated)
+        if cached is not None:
+            return cached
+        messages = self._step_messages(html_content, context_str, actions_taken)
+        self.messages = messages
+        while True:
+            started = time.perf_counter()
+            instructions = self._finish(await self._complete_async(messages), context)
+            self._record_request(started, instructions is not None)
+            if instructions is not None or not self._next_tier(PARSE_FAILURE):
+                return instructions
+            messages = self._repack_for_tier(messages, html_content, context_str, actions_taken)
+            self.messages = messages
+
+    async def _complete_async(self, messages: list[Any]) -> str:
+        with Tracer.shared().span("llm", provider=self.provider) as span:
+            self._trace_request(span, messages)
+            if self.provider == "ollama":
+                result = await self._ask_ollama_async(messages)
+            elif self.provider == "openai":
+                result = await self._ask_openai_async(messages)
+            elif self.provider == "anthropic":
+                result = await self._ask_anthropic_async(messages)
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+            span.set(response_chars=len(result))
+        return result
+
+    async def ask_correction_async(self, html_content: str, context: dict[str, Any], rejected: list[tuple[dict[str, Any], str]]) -> Optional[list[dict[str, Any]]]:
+        """Async variant of ask_correction."""
+        context_str = self._build_context_str(context)
+        if context_str is None:
+            return None
+        self._next_tier(SELECTOR_REJECTED)
+        messages = self._correction_messages(html_content, context_str, rejected)
+        self.messages = messages
+        started = time.perf_counter()
+        instructions = self._extract_instructions(await self._complete_async(messages))
+        self._record_request(started, instructions is not None)
+        return self._interpolate(instructions, context) if instructions is not None else None
         
     def _ask_ollama(self) -> str:
-        
         try:
-            payload: dict[str, Any] = {
-                "model": self.model,
-                "messages": cast(list[dict[str,str]], self.messages),
-                "stream": False
-            }
-            res = requests.post(
-                "http://localhost:11434/api/chat",
-                json=payload
-            )
-            res.raise_for_status()
-            return res.json()["message"]["content"]
+            return self.clients.ollama_chat(self.model, self.messages)
         except Exception as e:
             logger.error(f"[LLMAgent] Ollama request failed: {e}")
             return ""
     
     def _ask_openai(self) -> str:
         try:
-            openai_client = OpenAI(api_key=self.api_key)
-            response = openai_client.chat.completions.create(
-                model=self.model,
-                messages=cast(list[ChatCompletionMessageParam], self.messages),
-                temperature=0.2
-            )
-            res = response.choices[0].message.content
-            if res is None:
-                raise ValueError("[LLM Agent] ⚠️ LLM returned no content.")
-            return res
+            return self.clients.openai_chat(self.api_key, self.model, self.messages)
         except Exception as e:
             logger.error(f"[LLMAgent] OpenAI request failed: {e}")
             return ""
 
     def _ask_anthropic(self) -> str:
         try:
-            res = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": self.api_key,
-                    "anthropic-version": "2023-06-01",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "max_tokens": 1024,
-                    "messages": self.messages
-                }
-            )
-            res.raise_for_status()
-            return res.json()["content"]
+            return self.clients.anthropic_chat(self.api_key, self.model, self.messages)
+        except Exception as e:
+            logger.error(f"[LLMAgent] Anthropic request failed: {e}")
+            return ""
+
+    def _stream_ollama(self) -> Iterator[str]:
+        try:
+            yield from self.clients.ollama_stream(self.model, self.messages)
+        except Exception as e:
+            logger.error(f"[LLMAgent] Ollama streaming request failed: {e}")
+
+    def _stream_openai(self) -> Iterator[str]:
+        try:
+            yield from self.clients.openai_stream(self.api_key, self.model, self.messages)
+        except Exception as e:
+            logger.error(f"[LLMAgent] OpenAI streaming request failed: {e}")
+
+    def _stream_anthropic(self) -> Iterator[str]:
+        try:
+            yield from self.clients.anthropic_stream(self.api_key, self.model, self.messages)
+        except Exception as e:
+            logger.error(f"[LLMAgent] Anthropic streaming request failed: {e}")
+
+    async def _ask_ollama_async(self, messages: list[Any]) -> str:
+        try:
+            return await self.clients.ollama_chat_async(self.model, messages)
+        except Exception as e:
+            logger.error(f"[LLMAgent] Ollama request failed: {e}")
+            return ""
+
+    async def _ask_openai_async(self, messages: list[Any]) -> str:
+        try:
+            return await self.clients.openai_chat_async(self.api_key, self.model, messages)
+        except Exception as e:
+            logger.error(f"[LLMAgent] OpenAI request failed: {e}")
+            return ""
+
+    async def _ask_anthropic_async(self, messages: list[Any]) -> str:
+        try:
+            return await self.clients.anthropic_chat_async(self.api_key, self.model, messages)
         except Exception as e:
             logger.error(f"[LLMAgent] Anthropic request failed: {e}")
             return ""
-        
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional, cast
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Attributes that describe what an element is rather than what it currently shows. Everything else
+# (text, labels, values, hrefs, generated ids, classes, styles) is treated as volatile.
+_STABLE_HTML_ATTRIBUTES: tuple[str, ...] = ("name", "type", "role", "autocomplete", "for", "action", "method")
+_HTML_TAG_PATTERN = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)([^>]*)>")
+_HTML_ATTRIBUTE_PATTERN = re.compile(r'([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_SKIPPED_HTML_TAGS: frozenset[str] = frozenset({"script", "style", "link", "meta", "svg", "path", "noscript"})
+# Links and buttons are told apart by what they say: two result pages share their structure but not their listings.
+_TEXT_KEYED_TAGS: frozenset[str] = frozenset({"a", "button", "summary"})
+_TEXT_KEYED_ROLES: frozenset[str] = frozenset({"link", "button", "tab", "menuitem", "option"})
+_UID_SELECTOR_PATTERN = re.compile(r"""\[data-agent-uid=(["']?)([^"'\]]+)\1\]""")
+# Stands in for a uid selector in stored responses, as the index of the element in the page's element list.
+_ELEMENT_INDEX_PATTERN = re.compile(r"@element\[(\d+)\]")
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _actionable_structure(distilled: dict[str, Any]) -> list[str]:
+    """
+    Reduce a get_dom(mode="actionable") payload to the shape and fill state of its elements. Selectors
+    are left out: the data-agent-uid ones are numbered per page load, so the same form would get a new
+    key on every visit.
+    """
+    structure: list[str] = []
+    for element in cast(list[dict[str, Any]], distilled.get("elements", [])):
+        filled = bool(element.get("checked")) or bool(element.get("value"))
+        text_keyed = element.get("tag") in _TEXT_KEYED_TAGS or element.get("role") in _TEXT_KEYED_ROLES
+        structure.append("|".join([
+            str(element.get("tag", "")),
+            str(element.get("role", "")),
+            str(element.get("type", "")),
+            str(element.get("name", "")),
+            str(element.get("label", "")),
+            str(element.get("text", "")) if text_keyed else "",
+            str(len(element.get("options", []))),
+            "filled" if filled else "empty"
+        ]))
+    return structure
+
+def _html_structure(html: str) -> list[str]:
+    """Reduce raw HTML to its sequence of tags and stable attributes."""
+    structure: list[str] = []
+    for match in _HTML_TAG_PATTERN.finditer(html):
+        tag, attributes = match.group(1).lower(), match.group(2)
+        if tag in _SKIPPED_HTML_TAGS:
+            continue
+        stable = [
+            f"{name.lower()}={double or single}"
+            for name, double, single in _HTML_ATTRIBUTE_PATTERN.findall(attributes)
+            if name.lower() in _STABLE_HTML_ATTRIBUTES
+        ]
+        if tag in _TEXT_KEYED_TAGS:
+            # The text up to the next tag, enough to tell "Apply" from "Save" or one listing from another.
+            end = html.find("<", match.end())
+            stable.append(f"text={' '.join(html[match.end():end if end >= 0 else len(html)].split())}")
+        structure.append(" ".join([tag, *stable]))
+    return structure
+
+def _element_uids(dom: str) -> Optional[list[str]]:
+    """The uids of a get_dom(mode="actionable") payload's elements in page order, None for other payloads."""
+    try:
+        payload = json.loads(dom)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(payload, dict) or cast(dict[str, Any], payload).get("mode") != "actionable":
+        return None
+    return [str(element.get("uid", "")) for element in cast(list[dict[str, Any]], cast(dict[str, Any], payload).get("elements", []))]
+
+def _replace_in_strings(instructions: list[dict[str, Any]], pattern: re.Pattern[str], replace: Callable[[re.Match[str]], str]) -> list[dict[str, Any]]:
+    return [
+        {key: pattern.sub(replace, value) if isinstance(value, str) else value for key, value in instruction.items()}
+        for instruction in instructions
+    ]
+
+def portable_selectors(instructions: list[dict[str, Any]], dom: str) -> Optional[list[dict[str, Any]]]:
+    """
+    Rewrite the data-agent-uid selectors of instructions into the index of their element on the page
+    they were generated for, so they can be stored under the page's structural key. Returns None when
+    a uid selector does not point into the page's element list (full mode pages, stale uids): such a
+    response cannot be replayed safely on another load of the page.
+    """
+    uids = _element_uids(dom)
+    unmapped = False
+
+    def to_index(match: re.Match[str]) -> str:
+        nonlocal unmapped
+        if uids is None or match.group(2) not in uids:
+            unmapped = True
+            return match.group(0)
+        return f"@element[{uids.index(match.group(2))}]"
+
+    portable = _replace_in_strings(instructions, _UID_SELECTOR_PATTERN, to_index)
+    return None if unmapped else portable
+
+def live_selectors(instructions: list[dict[str, Any]], dom: str) -> Optional[list[dict[str, Any]]]:
+    """Map the element indices of stored instructions back to the uid selectors of the live page, None if one does not fit it."""
+    uids = _element_uids(dom) or []
+    unmapped = False
+
+    def to_uid(match: re.Match[str]) -> str:
+        nonlocal unmapped
+        index = int(match.group(1))
+        if index >= len(uids):
+            unmapped = True
+            return match.group(0)
+        return f'[data-agent-uid="{uids[index]}"]'
+
+    live = _replace_in_strings(instructions, _ELEMENT_INDEX_PATTERN, to_uid)
+    return None if unmapped else live
+
+def dom_fingerprint(dom: str) -> str:
+    """
+    Return a structural fingerprint of a get_dom payload that ignores text and volatile attributes,
+    so the same login form, search panel or apply step maps to the same key across visits.
+    """
+    try:
+        payload = json.loads(dom)
+    except json.JSONDecodeError:
+        payload = None
+    if isinstance(payload, dict) and cast(dict[str, Any], payload).get("mode") == "actionable":
+        structure = _actionable_structure(cast(dict[str, Any], payload))
+    elif isinstance(payload, dict):
+        structure = _html_structure(str(cast(dict[str, Any], payload).get("html", "")))
+    else:
+        structure = _html_structure(dom)
+    return _sha256("\n".join(structure))
+
+class LLMResponseCache:
+    """
+    Disk-backed (SQLite) cache of LLM instruction responses with LRU and TTL eviction.
+
+    Entries are keyed on phase, model, the structural DOM fingerprint and a hash of the prompt context.
+    Instructions are stored before interpolation, so '$placeholders' are resolved against fresh
+    applicant data on every hit and no credentials end up on disk. Callers store uid selectors as
+    element indices (portable_selectors) and map them back on a hit (live_selectors), since the
+    uids are numbered per page load.
+    """
+    def __init__(self, path: str = "llm_cache.sqlite3", max_entries: int = 2000, ttl_seconds: float = 7 * 24 * 3600) -> None:
+        self.path: str = path
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        # Per phase hit/miss counters, e.g. {"login": {"hits": 3, "misses": 1}}
+        self.stats: dict[str, dict[str, int]] = {}
+        # WAL and a busy timeout, the file may be shared by the worker processes of a fleet.
+        self.connection: sqlite3.Connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # Streamed asks read and write from worker threads while other sites use the cache on the event loop.
+        self.lock: threading.Lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, phase TEXT NOT NULL, instructions TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used_at)")
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(phase: str, model: str, dom: str, context_str: str) -> str:
+        return _sha256(f"{phase}\n{model}\n{dom_fingerprint(dom)}\n{_sha256(context_str)}")
+
+    def _count(self, phase: str, outcome: str) -> None:
+        counters = self.stats.setdefault(phase, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, key: str, phase: str) -> Optional[list[dict[str, Any]]]:
+        """Return the un-interpolated instructions cached under `key`, or None on a miss or expiry."""
+        with self.lock:
+            now = time.time()
+            row = self.connection.execute("SELECT instructions, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.connection.commit()
+                row = None
+            if row is None:
+                self._count(phase, "misses")
+                logger.debug(f"[LLM Cache] Miss for {phase} ({key[:12]})")
+                return None
+            self.connection.execute("UPDATE responses SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.connection.commit()
+            self._count(phase, "hits")
+            logger.info(f"[LLM Cache] ✅ Hit for {phase} ({key[:12]})")
+            return json.loads(row[0])
+
+    def put(self, key: str, phase: str, instructions: list[dict[str, Any]]) -> None:
+        """Store un-interpolated instructions and evict the least recently used entries beyond max_entries."""
+        with self.lock:
+            now = time.time()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, phase, instructions, created_at, last_used_at, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, phase, json.dumps(instructions), now, now)
+            )
+            self.connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self.connection.commit()
+
+    def invalidate(self, key: str) -> None:
+        """Drop an entry whose instructions turned out not to work on the page."""
+        with self.lock:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.connection.commit()
+        logger.info(f"[LLM Cache] Invalidated {key[:12]}")
+
+    def log_stats(self) -> None:
+        for phase, counters in self.stats.items():
+            total = counters["hits"] + counters["misses"]
+            logger.info(f"[LLM Cache] {phase}: {counters['hits']} hits, {counters['misses']} misses ({counters['hits'] / total:.0%} hit rate)")
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,478 @@
+import asyncio
+import contextvars
+import importlib
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Generator, Iterator, Optional, Union, cast
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import LLMRateLimiter
+from tracing import Tracer
+
+if TYPE_CHECKING:
+    # The OpenAI SDK takes longer to import than the rest of the agent, it is only imported once an OpenAI tier is used.
+    from openai import OpenAI, AsyncOpenAI
+    from openai.types.chat import ChatCompletionMessageParam
+
+logger = logging.getLogger("JobApplicationAgent")
+
+OLLAMA_CHAT_URL = "http://localhost:11434/api/chat"
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+# Status codes worth retrying: rate limiting, overloaded or restarting upstreams.
+RETRYABLE_STATUS_CODES: frozenset[int] = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+class RetryableStatusError(Exception):
+    """Raised for HTTP responses whose status code is in RETRYABLE_STATUS_CODES."""
+
+def _chat_messages(messages: list[Any]) -> list[dict[str, str]]:
+    """Provider chat messages: anything that is not system/assistant (e.g. the 'applicant' prompt) is sent as 'user'."""
+    return [
+        {"role": message["role"] if message["role"] in ("system", "assistant") else "user", "content": message["content"]}
+        for message in messages
+    ]
+
+def _anthropic_block(message: dict[str, Any]) -> dict[str, Any]:
+    block: dict[str, Any] = {"type": "text", "text": message["content"]}
+    if message.get("cache"):
+        block["cache_control"] = {"type": "ephemeral"}
+    return block
+
+def _anthropic_body(model: str, messages: list[Any], stream: bool) -> dict[str, Any]:
+    """
+    Anthropic takes the system prompt as a top level field rather than as a message. Sections the
+    agent flags with "cache" (the static system prompt and applicant context) end in a cache_control
+    breakpoint, so later calls read them from the prompt cache instead of processing them again.
+    """
+    return {
+        "model": model,
+        "max_tokens": 1024,
+        "system": [_anthropic_block(message) for message in messages if message["role"] == "system"],
+        "messages": [
+            {"role": "assistant" if message["role"] == "assistant" else "user", "content": [_anthropic_block(message)]}
+            for message in messages if message["role"] != "system"
+        ],
+        "stream": stream
+    }
+
+def _anthropic_usage(usage: dict[str, Any]) -> dict[str, int]:
+    """Prompt token counts of an Anthropic usage object; input_tokens only counts the uncached remainder."""
+    cached = int(usage.get("cache_read_input_tokens") or 0)
+    written = int(usage.get("cache_creation_input_tokens") or 0)
+    return {"prompt_tokens": int(usage.get("input_tokens") or 0) + cached + written, "cached_tokens": cached, "cache_write_tokens": written}
+
+def _openai_usage(usage: Any) -> Optional[dict[str, int]]:
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    return {"prompt_tokens": int(usage.prompt_tokens), "cached_tokens": int(cached or 0)}
+
+def _ollama_usage(body: dict[str, Any]) -> Optional[dict[str, int]]:
+    # Ollama reuses the KV cache of a matching prompt prefix without reporting it; prompt_eval_count is
+    # the number of prompt tokens actually evaluated, which shrinks when the prefix was reused.
+    if "prompt_eval_count" not in body:
+        return None
+    return {"prompt_tokens": int(body["prompt_eval_count"]), "cached_tokens": 0}
+
+def _anthropic_text(response: dict[str, Any]) -> str:
+    return "".join(block.get("text", "") for block in cast(list[dict[str, Any]], response.get("content", [])))
+
+class LLMClientPool:
+    """
+    Shared, reused HTTP and SDK clients for every LLMAgent (login, search and application).
+
+    A single keep-alive requests.Session / httpx.AsyncClient / OpenAI client per process avoids paying
+    TCP and TLS setup on every step. Calls get connect/read timeouts and a bounded number of retries with
+    exponential backoff. Ollama requests carry `keep_alive` so the model stays resident between phases.
+    Per provider latency is split into generation time (reported by the server where possible) and the
+    remaining connect/transfer overhead. With a rate_limiter, every request first takes one of its
+    slots, which caps LLM load across all worker processes of a fleet.
+    """
+    _shared: Optional["LLMClientPool"] = None
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 180.0,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+        pool_size: int = 8,
+        ollama_keep_alive: str = "30m",
+        rate_limiter: Optional[LLMRateLimiter] = None,
+        ollama_url: str = OLLAMA_CHAT_URL,
+        openai_base_url: Optional[str] = None
+    ) -> None:
+        self.connect_timeout: float = connect_timeout
+        self.read_timeout: float = read_timeout
+        self.max_retries: int = max_retries
+        self.backoff_seconds: float = backoff_seconds
+        self.pool_size: int = pool_size
+        self.ollama_keep_alive: str = ollama_keep_alive
+        self.rate_limiter: Optional[LLMRateLimiter] = rate_limiter
+        # Endpoints, overridden to point the agents at a local stand-in such as mock_llm.py.
+        self.ollama_url: str = ollama_url
+        self.openai_base_url: Optional[str] = openai_base_url
+        self.session: requests.Session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_http: Optional[httpx.AsyncClient] = None
+        self._openai_clients: dict[str, "OpenAI"] = {}
+        self._async_openai_clients: dict[str, "AsyncOpenAI"] = {}
+        # Per provider counters, e.g. {"ollama": {"calls": 4, "retries": 1, "wall_seconds": ..., "generation_seconds": ...,
+        # "overhead_seconds": ..., "prompt_tokens": ..., "cached_tokens": ..., "cache_write_tokens": ...}}
+        self.stats: dict[str, dict[str, float]] = {}
+
+    @classmethod
+    def shared(cls) -> "LLMClientPool":
+        """Process wide pool used by agents that were not handed one explicitly."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @property
+    def _timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def _httpx_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def _async_client(self) -> httpx.AsyncClient:
+        if self._async_http is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._async_http = httpx.AsyncClient(timeout=self._httpx_timeout(), limits=limits)
+        return self._async_http
+
+    def openai_client(self, api_key: Optional[str]) -> "OpenAI":
+        key = api_key or ""
+        if key not in self._openai_clients:
+            from openai import OpenAI
+            self._openai_clients[key] = OpenAI(api_key=api_key, base_url=self.openai_base_url, timeout=self._httpx_timeout(), max_retries=self.max_retries)
+        return self._openai_clients[key]
+
+    def async_openai_client(self, api_key: Optional[str]) -> "AsyncOpenAI":
+        key = api_key or ""
+        if key not in self._async_openai_clients:
+            from openai import AsyncOpenAI
+            self._async_openai_clients[key] = AsyncOpenAI(api_key=api_key, base_url=self.openai_base_url, timeout=self._httpx_timeout(), max_retries=self.max_retries)
+        return self._async_openai_clients[key]
+
+    def _record(self, provider: str, started: float, generation_seconds: Optional[float], retries: int, usage: Optional[dict[str, int]] = None) -> None:
+        wall = time.perf_counter() - started
+        generation = min(generation_seconds, wall) if generation_seconds is not None else wall
+        stats = self.stats.setdefault(provider, {
+            "calls": 0, "retries": 0, "wall_seconds": 0.0, "generation_seconds": 0.0, "overhead_seconds": 0.0,
+            "prompt_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0
+        })
+        stats["calls"] += 1
+        stats["retries"] += retries
+        if retries:
+            Tracer.shared().count("llm_retries", retries, provider=provider)
+        stats["wall_seconds"] += wall
+        stats["generation_seconds"] += generation
+        stats["overhead_seconds"] += wall - generation
+        usage_str = ""
+        if usage is not None:
+            for name, value in usage.items():
+                stats[name] += value
+                Tracer.shared().count(f"llm_{name}", value, provider=provider)
+            usage_str = f", {usage['prompt_tokens']} prompt tokens ({usage['cached_tokens']} cached)"
+        logger.debug(f"[LLM Clients] {provider} call: {wall:.2f}s total, {generation:.2f}s generation, {wall - generation:.2f}s connect/transfer, {retries} retries{usage_str}")
+
+    @contextmanager
+    def _slot(self) -> Generator[None, None, None]:
+        if self.rate_limiter is None:
+            yield
+            return
+        with self.rate_limiter.slot():
+            yield
+
+    @asynccontextmanager
+    async def _aslot(self) -> AsyncGenerator[None, None]:
+        if self.rate_limiter is None:
+            yield
+            return
+        async with self.rate_limiter.aslot():
+            yield
+
+    def _read_ahead(self, chunks: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Yield the chunks of a streamed response. With a rate limiter, the response is read on a
+        background thread that holds the slot only until the stream ends, so the browser work the
+        caller does between chunks does not keep other requests waiting.
+        """
+        if self.rate_limiter is None:
+            yield from chunks()
+            return
+        rate_limiter = self.rate_limiter
+        received: queue.SimpleQueue[Union[str, BaseException, None]] = queue.SimpleQueue()
+        abandoned = threading.Event()
+
+        def read() -> None:
+            try:
+                with rate_limiter.slot():
+                    for chunk in chunks():
+                        if abandoned.is_set():
+                            break
+                        received.put(chunk)
+            except BaseException as e:
+                received.put(e)
+            else:
+                received.put(None)
+
+        # Run in a copy of the caller's context, so spans and counters keep its site and phase.
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(read,), name="llm-stream", daemon=True).start()
+        try:
+            while True:
+                item = received.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            abandoned.set()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_seconds * (2 ** attempt)
+
+    def _post(self, url: str, payload: dict[str, Any], headers: Optional[dict[str, str]] = None, stream: bool = False) -> tuple[requests.Response, int]:
+        """POST with bounded retries on connection errors, timeouts and retryable status codes."""
+        attempt = 0
+        while True:
+            try:
+                res = self.session.post(url, json=payload, headers=headers, timeout=self._timeout, stream=stream)
+                if res.status_code in RETRYABLE_STATUS_CODES:
+                    res.close()
+                    raise RetryableStatusError(f"HTTP {res.status_code} from {url}")
+                res.raise_for_status()
+                return res, attempt
+            except (requests.ConnectionError, requests.Timeout, RetryableStatusError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"[LLM Clients] ⚠️ Request to {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    async def _apost(self, url: str, payload: dict[str, Any], headers: Optional[dict[str, str]] = None) -> tuple[httpx.Response, int]:
+        """Async POST with the same retry policy as _post."""
+        attempt = 0
+        while True:
+            try:
+                res = await self._async_client().post(url, json=payload, headers=headers)
+                if res.status_code in RETRYABLE_STATUS_CODES:
+                    raise RetryableStatusError(f"HTTP {res.status_code} from {url}")
+                res.raise_for_status()
+                return res, attempt
+            except (httpx.TransportError, RetryableStatusError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"[LLM Clients] ⚠️ Request to {url} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    # --- Ollama ---
+
+    def _ollama_payload(self, model: str, messages: list[Any], stream: bool) -> dict[str, Any]:
+        return {"model": model, "messages": _chat_messages(messages), "stream": stream, "keep_alive": self.ollama_keep_alive}
+
+    def ollama_chat(self, model: str, messages: list[Any]) -> str:
+        with self._slot():
+            started = time.perf_counter()
+            res, retries = self._post(self.ollama_url, self._ollama_payload(model, messages, stream=False))
+            body = res.json()
+            # Ollama reports its own durations in nanoseconds, including any model (re)load.
+            self._record("ollama", started, body.get("total_duration", 0) / 1e9 or None, retries, _ollama_usage(body))
+            return body["message"]["content"]
+
+    def _ollama_chunks(self, model: str, messages: list[Any]) -> Iterator[str]:
+        started = time.perf_counter()
+        res, retries = self._post(self.ollama_url, self._ollama_payload(model, messages, stream=True), stream=True)
+        generation: Optional[float] = None
+        usage: Optional[dict[str, int]] = None
+        with res:
+            for line in res.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                yield chunk.get("message", {}).get("content", "")
+                if chunk.get("done"):
+                    generation = chunk.get("total_duration", 0) / 1e9 or None
+                    usage = _ollama_usage(chunk)
+                    break
+        self._record("ollama", started, generation, retries, usage)
+
+    def ollama_stream(self, model: str, messages: list[Any]) -> Iterator[str]:
+        return self._read_ahead(lambda: self._ollama_chunks(model, messages))
+
+    async def ollama_chat_async(self, model: str, messages: list[Any]) -> str:
+        async with self._aslot():
+            started = time.perf_counter()
+            res, retries = await self._apost(self.ollama_url, self._ollama_payload(model, messages, stream=False))
+            body = res.json()
+            self._record("ollama", started, body.get("total_duration", 0) / 1e9 or None, retries, _ollama_usage(body))
+            return body["message"]["content"]
+
+    # --- OpenAI ---
+
+    def openai_chat(self, api_key: Optional[str], model: str, messages: list[Any]) -> str:
+        with self._slot():
+            started = time.perf_counter()
+            raw = self.openai_client(api_key).chat.completions.with_raw_response.create(
+                model=model,
+                messages=cast("list[ChatCompletionMessageParam]", _chat_messages(messages)),
+                temperature=0.2
+            )
+            processing_ms = raw.headers.get("openai-processing-ms")
+            completion = raw.parse()
+            self._record("openai", started, float(processing_ms) / 1000 if processing_ms else None, raw.retries_taken, _openai_usage(completion.usage))
+            res = completion.choices[0].message.content
+            if res is None:
+                raise ValueError("[LLM Agent] ⚠️ LLM returned no content.")
+            return res
+
+    def _openai_chunks(self, api_key: Optional[str], model: str, messages: list[Any]) -> Iterator[str]:
+        started = time.perf_counter()
+        stream = self.openai_client(api_key).chat.completions.create(
+            model=model,
+            messages=cast("list[ChatCompletionMessageParam]", _chat_messages(messages)),
+            temperature=0.2,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        usage: Optional[dict[str, int]] = None
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage is not None:
+                usage = _openai_usage(chunk.usage)
+        self._record("openai", started, None, 0, usage)
+
+    def openai_stream(self, api_key: Optional[str], model: str, messages: list[Any]) -> Iterator[str]:
+        return self._read_ahead(lambda: self._openai_chunks(api_key, model, messages))
+
+    async def openai_chat_async(self, api_key: Optional[str], model: str, messages: list[Any]) -> str:
+        async with self._aslot():
+            started = time.perf_counter()
+            raw = await self.async_openai_client(api_key).chat.completions.with_raw_response.create(
+                model=model,
+                messages=cast("list[ChatCompletionMessageParam]", _chat_messages(messages)),
+                temperature=0.2
+            )
+            processing_ms = raw.headers.get("openai-processing-ms")
+            completion = raw.parse()
+            self._record("openai", started, float(processing_ms) / 1000 if processing_ms else None, raw.retries_taken, _openai_usage(completion.usage))
+            res = completion.choices[0].message.content
+            if res is None:
+                raise ValueError("[LLM Agent] ⚠️ LLM returned no content.")
+            return res
+
+    # --- Anthropic ---
+
+    @staticmethod
+    def _anthropic_headers(api_key: Optional[str]) -> dict[str, str]:
+        return {
+            "x-api-key": api_key or "",
+            "anthropic-version": ANTHROPIC_VERSION,
+            "Content-Type": "application/json"
+        }
+
+    def anthropic_chat(self, api_key: Optional[str], model: str, messages: list[Any]) -> str:
+        with self._slot():
+            started = time.perf_counter()
+            res, retries = self._post(ANTHROPIC_MESSAGES_URL, _anthropic_body(model, messages, stream=False), self._anthropic_headers(api_key))
+            # The response headers only arrive once generation is complete, the rest is transfer.
+            body = res.json()
+            self._record("anthropic", started, res.elapsed.total_seconds(), retries, _anthropic_usage(body.get("usage", {})))
+            return _anthropic_text(body)
+
+    def _anthropic_chunks(self, api_key: Optional[str], model: str, messages: list[Any]) -> Iterator[str]:
+        started = time.perf_counter()
+        res, retries = self._post(ANTHROPIC_MESSAGES_URL, _anthropic_body(model, messages, stream=True), self._anthropic_headers(api_key), stream=True)
+        usage: Optional[dict[str, int]] = None
+        with res:
+            for raw_line in res.iter_lines():
+                line = raw_line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if event.get("type") == "content_block_delta":
+                    yield event.get("delta", {}).get("text", "")
+                elif event.get("type") == "message_start":
+                    usage = _anthropic_usage(event.get("message", {}).get("usage", {}))
+        self._record("anthropic", started, None, retries, usage)
+
+    def anthropic_stream(self, api_key: Optional[str], model: str, messages: list[Any]) -> Iterator[str]:
+        return self._read_ahead(lambda: self._anthropic_chunks(api_key, model, messages))
+
+    async def anthropic_chat_async(self, api_key: Optional[str], model: str, messages: list[Any]) -> str:
+        async with self._aslot():
+            started = time.perf_counter()
+            res, retries = await self._apost(ANTHROPIC_MESSAGES_URL, _anthropic_body(model, messages, stream=False), self._anthropic_headers(api_key))
+            body = res.json()
+            self._record("anthropic", started, res.elapsed.total_seconds(), retries, _anthropic_usage(body.get("usage", {})))
+            return _anthropic_text(body)
+
+    # --- Warm-up ---
+
+    def warm_up(self, tiers: list[tuple[str, str]]) -> float:
+        """
+        Get (provider, model) tiers ready for their first request, e.g. on a background thread while the
+        browser launches: Ollama loads the model and keeps it resident for ollama_keep_alive (a chat
+        without messages only loads it), for OpenAI the SDK is imported. Returns the seconds it took.
+        A tier that fails to warm up is logged and left to its first request, as without warm-up.
+        """
+        started = time.perf_counter()
+        for provider, model in tiers:
+            tier_started = time.perf_counter()
+            try:
+                if provider == "ollama":
+                    res, _ = self._post(self.ollama_url, {"model": model, "messages": [], "keep_alive": self.ollama_keep_alive})
+                    res.close()
+                elif provider == "openai":
+                    importlib.import_module("openai")
+                else:
+                    continue
+            except Exception as e:
+                logger.warning(f"[LLM Clients] ⚠️ Could not warm up {provider}:{model}: {e}")
+                continue
+            logger.info(f"[LLM Clients] {provider}:{model} warmed up in {time.perf_counter() - tier_started:.2f}s")
+        return time.perf_counter() - started
+
+    def log_stats(self) -> None:
+        for provider, stats in self.stats.items():
+            calls = stats["calls"]
+            logger.info(
+                f"[LLM Clients] {provider}: {int(calls)} calls, {int(stats['retries'])} retries, "
+                f"avg {stats['wall_seconds'] / calls:.2f}s total = {stats['generation_seconds'] / calls:.2f}s generation + "
+                f"{stats['overhead_seconds'] / calls:.2f}s connect/transfer"
+            )
+            if stats["prompt_tokens"]:
+                logger.info(
+                    f"[LLM Clients] {provider}: {int(stats['prompt_tokens'])} prompt tokens, {int(stats['cached_tokens'])} read from the prompt cache "
+                    f"({stats['cached_tokens'] / stats['prompt_tokens']:.0%}), {int(stats['cache_write_tokens'])} written to it"
+                )
+
+    def close(self) -> None:
+        self.session.close()
+        for client in self._openai_clients.values():
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the async clients along with the sync ones (see close)."""
+        self.close()
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+        for client in self._async_openai_clients.values():
+            await client.close()
+        self._async_openai_clients = {}
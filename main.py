@@ -1,33 +1,179 @@
-from typing import Any, Optional
-from browser_controller import BrowserController
+import time
+# Taken before the imports below, so the startup breakdown includes them.
+PROCESS_STARTED = time.perf_counter()
+from typing import Any, AsyncIterator, Generator, Iterable, Optional, Union, cast
+from browser_controller import BrowserController, DEFAULT_SETTLE_QUIET_MS, launch_browser
 from llm_agent import LLMAgent
-from executor import InstructionExecutor
+from llm_cache import LLMResponseCache
+from llm_clients import LLMClientPool
+from model_router import ModelRouter
+from rate_limiter import LLMRateLimiter
+from playbooks import PlaybookStore
+from request_blocking import RequestBlocker, DEFAULT_BLOCKED_DOMAINS, DEFAULT_ALLOWED_DOMAINS
+from session_store import SessionStore
+from job_index import JobIndex, job_id_from_url
+from page_tracker import PageTracker
+from form_filler import FormFiller, captured_field_templates, flatten_values
+from tracing import Tracer
+from artifact_store import ArtifactStore
+from intervention_queue import InterventionQueue, RESUMED
+from intervention_control import InterventionServer, start_control_surfaces
+from executor import InstructionExecutor, loggable
+from playwright.async_api import async_playwright, Browser
+import asyncio
 import json
 import logging
-from plyer import notification
-import os
+import logging.handlers
+import multiprocessing
+import queue
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
 
 APPLICATIONS_PER_SITE_LIMIT = 10
-# Create logger
+# Every site's login/search/apply pipeline runs concurrently in its own BrowserContext of one browser, up to this many at once.
+MAX_CONCURRENT_SITES = 3
+MAX_CONCURRENT_LLM_REQUESTS = 2  # global cap on in-flight LLM requests across all sites
+# Shared keep-alive LLM clients: timeouts, bounded retries with backoff, and how long Ollama keeps the model loaded.
+LLM_CONNECT_TIMEOUT_SECONDS = 5.0
+LLM_READ_TIMEOUT_SECONDS = 180.0
+LLM_MAX_RETRIES = 2
+OLLAMA_KEEP_ALIVE = "30m"
+# Disk-backed cache of LLM responses keyed by phase + structural DOM fingerprint + context hash.
+LLM_CACHE_PATH = "llm_cache.sqlite3"
+LLM_CACHE_MAX_ENTRIES = 2000
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+# Recorded login/search instruction sequences replayed per site before falling back to the LLM.
+PLAYBOOKS_DIR = "playbooks"
+PLAYBOOK_STEP_TIMEOUT_MS = 5000  # how long a replayed step may wait for its selector before the LLM takes over
+# Saved cookies/localStorage per site, restored at context creation so Phase 1 can be skipped.
+SESSIONS_DIR = "sessions"
+# Execute instructions as soon as the model finishes generating each one instead of after the full response.
+STREAM_LLM_RESPONSES = True
+# Check instruction selectors in one in-page pass before executing them and send rejected ones straight
+# back to the LLM for correction, instead of discovering them through retries and action timeouts.
+PREFLIGHT_VALIDATION = True
+# Apply runs of consecutive fill/select instructions in one browser round trip (fully received responses only).
+BATCH_FORM_FILLS = True
+# After each action, wait for the page to settle (navigation loaded, or no DOM mutations and no in-flight
+# requests for SETTLE_QUIET_MS) before reading the DOM again, up to a per action budget. Only the budgets
+# that differ from browser_controller.DEFAULT_SETTLE_BUDGETS_MS go here, e.g. {"goto": 15000}.
+SETTLE_BUDGETS_MS: dict[str, float] = {}
+SETTLE_QUIET_MS = DEFAULT_SETTLE_QUIET_MS
+# Block requests the agent never uses (images, fonts, video, ad/analytics beacons) in every site context, in Chrome
+# itself so the HTTP cache stays on. Counted in the run summary.
+# Sites that break without them go in UNBLOCKED_SITES; nothing from ALLOWED_DOMAINS is blocked, so captchas keep working.
+REQUEST_BLOCKING = True
+BLOCKED_RESOURCE_TYPES: tuple[str, ...] = ("image", "media", "font")
+BLOCKED_DOMAINS: tuple[str, ...] = DEFAULT_BLOCKED_DOMAINS
+ALLOWED_DOMAINS: tuple[str, ...] = DEFAULT_ALLOWED_DOMAINS
+UNBLOCKED_SITES: tuple[str, ...] = ()
+# Structured spans per site/phase/step (JSONL, appended to across runs) and Prometheus text format metrics, rewritten every few seconds.
+TRACE_PATH = "agent_trace.jsonl"
+METRICS_PATH = "agent_metrics.prom"
+# SQLite index of listings per site: listings already applied to, or failed JOB_MAX_ATTEMPTS times, are skipped
+# on later runs without an LLM call. The listings of the results page are extracted with the site's selector
+# from JOB_LISTING_SELECTORS, or any link that looks like a job posting, and opened directly.
+SKIP_KNOWN_JOBS = True
+JOBS_DB_PATH = "jobs.sqlite3"
+JOB_MAX_ATTEMPTS = 2
+MAX_STEPS_PER_APPLICATION = 25  # LLM steps spent on one listing before it counts as a failed attempt
+JOB_LISTING_SELECTORS: dict[str, str] = {
+    "linkedin.com": "a[href*='/jobs/view/']",
+    "indeed.com": "a[data-jk], a[href*='viewjob']",
+    "glassdoor.com": "a[data-test='job-link'], a[href*='job-listing']"
+}
+# While a listing is being applied to, load and snapshot the next one in a background tab.
+PREFETCH_NEXT_LISTING = True
+# Stuck pages are detected locally: actions ran but the page stayed the same for this many steps, or it
+# returned to the same state this many times. The loop then recovers without asking the LLM.
+STUCK_AFTER_UNCHANGED_STEPS = 2
+STUCK_MAX_REVISITS = 3
+# Send the LLM only what changed on the page since its last full snapshot, for up to MAX_DELTA_STEPS steps.
+DOM_DELTA_MODE = False
+MAX_DELTA_STEPS = 4
+# Fill the application form fields recognised from applicant_data.json (by autocomplete, label or name)
+# locally before each LLM step, so the LLM only handles the fields that are left. Field names are also
+# learned from the capture extension's exports (instruction-*.json) saved in CAPTURES_DIR.
+LOCAL_FORM_FILL = True
+CAPTURES_DIR = "captures"
+# Manual interventions are queued: the site that needs a human waits on its entry while the other sites running
+# alongside it (see MAX_CONCURRENT_SITES) carry on, and pending ones are resumed or skipped from the console
+# and/or a localhost page (None disables it).
+# Unresolved interventions count as skipped after INTERVENTION_TIMEOUT_SECONDS (None waits indefinitely).
+INTERVENTIONS_PATH = "interventions.sqlite3"
+INTERVENTION_CONSOLE = True
+INTERVENTION_HTTP_PORT: Optional[int] = 8765
+INTERVENTION_TIMEOUT_SECONDS: Optional[float] = None
+# Compressed, content-addressed store for DOM snapshots and raw LLM responses referenced from the log. The oldest
+# artifacts are evicted beyond ARTIFACTS_MAX_BYTES on disk or ARTIFACTS_MAX_AGE_SECONDS of age (None for no limit).
+ARTIFACTS_DIR = "artifacts"
+ARTIFACTS_MAX_BYTES: Optional[int] = 500 * 1024 * 1024
+ARTIFACTS_MAX_AGE_SECONDS: Optional[float] = 14 * 24 * 3600
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# Per action timeouts that differ from executor.DEFAULT_ACTION_TIMEOUTS_MS, e.g. {"upload": 10000}.
+ACTION_TIMEOUTS_MS: dict[str, float] = {}
+# How the page is handed to the LLM in each phase: "full" sends the raw HTML, "actionable" sends only
+# the visible, interactable elements distilled in one in-page pass (far smaller prompts and faster steps).
+DOM_MODE_PER_PHASE: dict[str, str] = {
+    "login": "actionable",
+    "search": "actionable",
+    "application": "actionable"
+}
+# Models per phase as (provider, model) tiers, fastest first. Each step goes to the first tier and moves up one
+# tier when the answer cannot be parsed or its selectors are rejected; a step after one that did not change the
+# page starts at the second tier. A remote tier needs OPENAI_API_KEY / ANTHROPIC_API_KEY, e.g. ("openai", "gpt-4o-mini").
+MODEL_TIERS_PER_PHASE: dict[str, list[tuple[str, str]]] = {
+    "login": [("ollama", "gemma3:1b"), ("ollama", "gemma3:12b")],
+    "search": [("ollama", "gemma3:1b"), ("ollama", "gemma3:12b")],
+    "application": [("ollama", "gemma3:1b"), ("ollama", "gemma3:12b")]
+}
+ESCALATE_AFTER_UNCHANGED_STEPS = 1
+# The browser launches while the first tier model of every phase is loaded on a background thread (Ollama) or its
+# SDK imported (OpenAI), so the first step waits for the slower of the two rather than for both in turn.
+WARM_UP_MODELS = True
+# Tokens of page content per LLM call. None uses the model's default from dom_packer (MODEL_DOM_TOKEN_BUDGETS).
+DOM_TOKEN_BUDGET: Optional[int] = None
+LOG_PATH = "agent.log"
 logger = logging.getLogger("JobApplicationAgent")
-logger.setLevel(logging.DEBUG)  # Set default level
+# Sites of this process that are running or waiting to run, so an intervention can tell whether anything carries on meanwhile.
+unfinished_sites: set[str] = set()
+# The MAX_CONCURRENT_SITES slot held by the running site, given up while the site waits for an intervention.
+_site_slot: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("site_slot", default=None)
 
-# Formatter
-formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
 
-# File handler (logs to a file)
-file_handler = logging.FileHandler("agent.log", mode="w")  # Change mode to 'a' to append to logs from previous run, 'w' will truncate and start appending logs from current run
-file_handler.setLevel(logging.DEBUG)  # Show all levels in file
-file_handler.setFormatter(formatter)
+def setup_logging(log_path: str = LOG_PATH, console_level: int = logging.DEBUG) -> logging.handlers.QueueListener:
+    """
+    Route the agent's logger through a queue to a rotating log file and the console, and return the
+    started listener (its handlers are the file handler, then the console handler). Called once by each
+    entry point, which stops the listener on exit. The agent loop only enqueues records, formatting and
+    file/console I/O happen on the listener's thread.
+    """
+    logger.setLevel(logging.DEBUG)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    # Appends and rotates, so logs from previous runs are kept within LOG_MAX_BYTES x LOG_BACKUP_COUNT.
+    file_handler = logging.handlers.RotatingFileHandler(log_path, mode="a", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(formatter)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    return log_listener
 
-# Console handler (logs to stdout)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)  # Show all levels in file
-console_handler.setFormatter(formatter)
-
-# Attach handlers
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+def build_artifacts() -> ArtifactStore:
+    """Large payloads (DOM snapshots, raw LLM responses) go to the artifact store, the log only references them by id."""
+    artifacts = ArtifactStore(ARTIFACTS_DIR, ARTIFACTS_MAX_BYTES, ARTIFACTS_MAX_AGE_SECONDS)
+    ArtifactStore.set_shared(artifacts)
+    return artifacts
 
 
 def load_json(path: str) -> dict[str,str]:
@@ -35,23 +181,74 @@ def load_json(path: str) -> dict[str,str]:
         return json.load(f)
     
 def focus_browser():
+    # Started without waiting for it, like the alerts in notify_user.
     try:
-        os.system('''/usr/bin/osascript -e 'tell application "Google Chrome" to activate' ''')
+        subprocess.Popen(["/usr/bin/osascript", "-e", 'tell application "Google Chrome" to activate'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     except Exception as e:
         logger.warning(f"[Main] ⚠️ Could not focus browser: {e}")
-    
-def request_manual_intervention(message:str, phase:str) -> None:
-    logger.warning(f"⚠️[Main]  MANUAL INTERVENTION NEEDED [{phase}]⚠️")
+
+def open_intervention(message: str, phase: str, site: str) -> int:
+    """Queue an intervention for the site and alert the user, returns its id."""
+    Tracer.shared().count("interventions")
+    intervention_id = InterventionQueue.shared().open(site, phase, message, multiprocessing.current_process().name)
+    logger.warning(f"⚠️[Main]  MANUAL INTERVENTION NEEDED [{phase}] {site} (#{intervention_id})⚠️")
     logger.info(f"[Main] Reason: {message}")
+    logger.info(
+        f"[Main] Browser is open. Take the necessary action, then resume #{intervention_id} from the console (Enter, or '{intervention_id}') "
+        f"or the control page{f' on port {INTERVENTION_HTTP_PORT}' if INTERVENTION_HTTP_PORT is not None else ''}. {meanwhile(site)}"
+    )
     focus_browser()
-    logger.info("[Main] Browser is open. Please take the necessary action and press [Enter] to resume...")
-    notify_user(message)
-    input("[Paused] Press Enter when ready to continue...")
-    logger.info("[Main] Resuming autonomous control.")
-    
+    notify_user(f"{site}: {message}" if site else message)
+    return intervention_id
+
+def meanwhile(site: str) -> str:
+    """What happens while the site waits for its intervention, for the message to the user."""
+    others = len(unfinished_sites - {site})
+    if others:
+        return f"{others} other site{'s' if others > 1 else ''} keep{'' if others > 1 else 's'} running meanwhile."
+    timeout = InterventionQueue.shared().timeout_seconds
+    return f"Nothing else runs in this process until it is resolved{f' or skipped after {timeout:g}s' if timeout is not None else ''}."
+
+def intervention_resumed(intervention_id: int, status: str) -> bool:
+    if status == RESUMED:
+        logger.info(f"[Main] Intervention #{intervention_id} resumed. Resuming autonomous control.")
+        return True
+    logger.warning(f"[Main] ⚠️ Intervention #{intervention_id} {status}. Giving up on the current task.")
+    return False
+
+async def request_manual_intervention(message: str, phase: str, site: str = "") -> bool:
+    """
+    Park the site on a queued intervention until it is resumed or skipped from a control surface.
+    Its site slot is given up meanwhile, so a site waiting to run can take it. Returns True when
+    resumed, False when skipped or expired.
+    """
+    slot = _site_slot.get()
+    with Tracer.shared().span("intervention") as span:
+        span.set(reason=message)
+        intervention_id = open_intervention(message, phase, site)
+        if slot is not None:
+            slot.release()
+        try:
+            status = await InterventionQueue.shared().wait_async(intervention_id)
+        finally:
+            if slot is not None:
+                await slot.acquire()
+        span.set(status=status)
+    return intervention_resumed(intervention_id, status)
+
+def build_interventions() -> Optional[InterventionServer]:
+    """Set up the shared intervention queue and its control surfaces, returns the control page server to close."""
+    interventions = InterventionQueue(INTERVENTIONS_PATH, INTERVENTION_TIMEOUT_SECONDS)
+    InterventionQueue.set_shared(interventions)
+    expired = interventions.expire_pending()
+    if expired:
+        logger.info(f"[Main] Expired {expired} interventions left pending by an earlier run")
+    return start_control_surfaces(interventions, INTERVENTION_CONSOLE, INTERVENTION_HTTP_PORT)
+
 def notify_user(message: str) -> None:
-    # Desktop notification
+    # Desktop notification, plyer is only imported once a notification is due
     try:
+        from plyer import notification
         if callable(notification.notify):
             notification.notify( 
                 title="🛑 Manual Intervention Required",
@@ -61,162 +258,620 @@ def notify_user(message: str) -> None:
     except Exception as e:
         logger.warning(f"[Main] ⚠️ Notification failed: {e}")
     
-    # Audible alert (macOS example)
+    # Audible alert (macOS example), not waited for
     try:
-        os.system(f'say "{message}"')  # macOS only
+        subprocess.Popen(["say", message], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)  # macOS only
     except Exception as e:
         logger.warning(f"[Main] ⚠️ Audio alert failed: {e}")
         
-def main() -> None:
-    # 1. Define applicant preferences
-    applicant_preferences: dict[str,str] = load_json("applicant_preferences.json")
-    applicant_data: dict[str,str] = load_json("applicant_data.json")
-    applicant_credentials: dict[str,str] = load_json("applicant_credentials.json")
-    
-    # 2. Initialize components
-    logger.info(f"[Main] Initializing Browser Controller")
-    browser: BrowserController = BrowserController(headless=False)
-    logger.info(f"[Main] Initializing Instruction Executor")
-    executor: InstructionExecutor = InstructionExecutor(browser)
-    logger.info(f"[Main] Initializing LLMAgent for login phase")
-    login_agent: LLMAgent = LLMAgent('login')
-    logger.info(f"[Main] Initializing LLMAgent for search phase")
-    search_agent: LLMAgent = LLMAgent('search')
-    logger.info(f"[Main] Initializing LLMAgent for application phase")
-    application_agent: LLMAgent = LLMAgent('application')
-
-    # 3. For each site login, search and apply
-    for site in applicant_preferences["sites"]:
-        logger.info(f"[Main] Navigating to {site}...")
-        browser.goto(site)
-
-        # --- Phase 1: Login ---
-        loggedIn: bool = False
-        if site in applicant_credentials:
-            while True:
-                logger.info("[Main] (Login Phase) Fetching DOM")
-                dom_html = browser.get_dom()
-                logger.info("[Main] (Login Phase) Asking LLM for next action")
-                instructions = login_agent.ask(dom_html, {
-                    "site" : site,
-                    "phase": "login",
-                    "job_seeker_credentials": applicant_credentials
-                })
-                
-                if not instructions:
-                    logger.info("[Main] (Login Phase) No more instructions. Proceeding to search phase.")
-                    break
-                
-                for instr in instructions:
-                    if instr["action"] == "intervene":
-                        request_manual_intervention(instr['text'],'login')
-                    else:
-                        success : bool = executor.execute(instr)
-                        if not success:
-                            logger.error(f"[Main] ❌ Failed login instruction: {instr}")
-                            break
-                        else: 
-                            logger.info(f"[Main] ✅ Successfully executed login instruction: {instr}")
-                            if instr.get("action") == "done":
-                                logger.info("[Main] Login phase completed.")
-                                loggedIn = True
-                if loggedIn:
-                    break
+def logged_in_selector_for(site: str, applicant_credentials: dict[str, Any]) -> Optional[str]:
+    """Optional site specific selector (credentials' "logged_in_selector") that only exists when logged in."""
+    return cast(dict[str, Any], applicant_credentials.get(site, {})).get("logged_in_selector")
+
+def build_llm_clients(rate_limiter: Optional[LLMRateLimiter] = None) -> LLMClientPool:
+    return LLMClientPool(
+        connect_timeout=LLM_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=LLM_READ_TIMEOUT_SECONDS,
+        max_retries=LLM_MAX_RETRIES,
+        ollama_keep_alive=OLLAMA_KEEP_ALIVE,
+        rate_limiter=rate_limiter
+    )
+
+def build_model_router() -> ModelRouter:
+    return ModelRouter(MODEL_TIERS_PER_PHASE)
+
+def start_model_warm_up(llm_clients: LLMClientPool, model_router: ModelRouter) -> Optional[Future[float]]:
+    """Warm up the first tier of every phase on a background thread (see WARM_UP_MODELS), returns its seconds to come."""
+    if not WARM_UP_MODELS:
+        return None
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-warm-up")
+    model_warm_up = pool.submit(llm_clients.warm_up, model_router.first_tiers(DOM_MODE_PER_PHASE))
+    pool.shutdown(wait=False)
+    model_warm_up.add_done_callback(lambda done: Tracer.shared().count("startup_seconds", done.result(), stage="model_warm_up"))
+    return model_warm_up
+
+@contextmanager
+def startup_stage(stages: dict[str, float], stage: str) -> Generator[None, None, None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[stage] = time.perf_counter() - started
+
+def log_startup(stages: dict[str, float], model_warm_up: Optional[Future[float]]) -> None:
+    """Log where the time before the first navigation went and count it per stage as startup_seconds."""
+    for stage, seconds in stages.items():
+        Tracer.shared().count("startup_seconds", seconds, stage=stage)
+    breakdown = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stages.items())
+    if model_warm_up is None:
+        warm_up = ""
+    elif model_warm_up.done():
+        warm_up = f", model warm-up {model_warm_up.result():.2f}s (alongside)"
+    else:
+        warm_up = ", model warm-up still running alongside"
+    logger.info(f"[Main] ⏱️ Startup: {breakdown}{warm_up}. Ready for the first navigation after {time.perf_counter() - PROCESS_STARTED:.2f}s")
+
+def build_agents(llm_cache: LLMResponseCache, llm_clients: LLMClientPool, model_router: ModelRouter) -> tuple[LLMAgent, LLMAgent, LLMAgent]:
+    """The login, search and application agents."""
+    def agent(phase: str) -> LLMAgent:
+        return LLMAgent(
+            phase, dom_mode=DOM_MODE_PER_PHASE[phase], cache=llm_cache, clients=llm_clients, dom_token_budget=DOM_TOKEN_BUDGET,
+            dom_delta=DOM_DELTA_MODE, max_delta_steps=MAX_DELTA_STEPS, router=model_router
+        )
+    return agent("login"), agent("search"), agent("application")
+
+def build_tracer() -> Tracer:
+    tracer = Tracer(TRACE_PATH, METRICS_PATH)
+    Tracer.set_shared(tracer)
+    return tracer
+
+def build_request_blocker() -> Optional[RequestBlocker]:
+    if not REQUEST_BLOCKING:
+        return None
+    return RequestBlocker(BLOCKED_RESOURCE_TYPES, BLOCKED_DOMAINS, ALLOWED_DOMAINS, UNBLOCKED_SITES)
+
+def listing_selector_for(site: str) -> Optional[str]:
+    host = urlparse(site).hostname or site
+    return next((selector for domain, selector in JOB_LISTING_SELECTORS.items() if host == domain or host.endswith(f".{domain}")), None)
+
+def find_pending_listings(job_index: JobIndex, site: str, extracted: list[dict[str, str]], selector: Optional[str]) -> Optional[list[dict[str, Any]]]:
+    """
+    The extracted listings of a results page that were not applied to or rejected yet, or None when
+    the page has no recognisable listings and the LLM has to pick them itself.
+    """
+    if not SKIP_KNOWN_JOBS:
+        return None
+    if not any(selector is not None or job_id_from_url(listing["url"]) is not None for listing in extracted):
+        logger.info(f"[Main] No job listings recognised on the results page of {site}. The LLM picks listings.")
+        return None
+    return job_index.pending_listings(site, extracted, require_job_id=selector is None)
+
+async def ask_agent(
+    agent: LLMAgent,
+    dom_html: str,
+    context: dict[str, Any],
+    tracker: PageTracker
+) -> Optional[Union[list[dict[str, Any]], AsyncIterator[dict[str, Any]]]]:
+    """
+    Ask an agent for the next instructions, streamed one by one when STREAM_LLM_RESPONSES is enabled.
+    A streamed response is read on worker threads, so other sites keep running while the model generates.
+    """
+    if tracker.unchanged_steps >= ESCALATE_AFTER_UNCHANGED_STEPS:
+        agent.escalate()
+    if not STREAM_LLM_RESPONSES:
+        return await agent.ask_async(dom_html, context, tracker.actions_summary())
+    instructions = await asyncio.to_thread(agent.ask_stream, dom_html, context, tracker.actions_summary())
+    if instructions is None or isinstance(instructions, list):
+        return instructions
+    return stream_in_thread(instructions)
+
+async def stream_in_thread(instructions: Iterable[dict[str, Any]]) -> AsyncIterator[dict[str, Any]]:
+    """Yield the instructions of a blocking stream, waiting for each one on a worker thread."""
+    iterator = iter(instructions)
+    end = object()
+    while (instr := await asyncio.to_thread(next, iterator, end)) is not end:
+        yield cast(dict[str, Any], instr)
+
+async def iterate(instructions: Iterable[dict[str, Any]]) -> AsyncIterator[dict[str, Any]]:
+    for instr in instructions:
+        yield instr
+
+def build_page_tracker() -> PageTracker:
+    return PageTracker(STUCK_AFTER_UNCHANGED_STEPS, STUCK_MAX_REVISITS)
+
+def report_stuck_page(tracker: PageTracker, agent: LLMAgent, phase: str) -> str:
+    """
+    Log the page the loop is stuck on and reset the page history, so the recovery that follows
+    (intervention or giving up on the listing) starts from a clean slate. Returns the reason.
+    """
+    reason = tracker.stuck_reason or "The page is not reacting"
+    logger.warning(f"[Main] ({phase} Phase) ⚠️ Stuck: {reason}. Recovering without asking the LLM.")
+    Tracer.shared().count("stuck_pages")
+    # The cached response for this page is what got the loop stuck.
+    agent.forget_last_response()
+    agent.reset_page_history()
+    tracker.reset()
+    return reason
+
+def build_form_filler(applicant_data: dict[str, Any]) -> Optional[FormFiller]:
+    if not LOCAL_FORM_FILL or DOM_MODE_PER_PHASE["application"] != "actionable":
+        return None
+    return FormFiller(flatten_values(applicant_data), captured_field_templates(CAPTURES_DIR))
+
+
+async def prefill_form(form_filler: FormFiller, dom_html: str, browser: BrowserController, executor: InstructionExecutor, tracker: PageTracker) -> str:
+    """
+    Fill the fields of the page the form filler recognises, without the LLM. Returns the page to hand
+    to the LLM, read again when fields were filled so it only sees what is left to do.
+    """
+    instructions = form_filler.instructions_for(dom_html)
+    if not instructions:
+        return dom_html
+    filled = 0
+    async for instr, success in executor.execute_all(iterate(instructions), batch_fills=BATCH_FORM_FILLS):
+        tracker.record(instr, success)
+        filled += success
+    logger.info(f"[Main] ✍️ Filled {filled}/{len(instructions)} recognised form fields without the LLM")
+    Tracer.shared().count("local_form_fills", filled)
+    return await browser.get_dom(DOM_MODE_PER_PHASE["application"])
+
+async def validation_batches(instructions: Union[list[dict[str, Any]], AsyncIterator[dict[str, Any]]]) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Group instructions for pre-flight validation. A full response is split after every click/submit,
+    since what follows may only appear once that click has landed; a streamed response is validated
+    one instruction at a time so execution never waits for the rest of the stream.
+    """
+    if not isinstance(instructions, list):
+        async for instr in instructions:
+            yield [instr]
+        return
+    batch: list[dict[str, Any]] = []
+    for instr in instructions:
+        batch.append(instr)
+        if instr.get("action") in ("click", "submit"):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def preflight_instructions(
+    instructions: Union[list[dict[str, Any]], AsyncIterator[dict[str, Any]]],
+    agent: LLMAgent,
+    browser: BrowserController,
+    executor: InstructionExecutor,
+    context: dict[str, Any]
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Yield the instructions that pass pre-flight selector validation. Rejected ones are collected and,
+    once the rest of the turn has run, sent back to the LLM with the reasons and the current page for
+    correction; corrections that validate are yielded as part of the same turn.
+    """
+    if not PREFLIGHT_VALIDATION:
+        async for instr in iterate(instructions) if isinstance(instructions, list) else instructions:
+            yield instr
+        return
+    rejected: list[tuple[dict[str, Any], str]] = []
+    async for batch in validation_batches(instructions):
+        for instr, reason in zip(batch, await executor.validate(batch)):
+            if reason is None:
+                yield instr
+            else:
+                logger.warning(f"[Main] ⚠️ Rejected instruction before execution ({reason}): {loggable(instr)}")
+                rejected.append((instr, reason))
+    if not rejected:
+        return
+    agent.forget_last_response()
+    logger.info(f"[Main] Asking LLM to correct {len(rejected)} rejected instruction(s)")
+    dom_html = await browser.get_dom(DOM_MODE_PER_PHASE[context["phase"]])
+    corrections = await agent.ask_correction_async(dom_html, context, rejected) or []
+    for instr, reason in zip(corrections, await executor.validate(corrections)):
+        if reason is None:
+            yield instr
+        else:
+            logger.warning(f"[Main] ⚠️ Dropping corrected instruction that is still invalid ({reason}): {loggable(instr)}")
+
+async def replay_playbook(
+    playbooks: PlaybookStore,
+    site: str,
+    phase: str,
+    browser: BrowserController,
+    executor: InstructionExecutor,
+    agent: LLMAgent,
+    context: dict[str, Any]
+) -> bool:
+    """
+    Replay the recorded steps of a phase without the LLM, validating each selector before acting on it.
+    Returns True if the playbook reached 'done'; otherwise the LLM loop takes over from the current page,
+    i.e. from the first step that failed.
+    """
+    steps = playbooks.get(site, phase)
+    if not steps:
+        return False
+    logger.info(f"[Main] ({site} {phase} Phase) ▶️ Replaying {len(steps)} step playbook")
+    for index, step in enumerate(agent.resolve_placeholders(steps, context)):
+        if step["action"] != "done":
+            state = "attached" if step["action"] == "upload" else "visible"
+            if not await browser.wait_for_element(step["selector"], PLAYBOOK_STEP_TIMEOUT_MS, state):
+                logger.warning(f"[Main] ({site} {phase} Phase) ⚠️ Playbook step {index + 1} selector {step['selector']} not found. Falling back to LLM.")
+                playbooks.record_outcome(site, phase, False, index)
+                return False
+        if not await executor.execute(step):
+            logger.warning(f"[Main] ({site} {phase} Phase) ⚠️ Playbook step {index + 1} failed. Falling back to LLM.")
+            playbooks.record_outcome(site, phase, False, index)
+            return False
+    logger.info(f"[Main] ({site} {phase} Phase) ✅ Playbook replay completed")
+    playbooks.record_outcome(site, phase, True)
+    return True
+
+async def run_site(
+    site: str,
+    shared_browser: Browser,
+    agents: tuple[LLMAgent, LLMAgent, LLMAgent],
+    applicant_preferences: dict[str, Any],
+    applicant_data: dict[str, Any],
+    applicant_credentials: dict[str, Any],
+    playbooks: PlaybookStore,
+    sessions: SessionStore,
+    job_index: JobIndex,
+    request_blocker: Optional[RequestBlocker] = None
+) -> bool:
+    """
+    Run the login, search and apply phases for one site on its own context of the shared browser,
+    restored from the site's saved session if there is one. `agents` are the login, search and
+    application agents, which keep per-call message state and so must not be shared between sites
+    running concurrently. Returns False if the site was given up on before the application phase.
+    """
+    logger.info(f"[Main] Opening browser context for {site}")
+    saved_session = sessions.load(site)
+    browser = await BrowserController.create(shared_browser, saved_session, SETTLE_BUDGETS_MS, SETTLE_QUIET_MS, request_blocker, site)
+    unfinished_sites.add(site)
+    try:
+        return await run_phases(
+            site, browser, InstructionExecutor(browser, ACTION_TIMEOUTS_MS), agents, applicant_preferences, applicant_data,
+            applicant_credentials, playbooks, sessions, saved_session is not None, job_index
+        )
+    finally:
+        unfinished_sites.discard(site)
+        Tracer.end_phase()
+        for operation, timing in browser.timings.items():
+            logger.info(f"[Main] {site} browser {operation}: {int(timing['count'])} calls, {timing['seconds']:.2f}s total, {timing['seconds'] / timing['count'] * 1000:.0f} ms avg")
+        await browser.close()
+
+async def run_phases(
+    site: str,
+    browser: BrowserController,
+    executor: InstructionExecutor,
+    agents: tuple[LLMAgent, LLMAgent, LLMAgent],
+    applicant_preferences: dict[str, Any],
+    applicant_data: dict[str, Any],
+    applicant_credentials: dict[str, Any],
+    playbooks: PlaybookStore,
+    sessions: SessionStore,
+    restored_session: bool,
+    job_index: JobIndex
+) -> bool:
+    """
+    The login, search and apply phases of run_site. `restored_session` tells whether the context was
+    created from a saved session of this site.
+    """
+    login_agent, search_agent, application_agent = agents
+    Tracer.set_scope(site=site, phase="login")
+    logger.info(f"[Main] Navigating to {site}...")
+    await browser.goto(site)
+
+    # --- Phase 1: Login ---
+    loggedIn: bool = False
+    if site not in applicant_credentials:
+        logger.warning(f"[Main] No login credentials for site: {site}. Skipping.")
+        return False
+    if restored_session:
+        restored_session = await browser.is_logged_in(logged_in_selector_for(site, applicant_credentials))
+        if restored_session:
+            logger.info(f"[Main] ({site} Login Phase) ✅ Restored saved session. Skipping login.")
         else:
-            logger.warning(f"[Main] No login credentials for site: {site}. Skipping.")
+            logger.info(f"[Main] ({site} Login Phase) Saved session looks logged out. Falling back to login.")
+    login_context: dict[str, Any] = {
+        "site" : site,
+        "phase": "login",
+        "job_seeker_credentials": {site: applicant_credentials[site]}
+    }
+    loggedIn = restored_session
+    replayed_login: bool = False
+    if not loggedIn:
+        executor.start_recording()
+        replayed_login = await replay_playbook(playbooks, site, "login", browser, executor, login_agent, login_context)
+        loggedIn = replayed_login
+    login_tracker: PageTracker = build_page_tracker()
+    gave_up_login: bool = False
+    while not loggedIn and not gave_up_login:
+        Tracer.next_step()
+        logger.info(f"[Main] ({site} Login Phase) Fetching DOM")
+        dom_html = await browser.get_dom(DOM_MODE_PER_PHASE["login"])
+        login_tracker.observe(dom_html)
+        if login_tracker.stuck_reason is not None:
+            executor.discard_recording()
+            gave_up_login = not await request_manual_intervention(report_stuck_page(login_tracker, login_agent, "login"), 'login', site)
             continue
-        
-        if not loggedIn:
-            logger.warning(f"[Main] Login did not succeed for site: {site}. Skipping.")
+        logger.info(f"[Main] ({site} Login Phase) Asking LLM for next action")
+        instructions = await ask_agent(login_agent, dom_html, login_context, login_tracker)
+
+        if not instructions:
+            logger.info(f"[Main] ({site} Login Phase) No more instructions. Proceeding to search phase.")
+            break
+
+        async for instr, success in executor.execute_all(
+            preflight_instructions(instructions, login_agent, browser, executor, login_context),
+            batch_fills=BATCH_FORM_FILLS and isinstance(instructions, list)
+        ):
+            login_tracker.record(instr, success)
+            if instr["action"] == "intervene":
+                executor.discard_recording()
+                if not await request_manual_intervention(instr['text'], 'login', site):
+                    gave_up_login = True
+                    break
+            else:
+                if not success:
+                    logger.error(f"[Main] ❌ Failed login instruction: {loggable(instr)}")
+                    login_agent.forget_last_response()
+                    break
+                else:
+                    logger.info(f"[Main] ✅ Successfully executed login instruction: {loggable(instr)}")
+                    if instr.get("action") == "done":
+                        logger.info(f"[Main] {site} login phase completed.")
+                        loggedIn = True
+        if loggedIn:
+            break
+    recorded_login = executor.stop_recording()
+    if loggedIn and not replayed_login and recorded_login:
+        playbooks.save(site, "login", recorded_login, applicant_credentials[site])
+    if loggedIn and not restored_session:
+        sessions.save(site, await browser.storage_state())
+
+    if not loggedIn:
+        logger.warning(f"[Main] Login did not succeed for site: {site}. Skipping.")
+        return False
+
+    # --- Phase 2: Search ---
+    Tracer.set_scope(phase="search")
+    search_context: dict[str, Any] = {
+        "phase": "search",
+        "job_seeker_preferences": applicant_preferences
+    }
+    executor.start_recording()
+    replayed_search: bool = await replay_playbook(playbooks, site, "search", browser, executor, search_agent, search_context)
+    searched_jobs : bool = replayed_search
+    search_tracker: PageTracker = build_page_tracker()
+    gave_up_search: bool = False
+    while not searched_jobs and not gave_up_search:
+        Tracer.next_step()
+        logger.info(f"[Main] ({site} Search Phase) Fetching DOM")
+        dom_html = await browser.get_dom(DOM_MODE_PER_PHASE["search"])
+        search_tracker.observe(dom_html)
+        if search_tracker.stuck_reason is not None:
+            executor.discard_recording()
+            gave_up_search = not await request_manual_intervention(report_stuck_page(search_tracker, search_agent, "search"), 'search', site)
             continue
-        
-        # --- Phase 2: Search ---
-        searched_jobs : bool = False
-        while True:
-            logger.info("[Main] (Search Phase) Fetching DOM")
-            dom_html: str = browser.get_dom()
-            logger.info("[Main] (Search Phase) Asking LLM for next action")
-            search_instructions = search_agent.ask(dom_html, {
-                "phase": "search",
-                "job_seeker_preferences": applicant_preferences
-            })
-
-            if not search_instructions:
-                logger.info("[Main] (Search Phase) No more instructions. Proceeding to application phase.")
-                break
+        logger.info(f"[Main] ({site} Search Phase) Asking LLM for next action")
+        search_instructions = await ask_agent(search_agent, dom_html, search_context, search_tracker)
+
+        if not search_instructions:
+            logger.info(f"[Main] ({site} Search Phase) No more instructions. Proceeding to application phase.")
+            break
 
-            logger.info(f"[Main] LLM Search Instructions:\n{json.dumps(search_instructions, indent=2)}")
-            for instr in search_instructions:
-                if instr["action"] == "intervene":
-                    request_manual_intervention(instr['text'],'search')
+        if isinstance(search_instructions, list):
+            logger.info(f"[Main] LLM Search Instructions for {site}:\n{json.dumps(list(map(loggable, search_instructions)), indent=2)}")
+        async for instr, success in executor.execute_all(
+            preflight_instructions(search_instructions, search_agent, browser, executor, search_context),
+            batch_fills=BATCH_FORM_FILLS and isinstance(search_instructions, list)
+        ):
+            search_tracker.record(instr, success)
+            if instr["action"] == "intervene":
+                executor.discard_recording()
+                if not await request_manual_intervention(instr['text'], 'search', site):
+                    gave_up_search = True
+                    break
+            else:
+                if not success:
+                    logger.error(f"[Main] ❌ Failed search instruction: {loggable(instr)}")
+                    search_agent.forget_last_response()
+                    break
                 else:
-                    success : bool = executor.execute(instr)
-                    if not success:
-                        logger.error(f"[Main] ❌ Failed search instruction: {instr}")
+                    logger.info("[Main] ✅ Successfully executed search instruction.")
+                    if instr.get("action") == "done":
+                        logger.info(f"[Main] {site} search phase completed.")
+                        searched_jobs=True
                         break
-                    else: 
-                        logger.info("[Main] ✅ Successfully executed search instruction.")
-                        if instr.get("action") == "done":
-                            logger.info("[Main] Search phase completed.")
-                            searched_jobs=True
-                            break
-            if searched_jobs:
+        if searched_jobs:
+            break
+    recorded_search = executor.stop_recording()
+    if searched_jobs and not replayed_search and recorded_search:
+        playbooks.save(site, "search", recorded_search)
+
+    if not searched_jobs:
+        logger.warning(f"[Main] Search did not succeed for site: {site}. Skipping.")
+        return False
+
+    # --- Phase 3:  Apply ---
+    Tracer.set_scope(phase="application")
+    applied: bool = False
+    gave_up_application: bool = False
+    number_of_applications_made : int = 0
+    application_context: dict[str, Any] = {
+        "phase" : "application",
+        "applicant_preferences": applicant_preferences,
+        "applicant_data": applicant_data
+    }
+    listing_selector = listing_selector_for(site)
+    listings = find_pending_listings(job_index, site, await browser.extract_listings(listing_selector), listing_selector)
+    current_listing: Optional[dict[str, Any]] = None
+    listing_steps: int = 0
+    application_tracker: PageTracker = build_page_tracker()
+    form_filler: Optional[FormFiller] = build_form_filler(applicant_data)
+    while True:
+        if listings is not None and current_listing is None:
+            if not listings:
+                logger.info(f"[Main] No more new listings for {site}.")
                 break
-            
-        if not searched_jobs:
-            logger.warning(f"[Main] Search did not succeed for site: {site}. Skipping.")
+            current_listing = listings.pop(0)
+            listing_steps = 0
+            application_tracker.reset()
+            application_agent.reset_page_history()
+            if form_filler is not None:
+                form_filler.reset()
+            job_index.record(site, current_listing, "started")
+            if not await browser.adopt_prefetched(current_listing["url"]):
+                await browser.goto(current_listing["url"])
+            if PREFETCH_NEXT_LISTING and listings:
+                await browser.prefetch(listings[0]["url"], DOM_MODE_PER_PHASE["application"])
+        Tracer.next_step()
+        listing_steps += 1
+        logger.info(f"[Main] ({site} Application Phase) Fetching DOM")
+        dom_html = await browser.get_dom(DOM_MODE_PER_PHASE["application"])
+        logger.info(f"[Main] Fetched DOM ({len(dom_html)} chars): {ArtifactStore.shared().put(dom_html, 'dom')}")
+        if form_filler is not None:
+            dom_html = await prefill_form(form_filler, dom_html, browser, executor, application_tracker)
+        application_tracker.observe(dom_html)
+        if application_tracker.stuck_reason is not None:
+            reason = report_stuck_page(application_tracker, application_agent, "application")
+            if current_listing is None:
+                if not await request_manual_intervention(reason, 'application', site):
+                    break
+                continue
+            logger.warning(f"[Main] ⚠️ Giving up on {current_listing['url']} for {site}, moving on to the next listing.")
+            job_index.record(site, current_listing, "failed")
+            current_listing = None
             continue
-        
-        # --- Phase 3:  Apply ---
-        applied: bool = False
-        number_of_applications_made : int = 0
-        while True:
-            # 4. Get current page content
-            logger.info("[Main] Fetching DOM")
-            dom_html: str = browser.get_dom()
-            
-            logger.info(f"[Main] Fetched DOM:\n{dom_html}")
-            
-            # 5. Ask LLM agent: what next?
-            logger.info("[Main] Asking LLM for next action")
-            instructions: Optional[list[dict[str, Any]]] = application_agent.ask(dom_html, {
-                "phase" : "application",
-                "applicant_preferences": applicant_preferences,
-                "applicant_data": applicant_data
-            })
-
-            # Defensive: check if LLM failed to return valid JSON
-            if not instructions:
-                logger.warning("[Main] ⚠️ LLM did not return valid instructions. Skipping...")
+
+        logger.info(f"[Main] ({site} Application Phase) Asking LLM for next action")
+        instructions = await ask_agent(application_agent, dom_html, application_context, application_tracker)
+
+        # Defensive: check if LLM failed to return valid JSON
+        if not instructions:
+            logger.warning(f"[Main] ⚠️ LLM did not return valid instructions for {site}. Skipping...")
+            if current_listing is None:
                 break
-            
-            logger.info(f"[Main] LLM Instructions: {json.dumps(instructions, indent=2)}")
+            job_index.record(site, current_listing, "failed")
+            current_listing = None
+            continue
 
-            # Support single or batch instruction
-            for instr in instructions:
-                if instr["action"] == "intervene":
-                    request_manual_intervention(instr['text'],'application')
+        if isinstance(instructions, list):
+            logger.info(f"[Main] LLM Instructions for {site}: {json.dumps(list(map(loggable, instructions)), indent=2)}")
+
+        async for instr, success in executor.execute_all(
+            preflight_instructions(instructions, application_agent, browser, executor, application_context),
+            batch_fills=BATCH_FORM_FILLS and isinstance(instructions, list)
+        ):
+            application_tracker.record(instr, success)
+            if instr["action"] == "intervene":
+                if not await request_manual_intervention(instr['text'], 'application', site):
+                    gave_up_application = True
+                    break
+            else:
+                if not success:
+                    logger.error(f"[Main] ❌ Failed to execute apply instruction: {loggable(instr)}")
+                    application_agent.forget_last_response()
+                    break
                 else:
-                    success = executor.execute(instr)
-                    if not success:
-                        logger.error(f"[Main] ❌ Failed to execute apply instruction: {instructions}")
+                    logger.info("[Main] ✅ Successfully executed apply instruction.")
+                    if form_filler is not None:
+                        form_filler.learn(instr)
+                    if instr.get("action") == "done":
+                        logger.info(f"[Main] {site} application completed.")
+                        applied=True
                         break
-                    else: 
-                        logger.info("[Main] ✅ Successfully executed apply instruction.")
-                        if instr.get("action") == "done":
-                            logger.info("[Main] Application phase completed.")
-                            applied=True
-                            break
-            
-            if applied:
-                number_of_applications_made += 1
-                applied = False
-                
-            if number_of_applications_made == APPLICATIONS_PER_SITE_LIMIT:
+
+        if applied:
+            number_of_applications_made += 1
+            applied = False
+            if current_listing is not None:
+                job_index.record(site, current_listing, "applied")
+                current_listing = None
+        elif gave_up_application:
+            gave_up_application = False
+            if current_listing is None:
                 break
-                    
+            job_index.record(site, current_listing, "failed")
+            current_listing = None
+        elif current_listing is not None and listing_steps >= MAX_STEPS_PER_APPLICATION:
+            logger.warning(f"[Main] ⚠️ Giving up on {current_listing['url']} for {site} after {listing_steps} steps.")
+            job_index.record(site, current_listing, "failed")
+            current_listing = None
 
-    browser.close()
+        if number_of_applications_made == APPLICATIONS_PER_SITE_LIMIT:
+            break
+    await browser.discard_prefetch()
+    return True
+
+async def main_async() -> None:
+    """Run every site on its own context of one browser, bounded by MAX_CONCURRENT_SITES and MAX_CONCURRENT_LLM_REQUESTS."""
+    stages: dict[str, float] = {"imports": time.perf_counter() - PROCESS_STARTED}
+    # 1. Define applicant preferences
+    with startup_stage(stages, "setup"):
+        applicant_preferences: dict[str,Any] = load_json("applicant_preferences.json")
+        applicant_data: dict[str,Any] = load_json("applicant_data.json")
+        applicant_credentials: dict[str,Any] = load_json("applicant_credentials.json")
+
+        # 2. Initialize components, the models warm up while the browser launches
+        tracer = build_tracer()
+        llm_clients = build_llm_clients(LLMRateLimiter(MAX_CONCURRENT_LLM_REQUESTS))
+        model_router = build_model_router()
+        model_warm_up = start_model_warm_up(llm_clients, model_router)
+        llm_cache = LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+        playbooks = PlaybookStore(PLAYBOOKS_DIR)
+        sessions = SessionStore(SESSIONS_DIR)
+        job_index = JobIndex(JOBS_DB_PATH, JOB_MAX_ATTEMPTS)
+        request_blocker = build_request_blocker()
+        intervention_server = build_interventions()
+    site_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SITES)
+
+    async with async_playwright() as playwright:
+        logger.info("[Main] Launching shared browser")
+        with startup_stage(stages, "browser_launch"):
+            shared_browser = await launch_browser(playwright)
+        log_startup(stages, model_warm_up)
+
+        async def run_one(site: str) -> bool:
+            try:
+                async with site_semaphore:
+                    _site_slot.set(site_semaphore)
+                    return await run_site(
+                        site, shared_browser, build_agents(llm_cache, llm_clients, model_router), applicant_preferences, applicant_data,
+                        applicant_credentials, playbooks, sessions, job_index, request_blocker
+                    )
+            finally:
+                unfinished_sites.discard(site)
+
+        # 3. For each site login, search and apply
+        sites: list[str] = list(applicant_preferences["sites"])
+        unfinished_sites.update(sites)
+        results = await asyncio.gather(*(run_one(site) for site in sites), return_exceptions=True)
+        for site, result in zip(sites, results):
+            if isinstance(result, BaseException):
+                logger.error(f"[Main] ❌ Site {site} failed: {result!r}")
+        await shared_browser.close()
+    llm_cache.log_stats()
+    llm_cache.close()
+    job_index.close()
+    llm_clients.log_stats()
+    await llm_clients.aclose()
+    model_router.log_stats()
+    if request_blocker is not None:
+        request_blocker.log_stats()
+    tracer.log_summary()
+    tracer.close()
+    if intervention_server is not None:
+        intervention_server.close()
+    InterventionQueue.shared().close()
+    ArtifactStore.shared().log_stats()
+
+def main() -> None:
+    asyncio.run(main_async())
 
 if __name__ == "__main__":
-    main()
+    log_listener = setup_logging()
+    artifacts = build_artifacts()
+    try:
+        main()
+    finally:
+        artifacts.close()
+        log_listener.stop()
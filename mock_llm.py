@@ -0,0 +1,365 @@
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional, cast
+from job_index import job_id_from_url
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Labels of the agent's prompt the mock finds its way by.
+PAGE_MARKER = "Current page HTML content:\n"
+DELTA_MARKER = "(added, changed and removed elements):\n"
+CORRECTION_MARKER = "were rejected before execution"
+# Placeholders the mock answers application fields with, by words of the field's label.
+LABEL_PLACEHOLDERS: tuple[tuple[str, str], ...] = (
+    ("first name", "$first_name"),
+    ("last name", "$last_name"),
+    ("email", "$email"),
+    ("phone", "$phone"),
+    ("city", "$Address_City"),
+    ("resume", "$resume_file")
+)
+LOGIN_BUTTON_WORDS: tuple[str, ...] = ("sign in", "log in", "login", "continue")
+SEARCH_BUTTON_WORDS: tuple[str, ...] = ("search", "find")
+APPLICATION_BUTTON_WORDS: tuple[str, ...] = ("submit", "next", "continue", "apply")
+APPLICATION_DONE_TEXT = "application submitted"
+FIELD_TAGS: tuple[str, ...] = ("input", "textarea", "select")
+BUTTON_INPUT_TYPES: tuple[str, ...] = ("submit", "button", "reset", "image", "hidden")
+_OPTION_PATTERN = re.compile(r"^(.*) \((.*)\)$")
+
+def context_of(messages: list[dict[str, Any]]) -> str:
+    """The context message of a request: credentials, preferences or applicant data."""
+    return next((str(message["content"]) for message in messages if str(message["content"]).startswith("Context:")), "")
+
+def phase_of(messages: list[dict[str, Any]]) -> str:
+    """The agent phase a request comes from, told by its context message."""
+    context = context_of(messages)
+    if "log into the following website" in context:
+        return "login"
+    if "Job Seeker Preferences" in context:
+        return "search"
+    return "application"
+
+def page_of(messages: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    The distilled page a request asks about: the last full snapshot in the messages, with the changes
+    of a delta step applied to it.
+    """
+    page: dict[str, Any] = {"elements": []}
+    for message in messages:
+        content = str(message["content"])
+        if PAGE_MARKER in content:
+            try:
+                parsed, _ = json.JSONDecoder().raw_decode(content, content.index(PAGE_MARKER) + len(PAGE_MARKER))
+            except json.JSONDecodeError:
+                continue
+            if isinstance(parsed, dict) and "elements" in parsed:
+                page = cast(dict[str, Any], parsed)
+        elif DELTA_MARKER in content and message["role"] != "assistant":
+            delta, _ = json.JSONDecoder().raw_decode(content, content.index(DELTA_MARKER) + len(DELTA_MARKER))
+            page = _apply_delta(page, cast(dict[str, list[Any]], delta))
+    return page
+
+def _apply_delta(page: dict[str, Any], delta: dict[str, list[Any]]) -> dict[str, Any]:
+    elements = {str(element.get("selector")): element for element in page["elements"]}
+    for key in delta.get("removed", []):
+        elements.pop(str(key), None)
+    texts = [str(page.get("text_context", ""))]
+    for item in delta.get("added", []) + delta.get("changed", []):
+        if isinstance(item, dict):
+            element = cast(dict[str, Any], item)
+            elements[str(element.get("selector"))] = element
+        else:
+            # Changed url/title/text_context values come without their key, keep them as text.
+            texts.append(str(item))
+    return {**page, "text_context": " | ".join(texts), "elements": list(elements.values())}
+
+def _text_of(element: dict[str, Any]) -> str:
+    return f"{element.get('text', '')} {element.get('label', '')}".strip().lower()
+
+def _fields(page: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        element for element in page["elements"]
+        if element.get("tag") in FIELD_TAGS and element.get("type") not in BUTTON_INPUT_TYPES and not element.get("disabled")
+    ]
+
+def _button(page: dict[str, Any], words: tuple[str, ...]) -> Optional[dict[str, Any]]:
+    for word in words:
+        for element in page["elements"]:
+            clickable = element.get("tag") == "button" or element.get("type") in ("submit", "button")
+            if clickable and not element.get("disabled") and word in _text_of(element):
+                return element
+    return None
+
+def _options(element: dict[str, Any]) -> list[tuple[str, str]]:
+    """(value, text) of the options of a select element."""
+    options: list[tuple[str, str]] = []
+    for option in cast(list[str], element.get("options", [])):
+        match = _OPTION_PATTERN.match(option)
+        options.append((match.group(1), match.group(2)) if match else (option, option))
+    return options
+
+def _click(element: dict[str, Any]) -> dict[str, Any]:
+    return {"action": "click", "selector": element["selector"]}
+
+def login_instructions(page: dict[str, Any]) -> list[dict[str, Any]]:
+    """Fill the credentials and sign in while a password field is shown."""
+    fields = _fields(page)
+    password = next((field for field in fields if field.get("type") == "password"), None)
+    if password is None:
+        return [{"action": "done"}]
+    instructions: list[dict[str, Any]] = []
+    user = next((field for field in fields if field.get("type") in ("email", "text")), None)
+    if user is not None and not user.get("value"):
+        instructions.append({"action": "fill", "selector": user["selector"], "text": "$email"})
+    instructions.append({"action": "fill", "selector": password["selector"], "text": "$password"})
+    button = _button(page, LOGIN_BUTTON_WORDS)
+    if button is not None:
+        instructions.append(_click(button))
+    return instructions
+
+def search_instructions(page: dict[str, Any], context: str) -> list[dict[str, Any]]:
+    """Search for the preferred job title, in a location of the preferences, until job listings are shown."""
+    if any(element.get("tag") == "a" and job_id_from_url(str(element.get("href", ""))) for element in page["elements"]):
+        return [{"action": "done"}]
+    instructions: list[dict[str, Any]] = []
+    for field in _fields(page):
+        if field.get("tag") == "input" and field.get("type", "text") in ("text", "search") and not field.get("value"):
+            instructions.append({"action": "fill", "selector": field["selector"], "text": "$job_title"})
+        elif field.get("tag") == "select" and "location" in _text_of(field):
+            value = next((value for value, text in _options(field) if value and text in context), None)
+            if value is not None and field.get("value") != value:
+                instructions.append({"action": "select", "selector": field["selector"], "text": value})
+    button = _button(page, SEARCH_BUTTON_WORDS)
+    if button is not None:
+        instructions.append(_click(button))
+    return instructions or [{"action": "intervene", "text": "No search form or job listings on this page"}]
+
+def _field_answer(field: dict[str, Any]) -> Optional[dict[str, Any]]:
+    label = _text_of(field) or str(field.get("name", "")).lower()
+    if field.get("type") in ("checkbox", "radio"):
+        return None if field.get("checked") else _click(field)
+    if field.get("tag") == "select":
+        if field.get("value"):
+            return None
+        value = next((value for value, _ in _options(field) if value), None)
+        return {"action": "select", "selector": field["selector"], "text": value} if value is not None else None
+    if field.get("type") == "file":
+        return {"action": "upload", "selector": field["selector"], "text": "$resume_file"}
+    if field.get("value"):
+        return None
+    placeholder = next((placeholder for words, placeholder in LABEL_PLACEHOLDERS if words in label), None)
+    if placeholder is not None:
+        return {"action": "fill", "selector": field["selector"], "text": placeholder}
+    text = "3" if field.get("type") == "number" else "I enjoy building reliable software." if field.get("tag") == "textarea" else "Fixture answer"
+    return {"action": "fill", "selector": field["selector"], "text": text}
+
+def application_instructions(page: dict[str, Any]) -> list[dict[str, Any]]:
+    """Answer every empty field and move on to the next step, done once the application was submitted."""
+    if APPLICATION_DONE_TEXT in str(page.get("text_context", "")).lower():
+        return [{"action": "done"}]
+    instructions = [instruction for field in _fields(page) if (instruction := _field_answer(field)) is not None]
+    button = _button(page, APPLICATION_BUTTON_WORDS)
+    if button is not None:
+        instructions.append(_click(button))
+    return instructions or [{"action": "intervene", "text": "No form fields or buttons on this page"}]
+
+def answer(messages: list[dict[str, Any]]) -> tuple[str, list[dict[str, Any]]]:
+    """The phase of a chat request and the instructions the mock answers it with."""
+    phase = phase_of(messages)
+    if CORRECTION_MARKER in str(messages[-1]["content"]):
+        # The mock only uses selectors of the page, so there is nothing to correct.
+        return phase, []
+    page = page_of(messages)
+    if phase == "login":
+        return phase, login_instructions(page)
+    if phase == "search":
+        return phase, search_instructions(page, context_of(messages))
+    return phase, application_instructions(page)
+
+class MockLLMServer:
+    """
+    Deterministic stand-in for the LLM providers, for offline benchmarks: speaks Ollama's /api/chat and
+    OpenAI's /v1/chat/completions (NDJSON and SSE streams included) and answers every step of the login,
+    search and application phases with instructions derived from the distilled page in the prompt.
+    Latency is simulated as a delay before the first instruction and a delay per instruction. Requests
+    and prompt bytes are counted per phase, also served as JSON at GET /stats.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, first_token_seconds: float = 0.3, seconds_per_instruction: float = 0.05) -> None:
+        self.first_token_seconds: float = first_token_seconds
+        self.seconds_per_instruction: float = seconds_per_instruction
+        self.lock: threading.Lock = threading.Lock()
+        # Per phase: requests, request bytes and prompt characters.
+        self.stats: dict[str, dict[str, int]] = {}
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), self._handler())
+        self.url: str = f"http://{host}:{self.server.server_address[1]}"
+        self.ollama_url: str = f"{self.url}/api/chat"
+        self.openai_base_url: str = f"{self.url}/v1"
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve_forever, name="mock-llm", daemon=True)
+        self.thread.start()
+        logger.info(f"[Mock LLM] Serving Ollama and OpenAI chat APIs at {self.url}")
+
+    def record(self, phase: str, request_bytes: int, prompt_chars: int) -> None:
+        with self.lock:
+            stats = self.stats.setdefault(phase, {"requests": 0, "request_bytes": 0, "prompt_chars": 0})
+            stats["requests"] += 1
+            stats["request_bytes"] += request_bytes
+            stats["prompt_chars"] += prompt_chars
+
+    def reset_stats(self) -> dict[str, dict[str, int]]:
+        """Return the stats so far and start counting again."""
+        with self.lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    def respond(self, body: dict[str, Any], request_bytes: int) -> tuple[list[str], dict[str, int]]:
+        """The response of a chat request in chunks, one instruction each, and its token usage."""
+        messages = cast(list[dict[str, Any]], body.get("messages", []))
+        prompt_chars = sum(len(str(message["content"])) for message in messages)
+        phase, instructions = answer(messages)
+        self.record(phase, request_bytes, prompt_chars)
+        logger.debug(f"[Mock LLM] {phase}: {len(instructions)} instructions for a {prompt_chars} chars prompt")
+        chunks = [("[" if index == 0 else ",\n") + json.dumps(instruction) for index, instruction in enumerate(instructions)]
+        chunks.append("]" if chunks else "[]")
+        completion_tokens = sum(len(chunk) for chunk in chunks) // 4
+        return chunks, {"prompt_tokens": prompt_chars // 4, "completion_tokens": completion_tokens, "total_tokens": prompt_chars // 4 + completion_tokens}
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive like the real servers, so the client pools reuse their connections.
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status: int, payload: Any, headers: Optional[dict[str, str]] = None) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_stream(self, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def _write_chunk(self, text: str) -> None:
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _end_stream(self) -> None:
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _generate(self, chunks: list[str]) -> Iterator[str]:
+                """Yield the chunks at the configured pace."""
+                time.sleep(mock.first_token_seconds)
+                for index, chunk in enumerate(chunks):
+                    if index:
+                        time.sleep(mock.seconds_per_instruction)
+                    yield chunk
+
+            def do_GET(self) -> None:
+                if self.path == "/stats":
+                    with mock.lock:
+                        self._send_json(200, mock.stats)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length)
+                body = cast(dict[str, Any], json.loads(raw))
+                if self.path == "/api/chat":
+                    self._ollama(body, len(raw))
+                elif self.path == "/v1/chat/completions":
+                    self._openai(body, len(raw))
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def _ollama(self, body: dict[str, Any], request_bytes: int) -> None:
+                if not body.get("messages"):
+                    # A chat without messages only loads the model, as LLMClientPool.warm_up sends it.
+                    self._send_json(200, {"model": body.get("model", "mock"), "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "load"})
+                    return
+                started = time.perf_counter()
+                chunks, usage = mock.respond(body, request_bytes)
+                model = str(body.get("model", "mock"))
+                if not body.get("stream", True):
+                    content = "".join(self._generate(chunks))
+                    self._send_json(200, {
+                        "model": model, "message": {"role": "assistant", "content": content}, "done": True,
+                        "total_duration": int((time.perf_counter() - started) * 1e9),
+                        "prompt_eval_count": usage["prompt_tokens"], "eval_count": usage["completion_tokens"]
+                    })
+                    return
+                self._start_stream("application/x-ndjson")
+                for chunk in self._generate(chunks):
+                    self._write_chunk(json.dumps({"model": model, "message": {"role": "assistant", "content": chunk}, "done": False}) + "\n")
+                self._write_chunk(json.dumps({
+                    "model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                    "total_duration": int((time.perf_counter() - started) * 1e9),
+                    "prompt_eval_count": usage["prompt_tokens"], "eval_count": usage["completion_tokens"]
+                }) + "\n")
+                self._end_stream()
+
+            def _openai(self, body: dict[str, Any], request_bytes: int) -> None:
+                started = time.perf_counter()
+                chunks, usage = mock.respond(body, request_bytes)
+                model = str(body.get("model", "mock"))
+                base: dict[str, Any] = {"id": "chatcmpl-mock", "created": int(time.time()), "model": model}
+                if not body.get("stream"):
+                    content = "".join(self._generate(chunks))
+                    self._send_json(200, {
+                        **base, "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": usage
+                    }, {"openai-processing-ms": str(int((time.perf_counter() - started) * 1000))})
+                    return
+                self._start_stream("text/event-stream")
+                for chunk in self._generate(chunks):
+                    delta: dict[str, Any] = {"index": 0, "delta": {"role": "assistant", "content": chunk}, "finish_reason": None}
+                    self._write_chunk(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [delta]})}\n\n")
+                finish: dict[str, Any] = {"index": 0, "delta": {}, "finish_reason": "stop"}
+                self._write_chunk(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [finish]})}\n\n")
+                if cast(dict[str, Any], body.get("stream_options") or {}).get("include_usage"):
+                    self._write_chunk(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n")
+                self._write_chunk("data: [DONE]\n\n")
+                self._end_stream()
+
+            def log_message(self, format: str, *args: object) -> None:
+                logger.debug(f"[Mock LLM] HTTP {format % args}")
+
+        return Handler
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the deterministic mock LLM, e.g. in place of Ollama on port 11434.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-seconds", type=float, default=0.3)
+    parser.add_argument("--seconds-per-instruction", type=float, default=0.05)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    mock = MockLLMServer(args.host, args.port, args.first_token_seconds, args.seconds_per_instruction)
+    try:
+        mock.thread.join()
+    except KeyboardInterrupt:
+        for phase, stats in mock.stats.items():
+            logger.info(f"[Mock LLM] {phase}: {stats['requests']} requests, {stats['request_bytes']} request bytes")
+        mock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import logging
+import threading
+from typing import Iterable, Optional
+from tracing import Tracer
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Tiers of (provider, model) per phase, fastest first, used for phases without their own configuration.
+DEFAULT_MODEL_TIERS: list[tuple[str, str]] = [("ollama", "gemma3:1b")]
+# Why a step was handed to a stronger tier.
+PARSE_FAILURE = "parse_failure"
+SELECTOR_REJECTED = "selector_rejected"
+NO_PROGRESS = "no_progress"
+
+def tier_name(tier: tuple[str, str]) -> str:
+    return f"{tier[0]}:{tier[1]}"
+
+class ModelRouter:
+    """
+    Model tiers per phase and the stats of routing steps across them. Every step of an agent goes to the
+    fastest tier first and only moves up a tier when the answer could not be parsed, its selectors were
+    rejected by pre-flight validation or the page stopped making progress; the next step starts at the
+    fastest tier again. Shared by all agents, so the stats cover the whole run.
+    """
+    def __init__(self, tiers_per_phase: Optional[dict[str, list[tuple[str, str]]]] = None, default_tiers: Optional[list[tuple[str, str]]] = None) -> None:
+        self.tiers_per_phase: dict[str, list[tuple[str, str]]] = tiers_per_phase or {}
+        self.default_tiers: list[tuple[str, str]] = default_tiers or DEFAULT_MODEL_TIERS
+        self.lock: threading.Lock = threading.Lock()
+        # Per tier: requests, failed (unusable answers) and seconds; per phase: steps and escalations by reason.
+        self.tier_stats: dict[str, dict[str, float]] = {}
+        self.phase_stats: dict[str, dict[str, int]] = {}
+
+    def tiers(self, phase: str) -> list[tuple[str, str]]:
+        return self.tiers_per_phase.get(phase) or self.default_tiers
+
+    def first_tiers(self, phases: Iterable[str]) -> list[tuple[str, str]]:
+        """The distinct tiers the steps of `phases` start at, the models worth loading before the run."""
+        tiers: list[tuple[str, str]] = []
+        for phase in phases:
+            tier = self.tiers(phase)[0]
+            if tier not in tiers:
+                tiers.append(tier)
+        return tiers
+
+    def record_step(self, phase: str) -> None:
+        with self.lock:
+            stats = self.phase_stats.setdefault(phase, {"steps": 0})
+            stats["steps"] += 1
+
+    def record_escalation(self, phase: str, tier: tuple[str, str], reason: str) -> None:
+        """Count a request moved up to `tier` for `reason`."""
+        with self.lock:
+            stats = self.phase_stats.setdefault(phase, {"steps": 0})
+            stats[reason] = stats.get(reason, 0) + 1
+        Tracer.shared().count("llm_escalations", reason=reason)
+        logger.info(f"[Model Router] ⬆️ Escalating {phase} request to {tier_name(tier)} ({reason})")
+
+    def record_request(self, tier: tuple[str, str], seconds: float, usable: bool) -> None:
+        """Count a request to `tier` that took `seconds` (to the first instruction for streams) and whether its answer was usable."""
+        name = tier_name(tier)
+        with self.lock:
+            stats = self.tier_stats.setdefault(name, {"requests": 0, "failed": 0, "seconds": 0.0})
+            stats["requests"] += 1
+            stats["failed"] += 0 if usable else 1
+            stats["seconds"] += seconds
+        Tracer.shared().count("llm_tier_requests", tier=name)
+        Tracer.shared().count("llm_tier_seconds", seconds, tier=name)
+
+    def log_stats(self) -> None:
+        for phase, stats in self.phase_stats.items():
+            escalations = {reason: count for reason, count in stats.items() if reason != "steps"}
+            total = sum(escalations.values())
+            reasons = ", ".join(f"{reason} {count}" for reason, count in escalations.items())
+            logger.info(
+                f"[Model Router] {phase}: {stats['steps']} steps, {total} escalations "
+                f"({total / stats['steps'] if stats['steps'] else 0:.0%} of steps){f': {reasons}' if reasons else ''}"
+            )
+        for name, stats in self.tier_stats.items():
+            requests = stats["requests"]
+            logger.info(f"[Model Router] {name}: {int(requests)} requests, {int(stats['failed'])} unusable, avg {stats['seconds'] / requests:.2f}s")
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import re
+from collections import deque
+from typing import Any, Optional, cast
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Tags (with the text right after them) that make up the structure of a page in mode="full".
+_STRUCTURE_PATTERN = re.compile(r"<(?:input|select|textarea|button|a|form|h[1-6]|label|dialog)\b[^>]*>[^<]{0,80}", re.IGNORECASE)
+# A delta is only worth sending while it is smaller than this share of the page.
+MAX_DELTA_RATIO: float = 0.5
+
+def page_items(dom: str) -> dict[str, Any]:
+    """
+    Structural items of a get_dom payload keyed by identity: actionable elements by selector, or in
+    mode="full" the form, control, link and heading tags plus the filled form state.
+    """
+    try:
+        parsed: Any = json.loads(dom)
+    except json.JSONDecodeError:
+        parsed = None
+    payload: dict[str, Any] = cast(dict[str, Any], parsed) if isinstance(parsed, dict) else {"html": dom}
+    items: dict[str, Any] = {}
+    if "elements" in payload:
+        for element in payload["elements"]:
+            items[str(element.get("selector"))] = element
+        for key in ("url", "title", "text_context"):
+            items[f"@{key}"] = str(payload.get(key, ""))
+        return items
+    for match in _STRUCTURE_PATTERN.finditer(str(payload.get("html", ""))):
+        tag = re.sub(r"\s+", " ", match.group(0)).strip()
+        items[tag] = tag
+    for state in payload.get("form_state", []):
+        items[f"@state:{state.get('field')}"] = state
+    return items
+
+def page_digest(items: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(items, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def page_delta(base_dom: str, dom: str) -> Optional[str]:
+    """
+    Structural diff of a page against an earlier snapshot of it, as compact JSON with the added,
+    changed and removed items. None when the page changed too much for a delta to be useful.
+    """
+    base = page_items(base_dom)
+    current = page_items(dom)
+    if base.get("@url") != current.get("@url"):
+        return None
+    added = [value for key, value in current.items() if key not in base]
+    changed = [value for key, value in current.items() if key in base and base[key] != value]
+    removed = [key for key in base if key not in current]
+    if len(added) + len(changed) + len(removed) > MAX_DELTA_RATIO * max(len(base), len(current), 1):
+        return None
+    return json.dumps({"added": added, "changed": changed, "removed": removed}, ensure_ascii=False)
+
+class PageTracker:
+    """
+    Follows the snapshots of one phase of the agent loop to notice, without asking the LLM, when the
+    page stops reacting: actions ran but the page did not change for `stuck_after` steps in a row, or
+    it keeps returning to the same state (`max_revisits` times within the last `window` steps).
+    Also keeps the actions taken so far, summarised for the LLM.
+    """
+    def __init__(self, stuck_after: int = 2, max_revisits: int = 3, window: int = 8) -> None:
+        self.stuck_after: int = stuck_after
+        self.max_revisits: int = max_revisits
+        self.digests: deque[str] = deque(maxlen=window)
+        self.unchanged_steps: int = 0
+        self.acted: bool = False
+        self.actions: list[str] = []
+
+    def observe(self, dom: str) -> None:
+        """Record the snapshot taken at the start of a step."""
+        digest = page_digest(page_items(dom))
+        if self.digests and self.digests[-1] == digest and self.acted:
+            self.unchanged_steps += 1
+        elif not self.digests or self.digests[-1] != digest:
+            self.unchanged_steps = 0
+        self.digests.append(digest)
+        self.acted = False
+
+    @property
+    def stuck_reason(self) -> Optional[str]:
+        if self.unchanged_steps >= self.stuck_after:
+            return f"The page did not change after {self.unchanged_steps} steps of actions"
+        if self.digests and self.digests.count(self.digests[-1]) >= self.max_revisits:
+            return f"The page went back to the same state {self.digests.count(self.digests[-1])} times"
+        return None
+
+    def record(self, instruction: dict[str, Any], success: bool) -> None:
+        """Record an executed instruction. Fill values are left out, they may be credentials."""
+        self.acted = True
+        action = instruction.get("action", "")
+        target = instruction.get("selector", "") if action != "intervene" else "manual intervention"
+        self.actions.append(f"{action} {target} {'ok' if success or action == 'intervene' else 'failed'}".strip())
+
+    def actions_summary(self, limit: int = 12) -> str:
+        recent = self.actions[-limit:]
+        skipped = f"({len(self.actions) - len(recent)} earlier actions) " if len(self.actions) > len(recent) else ""
+        return skipped + "; ".join(recent)
+
+    def reset(self) -> None:
+        """Forget the page history, e.g. after a human took over or when moving on to another listing."""
+        self.digests.clear()
+        self.unchanged_steps = 0
+        self.acted = False
+        self.actions = []
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Optional, cast
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Phases whose instruction sequences are stable enough across runs to be replayed without the LLM.
+REPLAYABLE_PHASES: tuple[str, ...] = ("login", "search")
+# Credential fields that never go into a playbook file as written, see redact_credentials.
+SECRET_CREDENTIAL_KEYS: tuple[str, ...] = ("password", "email", "username")
+
+def site_slug(site: str) -> str:
+    """Filesystem friendly name for a site url, used for per-site files."""
+    return re.sub(r"[^a-zA-Z0-9.-]+", "_", re.sub(r"^https?://", "", site)).strip("_")
+
+def recordable_step(instruction: dict[str, Any]) -> dict[str, Any]:
+    """
+    Reduce an executed instruction to what a playbook stores. The '$placeholder' template of the
+    text is kept instead of its interpolated value, so replays pick up the current applicant files.
+    A value the LLM wrote out literally is kept as is, see redact_credentials.
+    """
+    return {
+        "action": instruction.get("action", ""),
+        "selector": instruction.get("selector", ""),
+        "text": instruction.get("text_template", instruction.get("text", ""))
+    }
+
+def redact_credentials(steps: list[dict[str, Any]], credentials: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    The steps with a secret credential value (see SECRET_CREDENTIAL_KEYS) as their whole text replaced
+    by its '$placeholder', e.g. a password the LLM echoed back instead of writing '$password'. Other
+    credential fields such as login_type are not secret, and text merely containing a value is left
+    alone, so a search for "Google" stays a search for "Google".
+    """
+    placeholders = {
+        str(credentials[key]): f"${key}"
+        for key in SECRET_CREDENTIAL_KEYS
+        if isinstance(credentials.get(key), str) and credentials[key]
+    }
+    redacted: list[dict[str, Any]] = []
+    for step in steps:
+        text = step.get("text")
+        if isinstance(text, str) and text in placeholders:
+            step = {**step, "text": placeholders[text]}
+        redacted.append(step)
+    return redacted
+
+class PlaybookStore:
+    """
+    Recorded instruction sequences per site and phase, one JSON file per site under `directory`.
+
+    A playbook is saved when a phase reaches 'done' without manual intervention, and replayed on the
+    next run before the LLM is consulted.
+    """
+    def __init__(self, directory: str = "playbooks") -> None:
+        self.directory: str = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, site: str) -> str:
+        return os.path.join(self.directory, f"{site_slug(site)}.json")
+
+    def _load_site(self, site: str) -> dict[str, Any]:
+        path = self._path(site)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as f:
+                return cast(dict[str, Any], json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[Playbooks] ⚠️ Ignoring unreadable playbook file {path}: {e}")
+            return {}
+
+    def _save_site(self, site: str, playbooks: dict[str, Any]) -> None:
+        path = self._path(site)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(playbooks, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def get(self, site: str, phase: str) -> Optional[list[dict[str, Any]]]:
+        """Return the recorded steps for a site and phase, or None if nothing was recorded yet."""
+        playbook = self._load_site(site).get(phase)
+        if not playbook:
+            return None
+        return cast(list[dict[str, Any]], playbook["steps"])
+
+    def save(self, site: str, phase: str, steps: list[dict[str, Any]], credentials: Optional[dict[str, Any]] = None) -> None:
+        """
+        Store the successful step sequence of a phase, replacing any previous recording. Values of the
+        site's `credentials` left in the steps are saved as their placeholders.
+        """
+        done_index = next((index for index, step in enumerate(steps) if step.get("action") == "done"), None)
+        if phase not in REPLAYABLE_PHASES or done_index is None:
+            return
+        steps = redact_credentials(steps[:done_index + 1], credentials or {})
+        playbooks = self._load_site(site)
+        playbooks[phase] = {"steps": steps, "recorded_at": time.time(), "replays": 0, "failures": 0}
+        self._save_site(site, playbooks)
+        logger.info(f"[Playbooks] 💾 Recorded {len(steps)} step {phase} playbook for {site}")
+
+    def record_outcome(self, site: str, phase: str, succeeded: bool, failed_step: Optional[int] = None) -> None:
+        """Count replays and failures of a playbook so stale recordings are visible in the files."""
+        playbooks = self._load_site(site)
+        playbook = playbooks.get(phase)
+        if not playbook:
+            return
+        playbook["replays"] += 1
+        if not succeeded:
+            playbook["failures"] += 1
+            playbook["last_failed_step"] = failed_step
+        self._save_site(site, playbooks)
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from multiprocessing.context import BaseContext
+from typing import AsyncGenerator, Generator, Optional
+from tracing import Tracer
+
+logger = logging.getLogger("JobApplicationAgent")
+
+class LLMRateLimiter:
+    """
+    Limit on LLM requests shared by every worker process of the fleet: at most `max_concurrent`
+    requests in flight and, optionally, request starts spaced to stay under `requests_per_minute`.
+
+    Built from multiprocessing primitives, so one instance created by the supervisor is handed to
+    each worker process when it is started. Every taken slot records the pid of its holder, so the
+    supervisor can give back the slots of a worker that crashed or was killed mid request
+    (release_worker). A request that waits longer than `acquire_timeout_seconds` for a slot fails
+    with a TimeoutError instead of hanging. Waiting time is counted in the tracer.
+    """
+    def __init__(
+        self,
+        max_concurrent: int,
+        requests_per_minute: Optional[float] = None,
+        context: Optional[BaseContext] = None,
+        acquire_timeout_seconds: Optional[float] = None
+    ) -> None:
+        ctx = context or multiprocessing.get_context("spawn")
+        self.max_concurrent: int = max_concurrent
+        self.interval_seconds: float = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.acquire_timeout_seconds: Optional[float] = acquire_timeout_seconds
+        # Pid holding each slot, 0 for a free one. Guarded by the condition, which is notified whenever slots are freed.
+        self.holders = ctx.Array("i", max_concurrent, lock=False)
+        self.slots_changed = ctx.Condition()
+        # Earliest wall clock time the next request may start, shared by all processes.
+        self.next_start = ctx.Value("d", 0.0)
+
+    def _start_delay(self) -> float:
+        if not self.interval_seconds:
+            return 0.0
+        with self.next_start.get_lock():
+            now = time.time()
+            start = max(now, self.next_start.value)
+            self.next_start.value = start + self.interval_seconds
+        return start - now
+
+    def acquire(self) -> int:
+        """Take a free slot for this process and return its index, waiting up to acquire_timeout_seconds."""
+        waiting_since = time.perf_counter()
+        deadline = time.monotonic() + self.acquire_timeout_seconds if self.acquire_timeout_seconds is not None else None
+        with self.slots_changed:
+            while True:
+                slot = next((index for index, pid in enumerate(self.holders) if pid == 0), None)
+                if slot is not None:
+                    self.holders[slot] = os.getpid()
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    Tracer.shared().count("llm_rate_limit_timeouts")
+                    raise TimeoutError(f"No LLM request slot freed up within {self.acquire_timeout_seconds:g}s (holders: {list(self.holders)})")
+                self.slots_changed.wait(remaining)
+        delay = self._start_delay()
+        if delay > 0:
+            time.sleep(delay)
+        waited = time.perf_counter() - waiting_since
+        if waited > 0.01:
+            Tracer.shared().count("llm_rate_limit_wait_seconds", waited)
+            logger.debug(f"[Rate Limiter] Waited {waited:.2f}s for an LLM request slot")
+        return slot
+
+    def release(self, slot: int) -> None:
+        with self.slots_changed:
+            self.holders[slot] = 0
+            self.slots_changed.notify_all()
+
+    def release_worker(self, pid: int) -> int:
+        """Free the slots still held by a worker process that exited, returns how many there were."""
+        with self.slots_changed:
+            released = 0
+            for index, holder in enumerate(self.holders):
+                if holder == pid:
+                    self.holders[index] = 0
+                    released += 1
+            if released:
+                self.slots_changed.notify_all()
+        return released
+
+    @contextmanager
+    def slot(self) -> Generator[None, None, None]:
+        slot = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(slot)
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncGenerator[None, None]:
+        # The condition is a blocking OS primitive, so it is waited for off the event loop.
+        handoff = threading.Lock()
+        abandoned = False
+        acquired: list[int] = []
+
+        def acquire() -> None:
+            slot = self.acquire()
+            with handoff:
+                if abandoned:
+                    self.release(slot)
+                else:
+                    acquired.append(slot)
+
+        try:
+            await asyncio.to_thread(acquire)
+        except asyncio.CancelledError:
+            # The thread goes on waiting after the task is cancelled: whichever side comes second gives the slot back.
+            with handoff:
+                abandoned = True
+                if acquired:
+                    self.release(acquired[0])
+            raise
+        try:
+            yield
+        finally:
+            self.release(acquired[0])
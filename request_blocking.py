@@ -0,0 +1,138 @@
+import functools
+import logging
+from typing import Any, Iterable, Optional, cast
+from urllib.parse import urlparse
+from playwright.async_api import Page, Request
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Resource types the agent never reads. Stylesheets stay, the actionable DOM relies on computed visibility.
+DEFAULT_BLOCKED_RESOURCE_TYPES: tuple[str, ...] = ("image", "media", "font")
+# Ad, analytics and session-recording hosts (subdomains included).
+DEFAULT_BLOCKED_DOMAINS: tuple[str, ...] = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "connect.facebook.net",
+    "analytics.tiktok.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "optimizely.com",
+    "adsrvr.org",
+    "criteo.com",
+    "quantserve.com",
+    "scorecardresearch.com"
+)
+# Hosts that are never blocked, so captchas (challenge images and audio included) stay solvable during manual intervention.
+DEFAULT_ALLOWED_DOMAINS: tuple[str, ...] = (
+    "google.com",
+    "gstatic.com",
+    "recaptcha.net",
+    "hcaptcha.com",
+    "challenges.cloudflare.com",
+    "arkoselabs.com"
+)
+BLOCKED_BY_CLIENT_ERROR = "net::ERR_BLOCKED_BY_CLIENT"
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+class RequestBlocker:
+    """
+    Request blocking profile applied to the pages of each site's BrowserContext over CDP, so Chrome
+    drops blocked requests itself. Routing the requests through Playwright instead would disable the
+    HTTP cache of the whole context. Blocked domains other than the allowed ones are dropped with
+    Network.setBlockedURLs. Requests of blocked resource types are paused with the Fetch domain,
+    which only intercepts those types, and failed unless they come from an allowed domain: URL
+    patterns cannot tell a tracking pixel from a captcha's challenge image. Applies to every site
+    but those listed in `unblocked_sites` (boards that break without them), and counts what Chrome
+    blocked.
+    """
+    def __init__(
+        self,
+        blocked_resource_types: Iterable[str] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+        blocked_domains: Iterable[str] = DEFAULT_BLOCKED_DOMAINS,
+        allowed_domains: Iterable[str] = DEFAULT_ALLOWED_DOMAINS,
+        unblocked_sites: Iterable[str] = ()
+    ) -> None:
+        self.blocked_resource_types: frozenset[str] = frozenset(blocked_resource_types)
+        self.blocked_domains: tuple[str, ...] = tuple(blocked_domains)
+        self.allowed_domains: tuple[str, ...] = tuple(allowed_domains)
+        self.unblocked_sites: tuple[str, ...] = tuple(urlparse(site).hostname or site for site in unblocked_sites)
+        self.url_patterns: list[str] = self.blocked_url_patterns()
+        # Requests Chrome blocked per reason, e.g. {"type:image": 12, "domain:www.google-analytics.com": 3}
+        self.stats: dict[str, int] = {}
+
+    def applies_to(self, site: Optional[str]) -> bool:
+        """Whether requests of a site's context should be filtered at all."""
+        if site is None:
+            return True
+        return not _host_matches(urlparse(site).hostname or site, self.unblocked_sites)
+
+    def blocked_url_patterns(self) -> list[str]:
+        """The Network.setBlockedURLs wildcard patterns of the blocked domains."""
+        patterns: list[str] = []
+        for domain in self.blocked_domains:
+            if not _host_matches(domain, self.allowed_domains):
+                patterns += [f"*://{domain}/*", f"*://*.{domain}/*"]
+        return patterns
+
+    def fetch_patterns(self) -> list[dict[str, str]]:
+        """The Fetch.enable patterns pausing the requests of blocked resource types (CDP names them "Image", "Media", "Font")."""
+        return [{"urlPattern": "*", "resourceType": resource_type.capitalize()} for resource_type in sorted(self.blocked_resource_types)]
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        """Return why a request is blocked by the profile, or None if it is let through."""
+        host = urlparse(url).hostname or ""
+        if _host_matches(host, self.allowed_domains):
+            return None
+        if resource_type in self.blocked_resource_types:
+            return f"type:{resource_type}"
+        if _host_matches(host, self.blocked_domains):
+            return f"domain:{host}"
+        return None
+
+    def _count(self, request: Request) -> None:
+        if request.failure != BLOCKED_BY_CLIENT_ERROR:
+            return
+        reason = self.block_reason(request.resource_type, request.url) or f"type:{request.resource_type}"
+        self.stats[reason] = self.stats.get(reason, 0) + 1
+
+    async def answer_paused_request(self, session: Any, event: dict[str, Any]) -> None:
+        """Fail a paused request of a blocked resource type, or let it through when it comes from an allowed domain."""
+        try:
+            if self.block_reason(str(event.get("resourceType", "")).lower(), str(event["request"]["url"])) is None:
+                await session.send("Fetch.continueRequest", {"requestId": event["requestId"]})
+            else:
+                await session.send("Fetch.failRequest", {"requestId": event["requestId"], "errorReason": "BlockedByClient"})
+        except Exception as e:
+            # The page, and its CDP session with it, may be closed while the request is paused.
+            logger.debug(f"[Blocking] Could not answer paused request {event.get('requestId')}: {e}")
+
+    async def install(self, page: Page) -> None:
+        """Block the profile's requests on a page and count the requests Chrome blocks on it."""
+        session = cast(Any, await page.context.new_cdp_session(page))
+        await session.send("Network.enable")
+        await session.send("Network.setBlockedURLs", {"urls": self.url_patterns})
+        if self.blocked_resource_types:
+            session.on("Fetch.requestPaused", functools.partial(self.answer_paused_request, session))
+            await session.send("Fetch.enable", {"patterns": self.fetch_patterns()})
+        page.on("requestfailed", self._count)
+
+    def log_stats(self) -> None:
+        if not self.stats:
+            return
+        logger.info(f"[Blocking] Blocked {sum(self.stats.values())} requests")
+        top = sorted(self.stats.items(), key=lambda item: item[1], reverse=True)[:10]
+        for reason, requests in top:
+            logger.info(f"[Blocking] {reason}: {requests} requests")
@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Optional, cast
+from playbooks import site_slug
+
+logger = logging.getLogger("JobApplicationAgent")
+
+class SessionStore:
+    """
+    Per-site Playwright storage state (cookies and localStorage), saved after a successful login and
+    loaded when the site's browser context is created so later runs can skip the login phase.
+    Files hold live session cookies, so they are written readable by the owner only.
+    """
+    def __init__(self, directory: str = "sessions") -> None:
+        self.directory: str = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, site: str) -> str:
+        return os.path.join(self.directory, f"{site_slug(site)}.json")
+
+    def load(self, site: str) -> Optional[dict[str, Any]]:
+        """
+        Return the saved storage state for a site with expired cookies dropped, or None if there is
+        no saved session or every cookie in it has expired.
+        """
+        path = self._path(site)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                state = cast(dict[str, Any], json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[Sessions] ⚠️ Ignoring unreadable session file {path}: {e}")
+            return None
+        now = time.time()
+        cookies = cast(list[dict[str, Any]], state.get("cookies", []))
+        # Playwright marks session cookies with expires == -1, those stay valid until the server says otherwise.
+        live_cookies = [cookie for cookie in cookies if cookie.get("expires", -1) < 0 or cookie["expires"] > now]
+        if cookies and not live_cookies:
+            logger.info(f"[Sessions] Saved session for {site} has expired.")
+            self.forget(site)
+            return None
+        state["cookies"] = live_cookies
+        return state
+
+    def save(self, site: str, state: dict[str, Any]) -> None:
+        path = self._path(site)
+        tmp_path = f"{path}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        logger.info(f"[Sessions] 💾 Saved session for {site} ({len(state.get('cookies', []))} cookies)")
+
+    def forget(self, site: str) -> None:
+        """Delete a site's saved session, used once it is found to be logged out."""
+        path = self._path(site)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,48 @@
+import os
+import random
+import string
+import time
+from pathlib import Path
+from artifact_store import ArtifactStore
+
+def payload(seed: int, size: int = 20_000) -> str:
+    # Random text, so compression leaves each artifact about as large as its content.
+    generator = random.Random(seed)
+    return "".join(generator.choice(string.ascii_letters) for _ in range(size))
+
+def artifact_files(directory: Path) -> list[Path]:
+    return [path for path in directory.rglob("*") if path.is_file()]
+
+def test_store_is_kept_under_max_bytes_by_evicting_the_oldest(tmp_path: Path) -> None:
+    directory = tmp_path / "artifacts"
+    store = ArtifactStore(str(directory), max_bytes=100_000)
+    ids = [store.put(payload(seed), "dom") for seed in range(10)]
+    store.close()
+    assert sum(path.stat().st_size for path in artifact_files(directory)) <= 100_000
+    assert store.stats["evicted"] > 0
+    assert store.get(ids[-1]) == payload(9)
+    assert store.get(ids[0]) is None
+    assert ids[0] not in store.known_ids
+
+def test_expired_artifacts_are_evicted_on_startup(tmp_path: Path) -> None:
+    directory = tmp_path / "artifacts"
+    store = ArtifactStore(str(directory))
+    old, recent = store.put("old snapshot", "dom"), store.put("recent snapshot", "dom")
+    store.close()
+    [old_path] = [path for path in artifact_files(directory) if path.name.startswith(old)]
+    two_days_ago = time.time() - 2 * 24 * 3600
+    os.utime(old_path, (two_days_ago, two_days_ago))
+
+    swept = ArtifactStore(str(directory), max_age_seconds=24 * 3600)
+    swept.close()
+    assert swept.get(old) is None
+    assert swept.get(recent) == "recent snapshot"
+    assert swept.stats["evicted"] == 1
+
+def test_unlimited_store_keeps_everything(tmp_path: Path) -> None:
+    directory = tmp_path / "artifacts"
+    store = ArtifactStore(str(directory))
+    ids = [store.put(payload(seed, 1_000), "llm") for seed in range(5)]
+    store.close()
+    assert all(store.get(artifact_id) is not None for artifact_id in ids)
+    assert store.stats["evicted"] == 0
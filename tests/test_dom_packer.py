@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+from typing import Any
+import pytest
+from artifact_store import ArtifactStore
+from dom_packer import DomPacker, default_dom_token_budget
+from llm_agent import LLMAgent
+from model_router import ModelRouter
+
+def chars(text: str) -> int:
+    """One token per character, so budgets are exact in the tests."""
+    return len(text)
+
+def test_actionable_elements_are_kept_by_score_within_the_budget() -> None:
+    elements: list[dict[str, Any]] = [
+        {"selector": "#privacy", "tag": "a", "text": "Privacy policy"},
+        {"selector": "#email", "tag": "input", "type": "email", "label": "Email"},
+        {"selector": "#password", "tag": "input", "type": "password", "label": "Password"},
+        {"selector": "#go", "tag": "button", "text": "Sign in"}
+    ]
+    payload = {"url": "https://jobs.example.com/login", "elements": elements}
+    envelope = len(json.dumps({"url": payload["url"], "elements": [], "omitted_elements": 4}, separators=(",", ":")))
+    inputs = sum(len(json.dumps(element, separators=(",", ":"))) + 1 for element in elements[1:3])
+    budget = envelope + inputs + 5
+    packed = DomPacker("login", budget, chars).pack(json.dumps(payload), "actionable")
+    assert [element["selector"] for element in json.loads(packed)["elements"]] == ["#email", "#password"]
+    assert json.loads(packed)["omitted_elements"] == 2
+    assert chars(packed) <= budget
+
+def test_everything_is_kept_when_it_fits() -> None:
+    payload = {"url": "u", "elements": [{"selector": "#a", "tag": "input"}, {"selector": "#b", "tag": "a"}], "omitted_elements": 3}
+    packed = json.loads(DomPacker("login", 10_000, chars).pack(json.dumps(payload), "actionable"))
+    assert [element["selector"] for element in packed["elements"]] == ["#a", "#b"]
+    assert packed["omitted_elements"] == 3
+
+def test_full_page_keeps_the_regions_that_matter_for_the_phase() -> None:
+    nav = "<nav>" + "".join(f"<a href='/p{index}'>Page {index}</a>" for index in range(40)) + "</nav>"
+    form = "<form><label>Email</label><input name='email'><label>Password</label><input type='password' name='password'><button>Sign in</button></form>"
+    html = f"<html><head><title>Login</title><script>var x = 1;</script></head><body>{nav}{form}</body></html>"
+    packed = DomPacker("login", 400, chars).pack(json.dumps({"html": html, "select_fields": [], "form_state": []}), "full")
+    assert chars(packed) <= 400
+    parsed = json.loads(packed)
+    assert parsed["title"] == "Login"
+    assert "name=\"password\"" in parsed["html"]
+    assert "<script" not in parsed["html"] and "Page 39" not in parsed["html"]
+    assert parsed["omitted_regions"] + parsed["truncated_regions"] >= 1
+
+def test_long_select_option_lists_are_capped() -> None:
+    payload = {"html": "<form><select name='country'></select></form>", "select_fields": [{"field": "country", "options": [str(n) for n in range(500)]}]}
+    packed = json.loads(DomPacker("application", 5_000, chars).pack(json.dumps(payload), "full"))
+    assert len(packed["select_fields"][0]["options"]) == 60
+
+def test_same_page_is_packed_once() -> None:
+    packer = DomPacker("login", 1_000, chars)
+    dom = json.dumps({"url": "u", "elements": [{"selector": "#a", "tag": "input"}]})
+    assert packer.pack(dom, "actionable") is packer.pack(dom, "actionable")
+
+def test_default_budget_per_model_and_mode() -> None:
+    assert default_dom_token_budget("gpt-4o-mini", "actionable") == 12000
+    assert default_dom_token_budget("gemma3:1b", "actionable") == 5000
+    assert default_dom_token_budget("gemma3:1b", "full") == 1500
+
+def test_escalated_request_packs_the_page_into_the_next_tiers_budget(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    ArtifactStore.set_shared(ArtifactStore(str(tmp_path / "artifacts")))
+    router = ModelRouter({"application": [("ollama", "gemma3:1b"), ("openai", "gpt-4o-mini")]})
+    agent = LLMAgent("application", dom_mode="actionable", router=router)
+    page = json.dumps({"mode": "actionable", "url": "https://jobs.example.com/apply", "elements": [
+        {"selector": f"#question-{index}", "tag": "input", "type": "text", "label": f"Screening question number {index} of the application"}
+        for index in range(600)
+    ]})
+    sent: list[tuple[str, int]] = []
+
+    def complete() -> str:
+        # The first tier answers with something that is not an instruction list, so the request escalates.
+        packed = json.loads(str(agent.messages[-1]["content"]).split("\n", 1)[1])
+        sent.append((agent.model, len(packed["elements"])))
+        return "[]" if agent.tier else "no instructions"
+
+    monkeypatch.setattr(agent, "_complete", complete)
+    context: dict[str, Any] = {"phase": "application", "applicant_preferences": {}, "applicant_data": {}}
+    assert agent.ask(page, context) == []
+    [(first_model, first_elements), (second_model, second_elements)] = sent
+    assert (first_model, second_model) == ("gemma3:1b", "gpt-4o-mini")
+    assert first_elements < second_elements
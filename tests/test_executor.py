@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Optional, cast
+import pytest
+from browser_controller import BrowserController
+from executor import InstructionExecutor, loggable
+from llm_agent import LLMAgent
+
+PASSWORD = "hunter2-Secret!"
+EMAIL = "jane.doe@example.com"
+
+class FakeBrowser:
+    """Stands in for BrowserController: fills succeed unless their selector is in `failing`."""
+    def __init__(self, failing: tuple[str, ...] = ()) -> None:
+        self.failing: tuple[str, ...] = failing
+
+    async def fill(self, selector: str, text: str, timeout_ms: Optional[float] = None) -> None:
+        if selector in self.failing:
+            raise TimeoutError(f"Timeout waiting for {selector}")
+
+    async def click(self, selector: str, timeout_ms: Optional[float] = None) -> None:
+        pass
+
+    async def fill_many(self, items: list[dict[str, str]]) -> list[Optional[str]]:
+        return ["element not found" if item["selector"] in self.failing else None for item in items]
+
+    async def settle(self, action: str) -> None:
+        pass
+
+def resolved_login_instructions() -> list[dict[str, Any]]:
+    context = {"phase": "login", "site": "https://jobs.example.com", "job_seeker_credentials": {"https://jobs.example.com": {"email": EMAIL, "password": PASSWORD}}}
+    return LLMAgent("login").resolve_placeholders([
+        {"action": "fill", "selector": "#email", "text": "$email"},
+        {"action": "fill", "selector": "#password", "text": "$password"},
+        {"action": "click", "selector": "#sign-in"}
+    ], context)
+
+def test_loggable_shows_the_template_and_masks_literal_values() -> None:
+    email, password, click = resolved_login_instructions()
+    assert password["text"] == PASSWORD
+    assert loggable(password) == {"action": "fill", "selector": "#password", "text": "$password"}
+    assert loggable(email)["text"] == "$email"
+    assert loggable({"action": "fill", "selector": "#password", "text": PASSWORD})["text"] == "***"
+    assert loggable(click) == click
+
+def test_no_credential_reaches_the_log(caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.DEBUG, logger="JobApplicationAgent")
+    instructions = resolved_login_instructions()
+    executor = InstructionExecutor(cast(BrowserController, FakeBrowser(failing=("#password",))), {"fill": 1})
+
+    async def source() -> AsyncIterator[dict[str, Any]]:
+        for instr in instructions:
+            yield instr
+
+    async def run() -> list[tuple[dict[str, Any], bool]]:
+        # The password fill fails in the batch and again on its own, so it goes through every log line of the executor.
+        return [result async for result in executor.execute_all(source(), batch_fills=True)]
+
+    results = asyncio.run(run())
+    assert [success for _, success in results] == [True, False, True]
+    assert "$password" in caplog.text
+    assert PASSWORD not in caplog.text
+    assert EMAIL not in caplog.text
@@ -0,0 +1,115 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+from form_filler import FormFiller, PlaceholderResolver, captured_field_templates, field_key, flatten_values
+
+APPLICANT: dict[str, Any] = flatten_values({
+    "first_name": "Alex",
+    "last_name": "Fixture",
+    "email": "alex@example.com",
+    "phone": "+1 555 0100",
+    "Address": {"City": "Austin", "Country": "United States"},
+    "education": [{"degree": "Bachelor's degree"}],
+    "resume_file": "/tmp/resume.pdf",
+    "cover_letter_file": ""
+})
+
+def page(*elements: dict[str, Any]) -> str:
+    return json.dumps({"url": "https://jobs.example.com/apply", "elements": list(elements)})
+
+def test_resolver_replaces_whole_and_embedded_placeholders() -> None:
+    resolver = PlaceholderResolver({"first_name": "Alex", "last_name": "Fixture", "years": 5})
+    assert resolver.resolve("$first_name $last_name") == "Alex Fixture"
+    # A whole-text placeholder keeps the value's type.
+    assert resolver.resolve("$years") == 5
+    assert resolver.resolve("Hi $first_name!") == "Hi Alex!"
+
+def test_resolver_prefers_the_longest_key_and_leaves_unknown_dollars() -> None:
+    resolver = PlaceholderResolver({"email": "a@b.c", "email_work": "w@b.c"})
+    assert resolver.resolve("$email_work") == "w@b.c"
+    assert resolver.resolve("$emailx") == "$emailx"
+    assert resolver.resolve("Salary $5000") == "Salary $5000"
+    assert PlaceholderResolver({}).resolve("$email") == "$email"
+
+def test_resolves_fully_needs_every_placeholder_known_and_non_empty() -> None:
+    resolver = PlaceholderResolver({"first_name": "Alex", "middle_name": " ", "last_name": "Fixture"})
+    assert resolver.resolves_fully("$first_name $last_name")
+    assert not resolver.resolves_fully("$first_name $middle_name")
+    assert not resolver.resolves_fully("$first_name $nickname")
+    assert not resolver.resolves_fully("plain text")
+
+def test_field_key_normalises_labels() -> None:
+    assert field_key("Your First Name *") == "first_name"
+    assert field_key("emailAddress") == "email_address"
+
+def test_fields_are_matched_by_autocomplete_label_name_and_type() -> None:
+    filler = FormFiller(APPLICANT)
+    instructions = filler.instructions_for(page(
+        {"tag": "input", "type": "text", "selector": "#fn", "autocomplete": "section-a given-name"},
+        {"tag": "input", "type": "text", "selector": "#ln", "label": "Surname *"},
+        {"tag": "input", "type": "text", "selector": "#town", "name": "city"},
+        {"tag": "input", "type": "tel", "selector": "#contact", "label": "How can we reach you"},
+        {"tag": "input", "type": "file", "selector": "#cv", "label": "Resume"}
+    ))
+    assert [(i["action"], i["selector"], i["text"], i["text_template"]) for i in instructions] == [
+        ("fill", "#fn", "Alex", "$first_name"),
+        ("fill", "#ln", "Fixture", "$last_name"),
+        ("fill", "#town", "Austin", "$Address_City"),
+        ("fill", "#contact", "+1 555 0100", "$phone"),
+        ("upload", "#cv", "/tmp/resume.pdf", "$resume_file")
+    ]
+
+def test_filled_skipped_and_unresolvable_fields_are_left_for_the_llm() -> None:
+    filler = FormFiller(APPLICANT)
+    instructions = filler.instructions_for(page(
+        {"tag": "input", "type": "text", "selector": "#filled", "label": "First name", "value": "Al"},
+        {"tag": "input", "type": "password", "selector": "#pw", "label": "Email"},
+        {"tag": "input", "type": "text", "selector": "#disabled", "label": "Email", "disabled": True},
+        {"tag": "input", "type": "file", "selector": "#letter", "label": "Cover letter"},
+        {"tag": "input", "type": "text", "selector": "#why", "label": "Why do you want to work here?"},
+        # A file template never goes into a text field.
+        {"tag": "input", "type": "text", "selector": "#resume", "label": "Resume"}
+    ))
+    assert instructions == []
+
+def test_select_matches_option_value_or_text() -> None:
+    filler = FormFiller(APPLICANT)
+    instructions = filler.instructions_for(page(
+        {"tag": "select", "selector": "#country", "label": "Country", "options": ["ca (Canada)", "us (United States)"]},
+        {"tag": "select", "selector": "#degree", "label": "Degree", "options": ["Master's degree", "PhD"]}
+    ))
+    assert instructions == [{"action": "select", "selector": "#country", "text": "us", "text_template": "$Address_Country"}]
+
+def test_a_field_is_only_answered_once_per_listing() -> None:
+    filler = FormFiller(APPLICANT)
+    form = page({"tag": "input", "type": "email", "selector": "#email"})
+    assert len(filler.instructions_for(form)) == 1
+    assert filler.instructions_for(form) == []
+    filler.reset()
+    assert len(filler.instructions_for(form)) == 1
+
+def test_fields_the_llm_filled_are_learned() -> None:
+    filler = FormFiller(APPLICANT)
+    form = page({"tag": "input", "type": "text", "selector": "#hometown", "label": "Hometown"})
+    assert filler.instructions_for(form) == []
+    filler.learn({"action": "fill", "selector": "#hometown", "text": "Austin", "text_template": "$Address_City"})
+    filler.reset()
+    assert filler.instructions_for(form) == [{"action": "fill", "selector": "#hometown", "text": "Austin", "text_template": "$Address_City"}]
+
+def test_captured_field_names_are_recognised(tmp_path: Path) -> None:
+    capture = {"pages": [{
+        "interactables": [{"uid": 1, "label": "Town / City"}, {"uid": 2, "label": "Email"}],
+        "actions": [
+            {"action": "fill", "id": 1, "value": "$Address_City"},
+            {"action": "fill", "id": 2, "value": "typed by hand"}
+        ]
+    }]}
+    with open(os.path.join(tmp_path, "instruction-1.json"), "w") as f:
+        json.dump(capture, f)
+    templates = captured_field_templates(str(tmp_path))
+    assert templates == {"town_city": "$Address_City"}
+    filler = FormFiller(APPLICANT, templates)
+    assert filler.instructions_for(page({"tag": "input", "type": "text", "selector": "#t", "label": "Town/City"})) == [
+        {"action": "fill", "selector": "#t", "text": "Austin", "text_template": "$Address_City"}
+    ]
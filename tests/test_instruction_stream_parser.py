@@ -0,0 +1,40 @@
+from llm_agent import InstructionStreamParser
+
+def feed_all(parser: InstructionStreamParser, chunks: list[str]) -> list[list[dict[str, object]]]:
+    return [parser.feed(chunk) for chunk in chunks]
+
+def test_object_is_returned_once_its_closing_brace_arrives() -> None:
+    parser = InstructionStreamParser()
+    assert feed_all(parser, ['[{"action": "cli', 'ck", "selector": "#go"', '}', ']']) == [[], [], [{"action": "click", "selector": "#go"}], []]
+
+def test_several_objects_in_one_chunk() -> None:
+    parser = InstructionStreamParser()
+    completed = parser.feed('[{"action": "fill", "selector": "#a", "text": "x"}, {"action": "done"}]')
+    assert completed == [{"action": "fill", "selector": "#a", "text": "x"}, {"action": "done"}]
+
+def test_fenced_block_and_bare_object() -> None:
+    parser = InstructionStreamParser()
+    assert parser.feed('Sure:\n```json\n{"action": "done"}\n```') == [{"action": "done"}]
+
+def test_nested_objects_are_part_of_their_instruction() -> None:
+    parser = InstructionStreamParser()
+    assert feed_all(parser, ['{"action": "fill", "meta": {"a"', ': 1}', ', "selector": "#x"}']) == [
+        [], [], [{"action": "fill", "meta": {"a": 1}, "selector": "#x"}]
+    ]
+
+def test_braces_and_escaped_quotes_inside_strings() -> None:
+    parser = InstructionStreamParser()
+    chunks = ['{"action": "fill", "text": "a } b { \\"', 'quoted\\" }", "selector": "#t"}']
+    assert feed_all(parser, chunks) == [[], [{"action": "fill", "text": 'a } b { "quoted" }', "selector": "#t"}]]
+
+def test_escape_split_across_chunks() -> None:
+    parser = InstructionStreamParser()
+    assert feed_all(parser, ['{"text": "x\\', '"}"}']) == [[], [{"text": 'x"}'}]]
+
+def test_malformed_object_is_skipped_and_parsing_continues() -> None:
+    parser = InstructionStreamParser()
+    assert parser.feed('[{"action": click}, {"action": "done"}]') == [{"action": "done"}]
+
+def test_unterminated_object_yields_nothing() -> None:
+    parser = InstructionStreamParser()
+    assert feed_all(parser, ['{"action": "click", ', '"selector": "#go"']) == [[], []]
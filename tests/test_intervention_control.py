@@ -0,0 +1,57 @@
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Iterator, Optional
+import pytest
+from intervention_control import InterventionServer
+from intervention_queue import PENDING, RESUMED, SKIPPED, InterventionQueue
+
+@pytest.fixture
+def queue(tmp_path: Path) -> Iterator[InterventionQueue]:
+    queue = InterventionQueue(str(tmp_path / "interventions.sqlite3"), timeout_seconds=None, poll_seconds=0.01)
+    yield queue
+    queue.close()
+
+@pytest.fixture
+def server(queue: InterventionQueue) -> Iterator[InterventionServer]:
+    server = InterventionServer(queue, port=0)
+    yield server
+    server.close()
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args: object, **kwargs: object) -> None:
+        return None
+
+def post(server: InterventionServer, path: str, token: str, origin: Optional[str] = None, host: Optional[str] = None) -> int:
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    if origin is not None:
+        headers["Origin"] = origin
+    if host is not None:
+        headers["Host"] = host
+    request = urllib.request.Request(f"{server.url.rstrip('/')}{path}", data=f"token={token}".encode(), headers=headers, method="POST")
+    try:
+        with urllib.request.build_opener(NoRedirect()).open(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_control_page_form_resolves_the_intervention(queue: InterventionQueue, server: InterventionServer) -> None:
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha")
+    with urllib.request.urlopen(server.url) as response:
+        page = response.read().decode()
+    assert f"value='{server.token}'" in page
+    assert post(server, f"/interventions/{intervention_id}/skip", server.token, origin=server.url.rstrip("/")) == 303
+    assert queue.status(intervention_id) == SKIPPED
+
+def test_cross_site_posts_are_rejected(queue: InterventionQueue, server: InterventionServer) -> None:
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha")
+    path = f"/interventions/{intervention_id}/resume"
+    # A job site's page posting a form to the control page, with and without a guessed token.
+    assert post(server, path, "", origin="https://jobs.example.com") == 403
+    assert post(server, path, server.token, origin="https://jobs.example.com") == 403
+    assert post(server, path, "guess") == 403
+    # A rebound DNS name pointing at localhost.
+    assert post(server, path, server.token, host="attacker.example:80") == 403
+    assert queue.status(intervention_id) == PENDING
+    assert post(server, path, server.token) == 303
+    assert queue.status(intervention_id) == RESUMED
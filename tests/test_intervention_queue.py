@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from pathlib import Path
+from typing import Iterator
+import pytest
+from intervention_queue import EXPIRED, PENDING, RESUMED, SKIPPED, InterventionQueue
+
+@pytest.fixture
+def queue(tmp_path: Path) -> Iterator[InterventionQueue]:
+    queue = InterventionQueue(str(tmp_path / "interventions.sqlite3"), timeout_seconds=None, poll_seconds=0.01)
+    yield queue
+    queue.close()
+
+def test_open_lists_the_intervention_as_pending(queue: InterventionQueue) -> None:
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha", "worker-1")
+    assert queue.status(intervention_id) == PENDING
+    [pending] = queue.pending()
+    assert (pending["id"], pending["site"], pending["phase"], pending["reason"], pending["owner"]) == (
+        intervention_id, "https://jobs.example.com", "login", "captcha", "worker-1"
+    )
+
+def test_an_intervention_is_resolved_once(queue: InterventionQueue) -> None:
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha")
+    assert queue.resolve(intervention_id)
+    assert not queue.resolve(intervention_id, SKIPPED)
+    assert queue.status(intervention_id) == RESUMED
+    assert queue.pending() == []
+    assert not queue.resolve(intervention_id + 1)
+    assert queue.status(intervention_id + 1) == EXPIRED
+
+def test_wait_returns_once_resolved_from_another_thread(queue: InterventionQueue) -> None:
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha")
+    timer = threading.Timer(0.05, queue.resolve, (intervention_id, SKIPPED))
+    timer.start()
+    assert queue.wait(intervention_id) == SKIPPED
+    timer.join()
+
+def test_wait_async_lets_other_tasks_run(queue: InterventionQueue) -> None:
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha")
+
+    async def other_site() -> str:
+        await asyncio.sleep(0.05)
+        queue.resolve(intervention_id)
+        return "ran"
+
+    async def both() -> list[str]:
+        return list(await asyncio.gather(queue.wait_async(intervention_id), other_site()))
+
+    assert asyncio.run(both()) == [RESUMED, "ran"]
+
+def test_unresolved_interventions_expire_after_the_timeout(queue: InterventionQueue) -> None:
+    queue.timeout_seconds = 0.05
+    intervention_id = queue.open("https://jobs.example.com", "login", "captcha")
+    assert queue.wait(intervention_id) == EXPIRED
+    assert not queue.resolve(intervention_id)
+    assert asyncio.run(queue.wait_async(queue.open("https://jobs.example.com", "search", "stuck"))) == EXPIRED
+
+def test_expire_pending_of_one_owner_or_all(queue: InterventionQueue) -> None:
+    first = queue.open("https://a.example.com", "login", "captcha", "worker-1")
+    second = queue.open("https://b.example.com", "login", "captcha", "worker-2")
+    resolved = queue.open("https://c.example.com", "login", "captcha", "worker-1")
+    queue.resolve(resolved)
+    assert queue.expire_pending("worker-1") == 1
+    assert (queue.status(first), queue.status(second), queue.status(resolved)) == (EXPIRED, PENDING, RESUMED)
+    assert queue.expire_pending() == 1
+    assert queue.status(second) == EXPIRED
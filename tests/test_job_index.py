@@ -0,0 +1,74 @@
+from pathlib import Path
+from typing import Any, Iterator
+import pytest
+from job_index import JobIndex, canonical_job_key, job_id_from_url, listing_content_hash
+
+@pytest.fixture
+def index(tmp_path: Path) -> Iterator[JobIndex]:
+    index = JobIndex(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    yield index
+    index.close()
+
+def listing(url: str, title: str = "Backend Engineer", text: str = "") -> dict[str, Any]:
+    return {"url": url, "title": title, "text": text or title}
+
+def test_job_id_from_query_uuid_and_path() -> None:
+    assert job_id_from_url("https://www.indeed.com/viewjob?jk=abc123&from=serp") == "abc123"
+    assert job_id_from_url("https://jobs.lever.co/acme/0F1E2D3C-4B5A-6978-8796-A5B4C3D2E1F0") == "0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0"
+    assert job_id_from_url("https://www.linkedin.com/jobs/view/3912345678/") == "3912345678"
+    assert job_id_from_url("https://example.com/careers/search") is None
+
+def test_canonical_key_ignores_tracking_parameters() -> None:
+    assert canonical_job_key("https://www.indeed.com/viewjob?jk=abc123&from=serp") == canonical_job_key("https://www.indeed.com/rc/clk?jk=abc123")
+    assert canonical_job_key("https://Example.com/careers/backend/?ref=home#apply") == "url:example.com/careers/backend"
+
+def test_content_hash_normalizes_whitespace_and_case_but_keeps_digits() -> None:
+    assert listing_content_hash("Backend  Engineer\n Remote") == listing_content_hash("backend engineer remote")
+    assert listing_content_hash("Engineer II") != listing_content_hash("Engineer III")
+    assert listing_content_hash("Cashier, store 104") != listing_content_hash("Cashier, store 105")
+
+def test_pending_listings_dedupes_by_key_and_drops_links_without_job_id(index: JobIndex) -> None:
+    extracted = [
+        listing("https://www.indeed.com/viewjob?jk=abc123&from=serp"),
+        listing("https://www.indeed.com/rc/clk?jk=abc123"),
+        listing("https://www.indeed.com/jobs?q=python", title="Next page")
+    ]
+    pending = index.pending_listings("indeed", extracted, require_job_id=True)
+    assert [entry["key"] for entry in pending] == ["id:abc123"]
+    # Listings keyed by job id do not carry a content hash, identical card text must not merge them.
+    assert pending[0]["content_hash"] == ""
+    assert len(index.pending_listings("indeed", extracted, require_job_id=False)) == 2
+
+def test_applied_listing_is_skipped_on_rerun(index: JobIndex) -> None:
+    [entry] = index.pending_listings("indeed", [listing("https://www.indeed.com/viewjob?jk=abc123")], require_job_id=True)
+    index.record("indeed", entry, "started")
+    index.record("indeed", entry, "applied")
+    assert index.pending_listings("indeed", [listing("https://www.indeed.com/viewjob?jk=abc123&from=serp")], require_job_id=True) == []
+    # Another site with the same id is a different listing.
+    assert len(index.pending_listings("other", [listing("https://www.indeed.com/viewjob?jk=abc123")], require_job_id=True)) == 1
+    reopened = JobIndex(index.path)
+    try:
+        assert reopened.should_skip("indeed", entry)
+    finally:
+        reopened.close()
+
+def test_listing_without_job_id_is_skipped_by_content_hash(index: JobIndex) -> None:
+    [entry] = index.pending_listings("acme", [listing("https://acme.example.com/careers/backend", text="Backend Engineer, Berlin")], require_job_id=False)
+    index.record("acme", entry, "applied")
+    # Reposted under another url with the same card text.
+    reposted = listing("https://acme.example.com/careers/backend-2", text="Backend  engineer, BERLIN")
+    assert index.pending_listings("acme", [reposted], require_job_id=False) == []
+    other_city = listing("https://acme.example.com/careers/backend-3", text="Backend Engineer, Munich")
+    assert len(index.pending_listings("acme", [other_city], require_job_id=False)) == 1
+
+def test_failed_listing_is_retried_until_max_attempts(index: JobIndex) -> None:
+    extracted = [listing("https://www.indeed.com/viewjob?jk=abc123")]
+    [entry] = index.pending_listings("indeed", extracted, require_job_id=True)
+    index.record("indeed", entry, "started")
+    index.record("indeed", entry, "failed")
+    assert len(index.pending_listings("indeed", extracted, require_job_id=True)) == 1
+    index.record("indeed", entry, "started")
+    index.record("indeed", entry, "failed")
+    assert index.pending_listings("indeed", extracted, require_job_id=True) == []
+    status = index.connection.execute("SELECT status, attempts FROM jobs WHERE job_key = ?", (entry["key"],)).fetchone()
+    assert status == ("rejected", 2)
@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator
+import pytest
+import llm_cache
+from llm_cache import LLMResponseCache, dom_fingerprint, live_selectors, portable_selectors
+
+def actionable(*elements: dict[str, Any]) -> str:
+    return json.dumps({"mode": "actionable", "url": "https://jobs.example.com/login", "elements": list(elements)})
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path: Path) -> Iterator[LLMResponseCache]:
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.sqlite3"), max_entries=2, ttl_seconds=60)
+    yield cache
+    cache.close()
+
+def test_actionable_fingerprint_ignores_selectors_and_values() -> None:
+    first = actionable(
+        {"uid": "e1", "selector": "[data-agent-uid='e1']", "tag": "input", "type": "email", "label": "Email", "value": "a@b.c"},
+        {"uid": "e2", "selector": "[data-agent-uid='e2']", "tag": "button", "text": "Sign in"}
+    )
+    revisit = actionable(
+        {"uid": "e7", "selector": "[data-agent-uid='e7']", "tag": "input", "type": "email", "label": "Email", "value": "x@y.z"},
+        {"uid": "e8", "selector": "[data-agent-uid='e8']", "tag": "button", "text": "Sign in"}
+    )
+    assert dom_fingerprint(first) == dom_fingerprint(revisit)
+
+def test_fingerprint_tells_links_and_buttons_apart_by_text() -> None:
+    first = actionable({"tag": "a", "href": "/job/1", "text": "Backend Engineer, Acme"}, {"tag": "button", "text": "Next"})
+    second = actionable({"tag": "a", "href": "/job/2", "text": "Data Engineer, Initech"}, {"tag": "button", "text": "Next"})
+    assert dom_fingerprint(first) != dom_fingerprint(second)
+    assert dom_fingerprint(json.dumps({"html": "<a href='/1'>Apply</a>"})) != dom_fingerprint(json.dumps({"html": "<a href='/1'>Save</a>"}))
+
+def test_uid_selectors_are_stored_as_element_indices() -> None:
+    first = actionable({"uid": "el_3", "tag": "input", "type": "email"}, {"uid": "el_4", "tag": "button", "text": "Sign in"})
+    revisit = actionable({"uid": "el_11", "tag": "input", "type": "email"}, {"uid": "el_12", "tag": "button", "text": "Sign in"})
+    instructions = [
+        {"action": "fill", "selector": '[data-agent-uid="el_3"]', "text": "$email"},
+        {"action": "click", "selector": "[data-agent-uid='el_4']"},
+        {"action": "click", "selector": "#submit"}
+    ]
+    portable = portable_selectors(instructions, first)
+    assert portable is not None
+    assert [instruction["selector"] for instruction in portable] == ["@element[0]", "@element[1]", "#submit"]
+    live = live_selectors(portable, revisit)
+    assert live is not None
+    assert [instruction["selector"] for instruction in live] == ['[data-agent-uid="el_11"]', '[data-agent-uid="el_12"]', "#submit"]
+    assert live_selectors(portable, actionable({"uid": "el_11", "tag": "input", "type": "email"})) is None
+
+def test_responses_with_uids_off_the_element_list_are_not_portable() -> None:
+    instructions = [{"action": "click", "selector": '[data-agent-uid="el_9"]'}]
+    assert portable_selectors(instructions, actionable({"uid": "el_3", "tag": "button"})) is None
+    # Full mode pages carry no element list to map uids against.
+    assert portable_selectors(instructions, json.dumps({"html": '<button data-agent-uid="el_9">Go</button>'})) is None
+    assert portable_selectors([{"action": "click", "selector": "#go"}], json.dumps({"html": "<button id='go'>Go</button>"})) == [{"action": "click", "selector": "#go"}]
+
+def test_actionable_fingerprint_tracks_structure_and_fill_state() -> None:
+    empty = actionable({"tag": "input", "type": "email", "label": "Email"})
+    assert dom_fingerprint(empty) != dom_fingerprint(actionable({"tag": "input", "type": "email", "label": "Email", "value": "a@b.c"}))
+    assert dom_fingerprint(empty) != dom_fingerprint(actionable({"tag": "input", "type": "text", "label": "Email"}))
+    assert dom_fingerprint(empty) != dom_fingerprint(actionable({"tag": "input", "type": "email", "label": "Email", "role": "combobox"}))
+
+def test_html_fingerprint_keeps_only_stable_attributes() -> None:
+    first = json.dumps({"html": '<form method="post"><input name="q" id="x-123" class="a" value="python"><script>1</script></form>'})
+    second = json.dumps({"html": '<form method="post"><input name="q" id="x-456" class="b" value="java"></form>'})
+    assert dom_fingerprint(first) == dom_fingerprint(second)
+    assert dom_fingerprint(first) != dom_fingerprint(json.dumps({"html": '<form method="get"><input name="q"></form>'}))
+
+def test_key_depends_on_phase_model_page_and_context() -> None:
+    dom = actionable({"tag": "input", "type": "email"})
+    key = LLMResponseCache.make_key("login", "gemma3:1b", dom, "context")
+    assert key == LLMResponseCache.make_key("login", "gemma3:1b", dom, "context")
+    assert key != LLMResponseCache.make_key("search", "gemma3:1b", dom, "context")
+    assert key != LLMResponseCache.make_key("login", "gemma3:12b", dom, "context")
+    assert key != LLMResponseCache.make_key("login", "gemma3:1b", dom, "other context")
+    assert key != LLMResponseCache.make_key("login", "gemma3:1b", actionable({"tag": "input", "type": "password"}), "context")
+
+def test_get_returns_what_was_put_and_counts_hits(cache: LLMResponseCache, clock: Clock) -> None:
+    instructions = [{"action": "fill", "selector": "#email", "text": "$email"}]
+    assert cache.get("k", "login") is None
+    cache.put("k", "login", instructions)
+    assert cache.get("k", "login") == instructions
+    assert cache.stats == {"login": {"hits": 1, "misses": 1}}
+
+def test_entries_expire_after_the_ttl(cache: LLMResponseCache, clock: Clock) -> None:
+    cache.put("k", "login", [{"action": "done"}])
+    clock.now += 59
+    assert cache.get("k", "login") is not None
+    clock.now += 2
+    assert cache.get("k", "login") is None
+    assert cache.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+
+def test_least_recently_used_entry_is_evicted(cache: LLMResponseCache, clock: Clock) -> None:
+    cache.put("a", "login", [{"action": "done"}])
+    clock.now += 1
+    cache.put("b", "login", [{"action": "done"}])
+    clock.now += 1
+    assert cache.get("a", "login") is not None
+    clock.now += 1
+    cache.put("c", "login", [{"action": "done"}])
+    assert cache.get("b", "login") is None
+    assert cache.get("a", "login") is not None
+    assert cache.get("c", "login") is not None
+
+def test_invalidate_drops_the_entry(cache: LLMResponseCache, clock: Clock) -> None:
+    cache.put("k", "login", [{"action": "done"}])
+    cache.invalidate("k")
+    assert cache.get("k", "login") is None
@@ -0,0 +1,66 @@
+import json
+from typing import Any, Optional
+from page_tracker import PageTracker, page_delta
+
+def actionable(elements: list[dict[str, Any]], url: str = "https://jobs.example.com/apply") -> str:
+    return json.dumps({"url": url, "title": "Apply", "elements": elements})
+
+FORM: list[dict[str, Any]] = [
+    {"selector": f"#field{index}", "tag": "input", "label": f"Question {index}"} for index in range(6)
+]
+
+def delta(base: str, dom: str) -> Optional[dict[str, Any]]:
+    result = page_delta(base, dom)
+    return json.loads(result) if result is not None else None
+
+def test_delta_lists_added_changed_and_removed_elements() -> None:
+    current = [{**FORM[0], "value": "Alex"}, *FORM[1:5], {"selector": "#next", "tag": "button", "text": "Next"}]
+    assert delta(actionable(FORM), actionable(current)) == {
+        "added": [{"selector": "#next", "tag": "button", "text": "Next"}],
+        "changed": [{**FORM[0], "value": "Alex"}],
+        "removed": ["#field5"]
+    }
+
+def test_unchanged_page_has_an_empty_delta() -> None:
+    assert delta(actionable(FORM), actionable(FORM)) == {"added": [], "changed": [], "removed": []}
+
+def test_no_delta_for_another_url_or_a_mostly_new_page() -> None:
+    assert page_delta(actionable(FORM), actionable(FORM, url="https://jobs.example.com/apply/2")) is None
+    replaced = [{"selector": f"#other{index}", "tag": "input"} for index in range(6)]
+    assert page_delta(actionable(FORM), actionable(replaced)) is None
+
+def test_full_mode_delta_follows_controls_and_form_state() -> None:
+    base = json.dumps({"html": "<form><label>Email</label><input name='email'><button>Next</button></form>", "form_state": []})
+    filled = json.dumps({
+        "html": "<form><label>Email</label><input name='email'><button>Next</button></form>",
+        "form_state": [{"field": "email", "type": "email", "value": "a@b.c"}]
+    })
+    assert delta(base, filled) == {"added": [{"field": "email", "type": "email", "value": "a@b.c"}], "changed": [], "removed": []}
+
+def test_tracker_notices_a_page_that_stops_reacting() -> None:
+    tracker = PageTracker(stuck_after=2, max_revisits=5)
+    page = actionable(FORM)
+    tracker.observe(page)
+    for _ in range(2):
+        tracker.record({"action": "click", "selector": "#next"}, True)
+        assert tracker.stuck_reason is None
+        tracker.observe(page)
+    assert tracker.stuck_reason is not None and "did not change" in tracker.stuck_reason
+    tracker.reset()
+    assert tracker.stuck_reason is None
+
+def test_tracker_notices_a_page_that_keeps_coming_back() -> None:
+    tracker = PageTracker(stuck_after=5, max_revisits=3)
+    first, second = actionable(FORM), actionable(FORM[:3])
+    for page in (first, second, first, second, first):
+        tracker.observe(page)
+        tracker.record({"action": "click", "selector": "#next"}, True)
+    assert tracker.stuck_reason is not None and "same state 3 times" in tracker.stuck_reason
+
+def test_actions_summary_leaves_out_fill_values() -> None:
+    tracker = PageTracker()
+    tracker.record({"action": "fill", "selector": "#password", "text": "secret"}, True)
+    tracker.record({"action": "click", "selector": "#go"}, False)
+    tracker.record({"action": "intervene", "text": "captcha"}, False)
+    assert tracker.actions_summary() == "fill #password ok; click #go failed; intervene manual intervention ok"
+    assert "secret" not in tracker.actions_summary()
@@ -0,0 +1,26 @@
+from pathlib import Path
+from playbooks import PlaybookStore, redact_credentials
+
+CREDENTIALS = {"login_type": "Google", "email": "jane@example.com", "username": "jd", "password": "s3cret-jd"}
+
+def test_only_whole_secret_values_are_redacted() -> None:
+    steps = [
+        {"action": "fill", "selector": "#user", "text": "jane@example.com"},
+        {"action": "fill", "selector": "#password", "text": "s3cret-jd"},
+        {"action": "fill", "selector": "#q", "text": "Google Cloud engineer"},
+        {"action": "fill", "selector": "#q", "text": "jdk developer"},
+        {"action": "click", "selector": "#login-with-google", "text": "Google"}
+    ]
+    assert [step["text"] for step in redact_credentials(steps, CREDENTIALS)] == [
+        "$email", "$password", "Google Cloud engineer", "jdk developer", "Google"
+    ]
+
+def test_saved_login_playbook_keeps_placeholders(tmp_path: Path) -> None:
+    store = PlaybookStore(str(tmp_path / "playbooks"))
+    store.save("https://jobs.example.com", "login", [
+        {"action": "fill", "selector": "#password", "text": "s3cret-jd"},
+        {"action": "done", "selector": "", "text": ""}
+    ], CREDENTIALS)
+    steps = store.get("https://jobs.example.com", "login")
+    assert steps is not None and steps[0]["text"] == "$password"
+    assert "s3cret-jd" not in (tmp_path / "playbooks" / "jobs.example.com.json").read_text()
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from typing import Any, cast
+import pytest
+import browser_controller
+from browser_controller import BrowserController
+from tracing import Tracer
+
+class FakePage:
+    def __init__(self, url: str) -> None:
+        self.url: str = url
+        self.closed: bool = False
+
+    async def bring_to_front(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def tracer() -> Tracer:
+    tracer = Tracer()
+    Tracer.set_shared(tracer)
+    return tracer
+
+def controller(url: str) -> BrowserController:
+    return BrowserController(cast(Any, None), cast(Any, FakePage(url)), None, 300, None)
+
+async def adopt(listing_url: str, now_at: str, taken_at: str, age_seconds: float) -> BrowserController:
+    browser = controller("https://jobs.example.com/search")
+    prefetched = controller(now_at)
+
+    async def load() -> tuple[str, str, float]:
+        return '{"mode": "actionable", "elements": []}', taken_at, time.monotonic() - age_seconds
+
+    browser.prefetched = prefetched
+    browser.prefetch_url = listing_url
+    browser.prefetch_mode = "actionable"
+    browser.prefetch_task = asyncio.create_task(load())
+    assert await browser.adopt_prefetched(listing_url)
+    assert cast(FakePage, browser.page).url == now_at
+    return browser
+
+def test_fresh_snapshot_of_the_page_is_used() -> None:
+    browser = asyncio.run(adopt("https://jobs.example.com/job/1", "https://jobs.example.com/job/1", "https://jobs.example.com/job/1", 1))
+    assert browser.pending_dom is not None
+
+def test_snapshot_is_dropped_when_the_page_moved_on(tracer: Tracer) -> None:
+    # Redirected to a sign-in wall after the snapshot was taken.
+    browser = asyncio.run(adopt("https://jobs.example.com/job/1", "https://jobs.example.com/login", "https://jobs.example.com/job/1", 1))
+    assert browser.pending_dom is None
+    assert sum(value for (name, _), value in tracer.counters.items() if name == "prefetch_stale_snapshots") == 1
+
+def test_old_snapshot_is_taken_again() -> None:
+    url = "https://jobs.example.com/job/1"
+    browser = asyncio.run(adopt(url, url, url, browser_controller.PREFETCH_SNAPSHOT_MAX_AGE_SECONDS + 1))
+    assert browser.pending_dom is None
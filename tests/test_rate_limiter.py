@@ -0,0 +1,68 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from rate_limiter import LLMRateLimiter
+from tracing import Tracer
+
+@pytest.fixture(autouse=True)
+def tracer() -> Tracer:
+    tracer = Tracer()
+    Tracer.set_shared(tracer)
+    return tracer
+
+def test_slots_are_recorded_per_holder_and_released() -> None:
+    limiter = LLMRateLimiter(2)
+    first = limiter.acquire()
+    second = limiter.acquire()
+    assert sorted([first, second]) == [0, 1]
+    assert list(limiter.holders) == [os.getpid(), os.getpid()]
+    limiter.release(first)
+    assert limiter.acquire() == first
+
+def test_acquire_times_out_when_no_slot_frees_up(tracer: Tracer) -> None:
+    limiter = LLMRateLimiter(1, acquire_timeout_seconds=0.2)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.2
+    assert sum(value for (name, _), value in tracer.counters.items() if name == "llm_rate_limit_timeouts") == 1
+
+def test_release_worker_frees_the_slots_of_a_dead_holder_and_wakes_waiters() -> None:
+    limiter = LLMRateLimiter(1, acquire_timeout_seconds=5)
+    with limiter.slots_changed:
+        # A slot taken by a worker process that then died.
+        limiter.holders[0] = 999_999
+    acquired: list[int] = []
+    waiter = threading.Thread(target=lambda: acquired.append(limiter.acquire()))
+    waiter.start()
+    time.sleep(0.1)
+    assert not acquired
+    assert limiter.release_worker(999_999) == 1
+    waiter.join(2)
+    assert acquired == [0]
+    assert limiter.release_worker(999_999) == 0
+
+def test_cancelled_async_waiter_gives_its_slot_back() -> None:
+    limiter = LLMRateLimiter(1, acquire_timeout_seconds=5)
+    held = limiter.acquire()
+
+    async def waiter() -> None:
+        async with limiter.aslot():
+            pytest.fail("a cancelled waiter must not get to run its request")
+
+    async def run() -> None:
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The waiter's thread takes the slot as soon as it is free, and has to hand it straight back.
+        limiter.release(held)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert list(limiter.holders) == [0]
+    limiter.release(limiter.acquire())
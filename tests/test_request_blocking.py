@@ -0,0 +1,34 @@
+import asyncio
+from typing import Any
+from request_blocking import RequestBlocker
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.sent: list[tuple[str, dict[str, Any]]] = []
+
+    async def send(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        self.sent.append((method, params))
+        return {}
+
+def answered_with(blocker: RequestBlocker, resource_type: str, url: str) -> str:
+    session = FakeSession()
+    asyncio.run(blocker.answer_paused_request(session, {"requestId": "r1", "resourceType": resource_type, "request": {"url": url}}))
+    [(method, _)] = session.sent
+    return method
+
+def test_captcha_challenge_media_is_let_through() -> None:
+    blocker = RequestBlocker()
+    assert answered_with(blocker, "Image", "https://www.google.com/recaptcha/api2/payload?p=abc") == "Fetch.continueRequest"
+    assert answered_with(blocker, "Media", "https://www.gstatic.com/recaptcha/audio/challenge.mp3") == "Fetch.continueRequest"
+    assert blocker.block_reason("image", "https://imgs.hcaptcha.com/tile.png") is None
+
+def test_other_images_fonts_and_media_are_failed() -> None:
+    blocker = RequestBlocker()
+    assert answered_with(blocker, "Image", "https://cdn.jobs.example.com/logo.png") == "Fetch.failRequest"
+    assert answered_with(blocker, "Font", "https://fonts.example.net/inter") == "Fetch.failRequest"
+    assert blocker.block_reason("image", "https://cdn.jobs.example.com/logo.png") == "type:image"
+
+def test_only_blocked_types_are_paused_and_allowed_domains_are_never_url_blocked() -> None:
+    blocker = RequestBlocker(("image",), ("doubleclick.net", "google.com"))
+    assert blocker.fetch_patterns() == [{"urlPattern": "*", "resourceType": "Image"}]
+    assert blocker.blocked_url_patterns() == ["*://doubleclick.net/*", "*://*.doubleclick.net/*"]
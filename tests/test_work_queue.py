@@ -0,0 +1,97 @@
+from pathlib import Path
+from typing import Iterator
+import pytest
+import work_queue
+from work_queue import DONE, FAILED, LEASED, QUEUED, WorkQueue
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(work_queue.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path: Path, clock: Clock) -> Iterator[WorkQueue]:
+    queue = WorkQueue(str(tmp_path / "work_queue.sqlite3"), lease_seconds=60, max_attempts=2, retry_delay_seconds=10)
+    yield queue
+    queue.close()
+
+def status(queue: WorkQueue, item_id: int) -> str:
+    return queue.connection.execute("SELECT status FROM work_items WHERE id = ?", (item_id,)).fetchone()[0]
+
+def test_enqueue_ignores_known_pairs(queue: WorkQueue) -> None:
+    assert queue.enqueue("alex", "https://jobs.example.com")
+    assert not queue.enqueue("alex", "https://jobs.example.com")
+    assert queue.enqueue("sam", "https://jobs.example.com")
+    assert queue.counts() == {QUEUED: 2, LEASED: 0, DONE: 0, FAILED: 0}
+
+def test_an_item_is_leased_to_one_worker_at_a_time(queue: WorkQueue) -> None:
+    queue.enqueue("alex", "https://jobs.example.com")
+    item = queue.lease("worker-1")
+    assert item is not None and item["profile"] == "alex" and item["attempts"] == 1
+    assert queue.lease("worker-2") is None
+    assert queue.has_pending()
+    queue.complete(item["id"], "worker-1")
+    assert status(queue, item["id"]) == DONE
+    assert not queue.has_pending()
+
+def test_an_expired_lease_is_recovered_by_another_worker(queue: WorkQueue, clock: Clock) -> None:
+    queue.enqueue("alex", "https://jobs.example.com")
+    item = queue.lease("worker-1")
+    assert item is not None
+    clock.now += 30
+    assert queue.renew(item["id"], "worker-1")
+    clock.now += 59
+    assert queue.lease("worker-2") is None
+    clock.now += 2
+    recovered = queue.lease("worker-2")
+    assert recovered is not None and recovered["id"] == item["id"] and recovered["attempts"] == 2
+    # The old holder finds out it lost the lease, and cannot complete or fail the item any more.
+    assert not queue.renew(item["id"], "worker-1")
+    queue.complete(item["id"], "worker-1")
+    queue.fail(item["id"], "worker-1", "too late")
+    assert status(queue, item["id"]) == LEASED
+
+def test_release_worker_makes_its_items_available_at_once(queue: WorkQueue) -> None:
+    queue.enqueue("alex", "https://jobs.example.com")
+    item = queue.lease("worker-1")
+    assert item is not None
+    assert queue.release_worker("worker-2") == 0
+    assert queue.release_worker("worker-1") == 1
+    recovered = queue.lease("worker-2")
+    assert recovered is not None and recovered["id"] == item["id"]
+
+def test_failed_items_are_retried_after_a_delay_until_max_attempts(queue: WorkQueue, clock: Clock) -> None:
+    queue.enqueue("alex", "https://jobs.example.com")
+    item = queue.lease("worker-1")
+    assert item is not None
+    queue.fail(item["id"], "worker-1", "login failed")
+    assert status(queue, item["id"]) == QUEUED
+    clock.now += 9
+    assert queue.lease("worker-1") is None
+    clock.now += 2
+    retried = queue.lease("worker-1")
+    assert retried is not None and retried["attempts"] == 2
+    queue.fail(retried["id"], "worker-1", "login failed again")
+    assert status(queue, item["id"]) == FAILED
+    assert not queue.has_pending()
+    assert queue.requeue_failed() == 1
+    assert queue.lease("worker-1") is not None
+
+def test_an_expired_lease_on_the_last_attempt_fails_the_item(queue: WorkQueue, clock: Clock) -> None:
+    queue.enqueue("alex", "https://jobs.example.com")
+    assert queue.lease("worker-1") is not None
+    clock.now += 61
+    item = queue.lease("worker-2")
+    assert item is not None and item["attempts"] == 2
+    clock.now += 61
+    assert queue.lease("worker-3") is None
+    assert status(queue, item["id"]) == FAILED
+    assert queue.connection.execute("SELECT last_error FROM work_items").fetchone()[0] == "lease expired"
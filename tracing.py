@@ -0,0 +1,207 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Generator, Optional, TextIO
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Site, phase and step of the code currently running. Context variables, so every site task of the
+# async engine (and the threads it hands work to) carries its own scope.
+_site: ContextVar[str] = ContextVar("trace_site", default="")
+_phase: ContextVar[str] = ContextVar("trace_phase", default="")
+_step: ContextVar[int] = ContextVar("trace_step", default=0)
+_phase_started: ContextVar[float] = ContextVar("trace_phase_started", default=0.0)
+
+# Rough characters per token, for prompt size estimates without a provider specific tokenizer.
+CHARS_PER_TOKEN: float = 4.0
+METRICS_FLUSH_SECONDS: float = 5.0
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _label_str(labels: dict[str, str]) -> str:
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in sorted(labels.items())
+    )
+    return "{" + ",".join(escaped) + "}"
+
+class Span:
+    """
+    One timed operation. The keyword attributes given to Tracer.span become metric labels, details
+    added with set() only go to the JSONL trace.
+    """
+    def __init__(self, name: str, labels: dict[str, str]) -> None:
+        self.name: str = name
+        self.labels: dict[str, str] = labels
+        self.attributes: dict[str, Any] = {}
+        self.started: float = time.perf_counter()
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+class Tracer:
+    """
+    Structured spans and counters for the agent loop, scoped by site and phase.
+
+    Every finished span is appended to a JSONL trace, aggregated into Prometheus text format metrics
+    (rewritten to `metrics_path` every few seconds, e.g. for node_exporter's textfile collector) and
+    summarised in a table at the end of the run. Without paths only the in-memory aggregates are kept.
+    The trace is appended to, every record carries the run id so earlier runs stay comparable.
+    """
+    _shared: Optional["Tracer"] = None
+
+    def __init__(self, trace_path: Optional[str] = None, metrics_path: Optional[str] = None) -> None:
+        self.trace_path: Optional[str] = trace_path
+        self.metrics_path: Optional[str] = metrics_path
+        self.run_id: str = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.trace_file: Optional[TextIO] = open(trace_path, "a") if trace_path else None
+        # Span durations per (name, labels), e.g. {("llm", (("phase", "login"), ("provider", "ollama"))): [1.2, 0.9]}
+        self.durations: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+        # Counter totals per (name, labels), e.g. {("interventions", (("phase", "login"),)): 1}
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.last_metrics_flush: float = time.monotonic()
+
+    @classmethod
+    def shared(cls) -> "Tracer":
+        """Process wide tracer used by the browser, executor and agents."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def set_shared(cls, tracer: "Tracer") -> None:
+        cls._shared = tracer
+
+    @staticmethod
+    def set_scope(site: Optional[str] = None, phase: Optional[str] = None) -> None:
+        """
+        Set the site and/or phase spans are attributed to. A new phase ends the running one (see
+        end_phase) and restarts the step count.
+        """
+        if phase is not None:
+            Tracer.end_phase()
+        if site is not None:
+            _site.set(site)
+        if phase is not None:
+            _phase.set(phase)
+            _step.set(0)
+            _phase_started.set(time.perf_counter())
+
+    @staticmethod
+    def end_phase() -> None:
+        """Count the wall time of the running phase as phase_seconds, e.g. once a site is finished."""
+        started = _phase_started.get()
+        if started:
+            Tracer.shared().count("phase_seconds", time.perf_counter() - started)
+            _phase_started.set(0.0)
+
+    @staticmethod
+    def next_step() -> int:
+        """Start the next LLM step of the current phase and return its number."""
+        step = _step.get() + 1
+        _step.set(step)
+        Tracer.shared().count("steps")
+        return step
+
+    def _scoped_labels(self, labels: dict[str, str]) -> dict[str, str]:
+        return {"site": _site.get(), "phase": _phase.get(), **labels}
+
+    @contextmanager
+    def span(self, name: str, **labels: str) -> Generator[Span, None, None]:
+        span = Span(name, self._scoped_labels(labels))
+        try:
+            yield span
+        except GeneratorExit:
+            # A generator holding the span was closed early, e.g. a caller stopped consuming a stream.
+            span.set(abandoned=True)
+            raise
+        except BaseException as e:
+            span.set(error=repr(e))
+            raise
+        finally:
+            self._finish(span)
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(self._scoped_labels(labels).items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def _finish(self, span: Span) -> None:
+        seconds = time.perf_counter() - span.started
+        key = (span.name, tuple(sorted(span.labels.items())))
+        with self.lock:
+            self.durations.setdefault(key, []).append(seconds)
+            if self.trace_file is not None:
+                record = {"ts": time.time(), "run": self.run_id, "span": span.name, **span.labels, "step": _step.get(), "ms": round(seconds * 1000, 2), **span.attributes}
+                self.trace_file.write(json.dumps(record, default=str) + "\n")
+            flush = time.monotonic() - self.last_metrics_flush >= METRICS_FLUSH_SECONDS
+        if flush:
+            self.write_metrics()
+
+    def prometheus_text(self) -> str:
+        lines: list[str] = [
+            "# HELP agent_span_seconds Time spent in agent operations.",
+            "# TYPE agent_span_seconds summary"
+        ]
+        with self.lock:
+            durations = {key: list(values) for key, values in self.durations.items()}
+            counters = dict(self.counters)
+        for (name, labels), values in sorted(durations.items()):
+            label_str = _label_str({"span": name, **dict(labels)})
+            lines.append(f"agent_span_seconds_count{label_str} {len(values)}")
+            lines.append(f"agent_span_seconds_sum{label_str} {sum(values):.6f}")
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE agent_{name}_total counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"agent_{name}_total{_label_str(dict(labels))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self) -> None:
+        """Rewrite the Prometheus metrics file and flush the trace file."""
+        self.last_metrics_flush = time.monotonic()
+        if self.trace_file is not None:
+            with self.lock:
+                self.trace_file.flush()
+        if not self.metrics_path:
+            return
+        tmp_path = f"{self.metrics_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.metrics_path)
+
+    def log_summary(self) -> None:
+        """Log a per phase table of where the run spent its time, followed by the counters."""
+        rows: dict[tuple[str, str], list[float]] = {}
+        for (name, labels), values in self.durations.items():
+            label_map = dict(labels)
+            detail = label_map.get("action") or label_map.get("provider") or label_map.get("mode") or ""
+            rows.setdefault((label_map.get("phase", ""), f"{name} {detail}".strip()), []).extend(values)
+        if not rows:
+            return
+        logger.info(f"[Trace] {'phase':<12} {'operation':<24} {'count':>6} {'total s':>9} {'avg ms':>9} {'p95 ms':>9}")
+        for (phase, operation), values in sorted(rows.items()):
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, math.ceil(len(values) * 0.95) - 1)]
+            logger.info(
+                f"[Trace] {phase or '-':<12} {operation:<24} {len(values):>6} {sum(values):>9.2f} "
+                f"{sum(values) / len(values) * 1000:>9.0f} {p95 * 1000:>9.0f}"
+            )
+        totals: dict[str, float] = {}
+        for (name, _), value in self.counters.items():
+            totals[name] = totals.get(name, 0) + value
+        for name, value in sorted(totals.items()):
+            logger.info(f"[Trace] {name}: {value:g}")
+
+    def close(self) -> None:
+        self.write_metrics()
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
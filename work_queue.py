@@ -0,0 +1,136 @@
+import logging
+import sqlite3
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger("JobApplicationAgent")
+
+# Item states. "leased" items whose lease expired are picked up again, which is how the work of a
+# crashed worker is recovered.
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+class WorkQueue:
+    """
+    Durable SQLite queue of (applicant profile, site) work items shared by the worker processes of a
+    fleet. A worker leases one item at a time and keeps the lease alive with renew() while it works;
+    an item whose lease runs out (the worker crashed or hung) is handed out again. Failed items are
+    retried after `retry_delay_seconds` until they used up `max_attempts`.
+    """
+    def __init__(self, path: str = "work_queue.sqlite3", lease_seconds: float = 900, max_attempts: int = 3, retry_delay_seconds: float = 60) -> None:
+        self.path: str = path
+        self.lease_seconds: float = lease_seconds
+        self.max_attempts: int = max_attempts
+        self.retry_delay_seconds: float = retry_delay_seconds
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE where a lease is taken.
+        self.connection: sqlite3.Connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS work_items ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, profile TEXT NOT NULL, site TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, "
+            "lease_owner TEXT, lease_expires_at REAL, last_error TEXT, updated_at REAL NOT NULL, "
+            "UNIQUE (profile, site))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS work_items_status ON work_items(status, available_at)")
+
+    def enqueue(self, profile: str, site: str) -> bool:
+        """Add a work item unless the (profile, site) pair is already queued or was processed. Returns whether it was added."""
+        now = time.time()
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO work_items (profile, site, status, available_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (profile, site, QUEUED, now, now)
+        )
+        return cursor.rowcount > 0
+
+    def requeue_failed(self) -> int:
+        """Give every failed item a fresh set of attempts, returns how many were requeued."""
+        cursor = self.connection.execute(
+            "UPDATE work_items SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE status = ?",
+            (QUEUED, time.time(), time.time(), FAILED)
+        )
+        return cursor.rowcount
+
+    def lease(self, worker: str) -> Optional[dict[str, Any]]:
+        """
+        Lease the next available item for `worker`: a queued item that is due, or a leased one whose
+        lease expired. Returns {"id", "profile", "site", "attempts"} or None if nothing is available.
+        """
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._fail_exhausted(now)
+            row = self.connection.execute(
+                "SELECT id, profile, site, attempts, status, lease_owner FROM work_items "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY available_at, id LIMIT 1",
+                (QUEUED, now, LEASED, now)
+            ).fetchone()
+            if row is None:
+                self.connection.execute("COMMIT")
+                return None
+            item_id, profile, site, attempts, status, previous_owner = row
+            if status == LEASED:
+                logger.warning(f"[Work Queue] ⚠️ Lease of {profile} / {site} held by {previous_owner} expired, recovering it")
+            self.connection.execute(
+                "UPDATE work_items SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (LEASED, worker, now + self.lease_seconds, now, item_id)
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return {"id": item_id, "profile": profile, "site": site, "attempts": attempts + 1}
+
+    def _fail_exhausted(self, now: float) -> None:
+        # Expired leases of items that already used up their attempts are not handed out again.
+        self.connection.execute(
+            "UPDATE work_items SET status = ?, last_error = COALESCE(last_error, 'lease expired'), updated_at = ? "
+            "WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+            (FAILED, now, LEASED, now, self.max_attempts)
+        )
+
+    def renew(self, item_id: int, worker: str) -> bool:
+        """Extend the lease of an item. False means the lease was lost, e.g. it expired and another worker took over."""
+        now = time.time()
+        cursor = self.connection.execute(
+            "UPDATE work_items SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + self.lease_seconds, now, item_id, LEASED, worker)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, item_id: int, worker: str) -> None:
+        self.connection.execute(
+            "UPDATE work_items SET status = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+            (DONE, time.time(), item_id, worker)
+        )
+
+    def fail(self, item_id: int, worker: str, error: str) -> None:
+        """Record a failed attempt; the item is retried later unless it ran out of attempts."""
+        now = time.time()
+        row = self.connection.execute("SELECT attempts FROM work_items WHERE id = ? AND lease_owner = ?", (item_id, worker)).fetchone()
+        if row is None:
+            return
+        status = FAILED if row[0] >= self.max_attempts else QUEUED
+        self.connection.execute(
+            "UPDATE work_items SET status = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+            (status, now + self.retry_delay_seconds * row[0], error[:2000], now, item_id)
+        )
+
+    def release_worker(self, worker: str) -> int:
+        """Expire the leases of a worker that is known to be dead, so its items are recovered right away."""
+        cursor = self.connection.execute(
+            "UPDATE work_items SET lease_expires_at = 0, updated_at = ? WHERE status = ? AND lease_owner = ?",
+            (time.time(), LEASED, worker)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict[str, int]:
+        rows = self.connection.execute("SELECT status, COUNT(*) FROM work_items GROUP BY status").fetchall()
+        return {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0, **{status: count for status, count in rows}}
+
+    def has_pending(self) -> bool:
+        counts = self.counts()
+        return counts[QUEUED] + counts[LEASED] > 0
+
+    def close(self) -> None:
+        self.connection.close()